@@ -9,6 +9,9 @@ from anndata import AnnData
 from pandasaurus_cxg.anndata_enricher import AnndataEnricher
 from pandasaurus_cxg.schema.cell_x_gene_schema import required_fields
 from pandasaurus_cxg.utils.anndata_loader import AnndataLoader
+from pandasaurus_cxg.utils.exceptions import MissingAuthorCellTypeFields
+from pandasaurus_cxg.utils.instrumentation import profiled_stage
+from pandasaurus_cxg.utils.progress import track
 
 # Check if the DEBUG environment variable is set
 debug_mode = os.getenv("DEBUG")
@@ -41,8 +44,9 @@ class AnndataAnalyzer:
                 This is used to define free text cell type fields.
 
         Raises:
-            ValueError: If the 'obs_meta' field is missing in anndata.uns and author_cell_type_list is not provided.
-                This indicates that the necessary information about cell types is not available.
+            MissingAuthorCellTypeFields: A ValueError, raised if the 'obs_meta' field is missing in
+                anndata.uns and author_cell_type_list is not provided. This indicates that the
+                necessary information about cell types is not available.
         """
         self._anndata = anndata
         try:
@@ -66,7 +70,7 @@ class AnndataAnalyzer:
                 available_free_text_fields = sorted(
                     list(set(self._anndata.obs.columns) - set(required_fields))
                 )
-                raise ValueError(
+                raise MissingAuthorCellTypeFields(
                     "AnndataAnalyzer initialization error:\n\n"
                     "The 'obs_meta' field is missing in anndata.uns!\n"
                     "If this field is absent, you can provide a list of field names from the "
@@ -90,7 +94,7 @@ class AnndataAnalyzer:
         return AnndataAnalyzer(AnndataLoader.load_from_file(file_path), author_cell_type_list)
 
     def co_annotation_report(
-        self, disease: Optional[str] = None, enrich: bool = False
+        self, disease: Optional[str] = None, enrich: bool = False, max_hops: Optional[int] = None
     ) -> pd.DataFrame:
         """
         Generates a co-annotation report based on the provided schema.
@@ -102,17 +106,20 @@ class AnndataAnalyzer:
                 desired.
             enrich (bool): Flag to either enable or disable enrichment in co_annotation report.
                 Defaults to False.
+            max_hops (Optional[int]): The maximum number of subClassOf hops used by the
+                enrichment. Only used when `enrich` is True. Defaults to None.
 
         Returns:
             pd.DataFrame: The co-annotation report.
         """
         # Call the core method to generate the full DataFrame
-        full_df = self._generate_co_annotation_dataframe(disease, enrich)
+        full_df = self._generate_co_annotation_dataframe(disease, enrich, max_hops)
         # Return only the first 5 columns
         return full_df.iloc[:, :5]
 
+    @profiled_stage("anndata_analyzer.co_annotation")
     def _generate_co_annotation_dataframe(
-        self, disease: Optional[str] = None, enrich: bool = False
+        self, disease: Optional[str] = None, enrich: bool = False, max_hops: Optional[int] = None
     ):
         """
         Core method to generate a full co-annotation dataframe.
@@ -120,6 +127,7 @@ class AnndataAnalyzer:
         Args:
             disease (Optional[str]): A valid disease CURIE used to filter the rows.
             enrich (bool): Whether to enable enrichment in the co-annotation report.
+            max_hops (Optional[int]): The maximum number of subClassOf hops used by the enrichment.
 
         Returns:
             pd.DataFrame: The complete co-annotation dataframe with all columns.
@@ -129,43 +137,45 @@ class AnndataAnalyzer:
         enriched_co_oc = None
         if enrich:
             enricher = AnndataEnricher(self._anndata)
-            enricher.simple_enrichment()
+            enricher.simple_enrichment(max_hops)
             enriched_co_oc = AnndataAnalyzer._enrich_co_annotation(enricher)
+        field_pairs = [
+            (field_name_1, field_name_2)
+            for field_name_2 in self.all_cell_type_identifiers
+            for field_name_1 in self.all_cell_type_identifiers
+            if field_name_1 != field_name_2
+            and field_name_1 in self._anndata.obs.columns
+            and field_name_2 in self._anndata.obs.columns
+        ]
         temp_result = []
-        for field_name_2 in self.all_cell_type_identifiers:
-            for field_name_1 in self.all_cell_type_identifiers:
-                if (
-                    field_name_1 != field_name_2
-                    and field_name_1 in self._anndata.obs.columns
-                    and field_name_2 in self._anndata.obs.columns
-                ):
-                    co_oc = self._filter_data_and_drop_duplicates(
-                        field_name_1, field_name_2, disease
-                    )
-
-                    if enrich:
-                        co_oc = pd.concat(
-                            [
-                                co_oc,
-                                enriched_co_oc.rename(
-                                    columns={"s_label": field_name_1, "o_label": field_name_2}
-                                ),
-                            ],
-                            axis=0,
-                        ).reset_index(drop=True)
-
-                    AnndataAnalyzer._assign_predicate_column(co_oc, field_name_1, field_name_2)
-                    # Calculate cell counts for `field_name_1`
-                    field_1_counts = (
-                        self._anndata.obs.groupby(field_name_1, observed=False).size().to_dict()
-                    )
-                    co_oc[f"{field_name_1}_cell_count"] = co_oc[field_name_1].map(field_1_counts)
-                    # Calculate cell counts for `field_name_2`
-                    field_2_counts = (
-                        self._anndata.obs.groupby(field_name_2, observed=False).size().to_dict()
-                    )
-                    co_oc[f"{field_name_2}_cell_count"] = co_oc[field_name_2].map(field_2_counts)
-                    temp_result.extend(co_oc.to_dict(orient="records"))
+        with track("anndata_analyzer.co_annotation", total=len(field_pairs)) as progress:
+            for field_name_1, field_name_2 in field_pairs:
+                co_oc = self._filter_data_and_drop_duplicates(field_name_1, field_name_2, disease)
+
+                if enrich:
+                    co_oc = pd.concat(
+                        [
+                            co_oc,
+                            enriched_co_oc.rename(
+                                columns={"s_label": field_name_1, "o_label": field_name_2}
+                            ),
+                        ],
+                        axis=0,
+                    ).reset_index(drop=True)
+
+                AnndataAnalyzer._assign_predicate_column(co_oc, field_name_1, field_name_2)
+                # Calculate cell counts for `field_name_1`
+                field_1_counts = (
+                    self._anndata.obs.groupby(field_name_1, observed=False).size().to_dict()
+                )
+                co_oc[f"{field_name_1}_cell_count"] = co_oc[field_name_1].map(field_1_counts)
+                # Calculate cell counts for `field_name_2`
+                field_2_counts = (
+                    self._anndata.obs.groupby(field_name_2, observed=False).size().to_dict()
+                )
+                co_oc[f"{field_name_2}_cell_count"] = co_oc[field_name_2].map(field_2_counts)
+                temp_result.extend(co_oc.to_dict(orient="records"))
+                progress.advance()
 
         result = [
             [item for sublist in [[k, v] for k, v in record.items()] for item in sublist]
@@ -196,7 +206,9 @@ class AnndataAnalyzer:
         ).reset_index(drop=True)
         return self.report_df
 
-    def enriched_co_annotation_report(self, disease: Optional[str] = None):
+    def enriched_co_annotation_report(
+        self, disease: Optional[str] = None, max_hops: Optional[int] = None
+    ):
         """
         Generates an enriched co-annotation report based on the provided schema. The enrichment
         process will be performed by checking if any of the CL terms in the initial seed
@@ -210,12 +222,14 @@ class AnndataAnalyzer:
                 given disease. If provided, only the rows matching the specified disease will be
                 included in the filtering process. Defaults to None if no disease filtering is
                 desired.
+            max_hops (Optional[int]): The maximum number of subClassOf hops between a seed term
+                and an enriched term. Defaults to None.
 
         Returns:
             pd.DataFrame: The co-annotation report.
 
         """
-        return self.co_annotation_report(disease, True)
+        return self.co_annotation_report(disease, True, max_hops)
 
     @staticmethod
     def _enrich_co_annotation(enricher: AnndataEnricher):
@@ -1,11 +1,12 @@
 import itertools
-from typing import List, Optional, Tuple
+import warnings
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
 import pandas as pd
 from anndata import AnnData
-from pandasaurus.query import Query
-from pandasaurus.slim_manager import SlimManager
+from rdflib import RDFS, Graph
 
+from pandasaurus_cxg.graph_generator.graph_namespaces import prefixes
 from pandasaurus_cxg.utils.anndata_loader import AnndataLoader
 from pandasaurus_cxg.utils.exceptions import (
     CellTypeNotFoundError,
@@ -13,6 +14,8 @@ from pandasaurus_cxg.utils.exceptions import (
     MissingEnrichmentProcess,
     SubclassWarning,
 )
+from pandasaurus_cxg.utils.instrumentation import profiled_stage
+from pandasaurus_cxg.utils.progress import check_cancelled, track
 
 
 class AnndataEnricher:
@@ -55,7 +58,13 @@ class AnndataEnricher:
         if "unknown" in self.seed_dict:
             del self.seed_dict["unknown"]
             self.seed_dict["CL:0000000"] = "cell"
+        # pandasaurus loads the oaklib stack, so it is only imported once an enricher is created
+        from pandasaurus.query import Query
+        from pandasaurus.slim_manager import SlimManager
+
         self.enricher = Query(list(self.seed_dict.keys()))
+        self._subclass_adjacency: Dict[str, Set[str]] = {}
+        self._subclass_adjacency_key: Optional[Tuple[FrozenSet[str], FrozenSet[str]]] = None
         try:
             unique_context = self.anndata.obs[
                 [context_field, context_field_label]
@@ -108,49 +117,87 @@ class AnndataEnricher:
             ontology_list_for_slims,
         )
 
-    def simple_enrichment(self) -> pd.DataFrame:
+    @profiled_stage("anndata_enricher.simple_enrichment")
+    def simple_enrichment(self, max_hops: Optional[int] = None) -> pd.DataFrame:
         """Perform simple enrichment analysis.
 
+        Args:
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
+
         Returns:
-            The enriched results as a pandas DataFrame.
+            The enriched results as a pandas DataFrame, with a `hops` column if max_hops is set.
         """
-        return self.enricher.simple_enrichment()
+        return self._run_enrichment(
+            "anndata_enricher.simple_enrichment", self.enricher.simple_enrichment, max_hops
+        )
 
-    def minimal_slim_enrichment(self, slim_list: List[str]) -> pd.DataFrame:
+    @profiled_stage("anndata_enricher.minimal_slim_enrichment")
+    def minimal_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
         """Perform minimal slim enrichment analysis.
 
         Args:
             slim_list (List[str]): The list of slim terms to use for enrichment analysis.
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
 
         Returns:
-           The enriched results as a pandas DataFrame.
+           The enriched results as a pandas DataFrame, with a `hops` column if max_hops is set.
         """
         self.validate_slim_list(slim_list)
-        return self.enricher.minimal_slim_enrichment(slim_list)
+        return self._run_enrichment(
+            "anndata_enricher.minimal_slim_enrichment",
+            lambda: self.enricher.minimal_slim_enrichment(slim_list),
+            max_hops,
+        )
 
-    def full_slim_enrichment(self, slim_list: List[str]) -> pd.DataFrame:
+    @profiled_stage("anndata_enricher.full_slim_enrichment")
+    def full_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
         """Perform full slim enrichment analysis.
 
         Args:
             slim_list (List[str]): The list of slim terms to use for enrichment analysis.
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
 
         Returns:
-            The enriched results as a pandas DataFrame.
+            The enriched results as a pandas DataFrame, with a `hops` column if max_hops is set.
         """
         self.validate_slim_list(slim_list)
-        return self.enricher.full_slim_enrichment(slim_list)
+        return self._run_enrichment(
+            "anndata_enricher.full_slim_enrichment",
+            lambda: self.enricher.full_slim_enrichment(slim_list),
+            max_hops,
+        )
 
-    def contextual_slim_enrichment(self) -> Optional[pd.DataFrame]:
+    @profiled_stage("anndata_enricher.contextual_slim_enrichment")
+    def contextual_slim_enrichment(self, max_hops: Optional[int] = None) -> Optional[pd.DataFrame]:
         """Perform contextual slim enrichment analysis.
 
+        Args:
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
+
         Returns:
-            The enriched results as a pandas DataFrame if the context list is available,
-                otherwise None.
+            The enriched results as a pandas DataFrame, with a `hops` column if max_hops is set,
+                if the context list is available, otherwise None.
         """
         # TODO Better handle datasets without tissue field
         # TODO self._context_list is refactored and cannot be None in any case. 'else' needs an update
         return (
-            self.enricher.contextual_slim_enrichment(list(self._context_list.keys()))
+            self._run_enrichment(
+                "anndata_enricher.contextual_slim_enrichment",
+                lambda: self.enricher.contextual_slim_enrichment(list(self._context_list.keys())),
+                max_hops,
+            )
             if self._context_list
             else None
         )
@@ -234,8 +281,195 @@ class AnndataEnricher:
         Args:
             property_list (List[str]): The list of properties to include in the enrichment analysis.
         """
+        from pandasaurus.query import Query
+
         self.enricher = Query(list(self.seed_dict.keys()), property_list)
 
+    def get_subclass_adjacency(self) -> Dict[str, Set[str]]:
+        """
+        Return the direct subClassOf adjacency of the ontology between the terms of the last
+        enrichment.
+
+        The asserted subClassOf edges on the ontology paths from the subjects to the objects of
+        the subClassOf rows of the enrichment are fetched once and cached until an enrichment
+        returns other terms. Intermediate ontology terms that are not part of the enrichment are
+        included, so hops counted over the adjacency are ontology ancestor depths.
+
+        Returns:
+            Dict[str, Set[str]]: A dictionary mapping each term IRI to the IRIs of its direct
+                superclasses.
+        """
+        enriched_df = self.enricher.enriched_df
+        subclass_rows = (
+            enriched_df[enriched_df["p"] == "rdfs:subClassOf"]
+            if not enriched_df.empty
+            else enriched_df
+        )
+        term_iri = AnndataEnricher._term_iri
+        key = (
+            frozenset(map(term_iri, subclass_rows.get("s", ()))),
+            frozenset(map(term_iri, subclass_rows.get("o", ()))),
+        )
+        if self._subclass_adjacency_key != key:
+            adjacency = {}
+            for s, o in AnndataEnricher._fetch_subclass_edges(sorted(key[0]), sorted(key[1])):
+                adjacency.setdefault(term_iri(s), set()).add(term_iri(o))
+            self._subclass_adjacency = adjacency
+            self._subclass_adjacency_key = key
+        return self._subclass_adjacency
+
+    @staticmethod
+    def _fetch_subclass_edges(
+        subject_iris: List[str], object_iris: List[str]
+    ) -> Iterable[Tuple[str, str]]:
+        # asserted subClassOf edges between the subjects and the objects, from the same
+        # Ubergraph endpoint the pandasaurus enrichment queries run against
+        if not subject_iris or not object_iris:
+            return []
+        from pandasaurus.utils.query_utils import chunks, run_sparql_query
+
+        edges = set()
+        for subject_chunk in chunks(subject_iris, 45):
+            for object_chunk in chunks(object_iris, 45):
+                query = (
+                    "SELECT DISTINCT ?x ?y WHERE { GRAPH <http://reasoner.renci.org/nonredundant> { "
+                    f"VALUES ?s {{ {' '.join(f'<{iri}>' for iri in subject_chunk)} }} "
+                    f"VALUES ?o {{ {' '.join(f'<{iri}>' for iri in object_chunk)} }} "
+                    "?s rdfs:subClassOf* ?x. ?x rdfs:subClassOf ?y. ?y rdfs:subClassOf* ?o. } }"
+                )
+                edges.update((row["x"], row["y"]) for row in run_sparql_query(query))
+        return edges
+
+    def _run_enrichment(
+        self,
+        stage: str,
+        query: Callable[[], Optional[pd.DataFrame]],
+        max_hops: Optional[int] = None,
+    ) -> Optional[pd.DataFrame]:
+        # the pandasaurus query cannot be interrupted, so cancellation is checked around it
+        with track(stage, total=2) as progress:
+            enriched_df = query()
+            progress.advance()
+            # hops need Ubergraph queries, so they are only computed for pruning or on request
+            if max_hops is not None:
+                enriched_df = self._annotate_hops(enriched_df, max_hops)
+            progress.advance()
+        return enriched_df
+
+    def annotate_hops(self) -> Optional[pd.DataFrame]:
+        """
+        Add a `hops` column to the results of the last enrichment without pruning them.
+
+        Hops are the number of asserted subClassOf edges between a seed term and an enriched term
+        in the ontology. Rows of other predicates have no hops. If the ontology cannot be queried,
+        all hops are NA and a warning is issued.
+
+        Returns:
+            The enriched results as a pandas DataFrame with a `hops` column.
+
+        Raises:
+            MissingEnrichmentProcess: If the enrichment process has not been performed, and the
+                `enriched_df` is empty.
+        """
+        if self.enricher.enriched_df.empty:
+            enrichment_methods = [i for i in dir(AnndataEnricher) if "_enrichment" in i]
+            enrichment_methods.sort()
+            raise MissingEnrichmentProcess(enrichment_methods)
+        return self._annotate_hops(self.enricher.enriched_df)
+
+    def _annotate_hops(
+        self, enriched_df: Optional[pd.DataFrame], max_hops: Optional[int] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Add a `hops` column to enriched_df and prune the terms deeper than max_hops.
+
+        Hops are the number of asserted subClassOf edges between a seed term and an enriched term
+        in the ontology. Rows of other predicates, e.g. set with set_enricher_property_list, have
+        no hops and are never pruned. If the subClassOf edges cannot be fetched, hops are NA and
+        nothing is pruned.
+        """
+        if enriched_df is None or enriched_df.empty:
+            return enriched_df
+        if max_hops is not None and max_hops < 0:
+            raise ValueError("max_hops must be a non-negative integer")
+        term_iri = AnndataEnricher._term_iri
+        is_subclass = enriched_df["p"] == "rdfs:subClassOf"
+        try:
+            adjacency = self.get_subclass_adjacency()
+        except Exception as e:
+            warnings.warn(
+                f"Could not fetch the subClassOf edges of the enriched terms, hops are NA: {e}"
+            )
+            enriched_df = enriched_df.assign(hops=pd.array([None] * len(enriched_df), "Int64"))
+            self.enricher.enriched_df = enriched_df
+            return enriched_df
+        seeds = {term_iri(curie) for curie in enriched_df.loc[is_subclass, "s"].unique()}
+        hops = AnndataEnricher._compute_hops(adjacency, seeds, max_hops)
+        hop_values = [
+            None if not subclass else 0 if s == o else hops.get((term_iri(s), term_iri(o)))
+            for s, o, subclass in zip(enriched_df["s"], enriched_df["o"], is_subclass)
+        ]
+        enriched_df = enriched_df.assign(hops=pd.array(hop_values, dtype="Int64"))
+        if max_hops is not None:
+            enriched_df = enriched_df[~is_subclass | enriched_df["hops"].notna()].reset_index(
+                drop=True
+            )
+            other_rows = enriched_df[enriched_df["p"] != "rdfs:subClassOf"]
+            reachable = seeds.union(
+                (node for _, node in hops),
+                map(term_iri, other_rows["s"]),
+                map(term_iri, other_rows["o"]),
+            )
+            self.enricher.graph = AnndataEnricher._prune_graph(self.enricher.graph, reachable)
+        self.enricher.enriched_df = enriched_df
+        return enriched_df
+
+    @staticmethod
+    def _compute_hops(
+        adjacency: Dict[str, Set[str]], sources: Iterable[str], max_hops: Optional[int] = None
+    ) -> Dict[Tuple[str, str], int]:
+        """
+        Run a single level-synchronous BFS from all sources at once.
+
+        Returns:
+            A dictionary mapping (source, ancestor) pairs to the minimum number of hops.
+        """
+        frontier = [(source, source) for source in set(sources)]
+        visited = set(frontier)
+        hops = {}
+        depth = 0
+        while frontier and (max_hops is None or depth < max_hops):
+            check_cancelled("anndata_enricher.compute_hops")
+            depth += 1
+            next_frontier = []
+            for source, node in frontier:
+                for parent in adjacency.get(node, ()):
+                    if (source, parent) not in visited:
+                        visited.add((source, parent))
+                        hops[(source, parent)] = depth
+                        next_frontier.append((source, parent))
+            frontier = next_frontier
+        return hops
+
+    @staticmethod
+    def _prune_graph(graph: Graph, reachable: Set[str]) -> Graph:
+        pruned_graph = Graph()
+        for s, p, o in graph:
+            if str(s) not in reachable:
+                continue
+            if p == RDFS.subClassOf and str(o) not in reachable:
+                continue
+            pruned_graph.add((s, p, o))
+        return pruned_graph
+
+    @staticmethod
+    def _term_iri(curie: str) -> str:
+        # mirrors the IRIs minted by the pandasaurus enrichment graph, OBO PURLs by default
+        if curie.startswith(("http://", "https://")):
+            return curie
+        prefix, _, local_id = curie.partition(":")
+        return prefixes.get(prefix, f"http://purl.obolibrary.org/obo/{prefix}_") + local_id
+
     def validate_slim_list(self, slim_list):
         """Check if any slim term in the given list is invalid.
 
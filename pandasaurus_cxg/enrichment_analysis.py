@@ -1,10 +1,12 @@
 from typing import List, Optional
 
 import pandas as pd
+from anndata import AnnData
 
 from pandasaurus_cxg.anndata_analyzer import AnndataAnalyzer
 from pandasaurus_cxg.anndata_enricher import AnndataEnricher
 from pandasaurus_cxg.utils.anndata_loader import AnndataLoader
+from pandasaurus_cxg.utils.anndata_reader import AnndataReader
 
 
 class AnndataEnrichmentAnalyzer:
@@ -18,49 +20,91 @@ class AnndataEnrichmentAnalyzer:
                 If the 'obs_meta' field is missing in 'anndata.uns', this parameter should be set.
                 This is used to define free text cell type fields.
         """
-        anndata = AnndataLoader.load_from_file(file_path)
+        self._init_managers(AnndataLoader.load_from_file(file_path), author_cell_type_list)
+
+    def _init_managers(self, anndata: AnnData, author_cell_type_list: Optional[List[str]] = None):
         self.enricher_manager = AnndataEnricher(anndata)
         self.analyzer_manager = AnndataAnalyzer(anndata, author_cell_type_list)
 
-    def simple_enrichment(self) -> pd.DataFrame:
+    @staticmethod
+    def from_reader(
+        reader: AnndataReader, author_cell_type_list: Optional[List[str]] = None
+    ) -> "AnndataEnrichmentAnalyzer":
+        """
+        Creates an AnndataEnrichmentAnalyzer from the metadata of an AnndataReader instead of a
+        backed AnnData, so that it can be used from thread pools.
+
+        Args:
+            reader: The reader of the h5ad file.
+            author_cell_type_list (Optional[str]): Names of optional free text cell type fields.
+
+        Returns:
+            The AnndataEnrichmentAnalyzer of the file. Its observations are a copy, as the enricher
+                can annotate them.
+        """
+        analyzer = AnndataEnrichmentAnalyzer.__new__(AnndataEnrichmentAnalyzer)
+        analyzer._init_managers(reader.metadata(copy_obs=True), author_cell_type_list)
+        return analyzer
+
+    def simple_enrichment(self, max_hops: Optional[int] = None) -> pd.DataFrame:
         """Perform simple enrichment analysis.
 
+        Args:
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
+
         Returns:
             The enriched results as a pandas DataFrame.
         """
-        return self.enricher_manager.simple_enrichment()
+        return self.enricher_manager.simple_enrichment(max_hops)
 
-    def minimal_slim_enrichment(self, slim_list: List[str]) -> pd.DataFrame:
+    def minimal_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
         """Perform minimal slim enrichment analysis.
 
         Args:
             slim_list (List[str]): The list of slim terms to use for enrichment analysis.
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
 
         Returns:
            The enriched results as a pandas DataFrame.
         """
-        return self.enricher_manager.minimal_slim_enrichment(slim_list)
+        return self.enricher_manager.minimal_slim_enrichment(slim_list, max_hops)
 
-    def full_slim_enrichment(self, slim_list: List[str]) -> pd.DataFrame:
+    def full_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
         """Perform full slim enrichment analysis.
 
         Args:
             slim_list (List[str]): The list of slim terms to use for enrichment analysis.
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
 
         Returns:
             The enriched results as a pandas DataFrame.
         """
-        return self.enricher_manager.full_slim_enrichment(slim_list)
+        return self.enricher_manager.full_slim_enrichment(slim_list, max_hops)
 
-    def contextual_slim_enrichment(self) -> Optional[pd.DataFrame]:
+    def contextual_slim_enrichment(self, max_hops: Optional[int] = None) -> Optional[pd.DataFrame]:
         """Perform contextual slim enrichment analysis.
 
+        Args:
+            max_hops: The maximum number of ontology subClassOf hops allowed between a seed term
+                and an enriched term. Deeper terms are pruned from the results, while rows of other
+                predicates are kept. Defaults to None, in which case no hops are computed.
+
         Returns:
             The enriched results as a pandas DataFrame if the context list is available,
                 otherwise None.
         """
         # TODO Better handle datasets without tissue field
-        return self.enricher_manager.contextual_slim_enrichment()
+        return self.enricher_manager.contextual_slim_enrichment(max_hops)
 
     def filter_anndata_with_enriched_cell_type(self, cell_type: str) -> pd.DataFrame:
         """Filter the original anndata object based on enriched cell types.
@@ -111,7 +155,9 @@ class AnndataEnrichmentAnalyzer:
             cell_type_list, field_name, field_value
         )
 
-    def co_annotation_report(self, disease: Optional[str] = None, enrich: bool = False):
+    def co_annotation_report(
+        self, disease: Optional[str] = None, enrich: bool = False, max_hops: Optional[int] = None
+    ):
         """
         Generates a co-annotation report based on the provided schema.
 
@@ -122,14 +168,18 @@ class AnndataEnrichmentAnalyzer:
                 desired.
             enrich (bool): Flag to either enable or disable enrichment in co_annotation report.
                 Defaults to False.
+            max_hops (Optional[int]): The maximum number of subClassOf hops used by the
+                enrichment. Only used when `enrich` is True. Defaults to None.
 
         Returns:
             pd.DataFrame: The co-annotation report.
 
         """
-        return self.analyzer_manager.co_annotation_report(disease, enrich)
+        return self.analyzer_manager.co_annotation_report(disease, enrich, max_hops)
 
-    def enriched_co_annotation_report(self, disease: Optional[str] = None):
+    def enriched_co_annotation_report(
+        self, disease: Optional[str] = None, max_hops: Optional[int] = None
+    ):
         """
         Generates an enriched co-annotation report based on the provided schema. The enrichment
         process will be performed by checking if any of the CL terms in the initial seed
@@ -143,9 +193,11 @@ class AnndataEnrichmentAnalyzer:
                 given disease. If provided, only the rows matching the specified disease will be
                 included in the filtering process. Defaults to None if no disease filtering is
                 desired.
+            max_hops (Optional[int]): The maximum number of subClassOf hops between a seed term
+                and an enriched term. Defaults to None.
 
         Returns:
             pd.DataFrame: The co-annotation report.
 
         """
-        return self.analyzer_manager.enriched_co_annotation_report(disease)
+        return self.analyzer_manager.enriched_co_annotation_report(disease, max_hops)
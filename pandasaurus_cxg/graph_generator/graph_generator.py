@@ -1,26 +1,24 @@
+import functools
+import io
 import json
-import textwrap
+import os
+import re
+import time
 import uuid
 from enum import Enum
-from typing import Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
-import matplotlib.pyplot as plt
-import networkx as nx
-from pandasaurus.graph.graph_generator import GraphGenerator as graphgen
+import pandas as pd
 from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
-from rdflib.plugins.sparql import prepareQuery
+from rdflib.graph import ReadOnlyGraphAggregate
+from rdflib.store import Store
 
-from pandasaurus_cxg.enrichment_analysis import (
-    AnndataAnalyzer,
-    AnndataEnricher,
-    AnndataEnrichmentAnalyzer,
-)
 from pandasaurus_cxg.graph_generator.graph_generator_utils import (
-    add_edge,
-    add_node,
+    AdjacencyIndex,
+    PropertyIndex,
     add_outgoing_edges_to_subgraph,
     citation_field_name,
-    colour_mapping,
+    cluster_content_key,
     extract_dataset_version_id,
     find_and_rotate_center_layout,
     generate_subgraph,
@@ -29,6 +27,7 @@ from pandasaurus_cxg.graph_generator.graph_generator_utils import (
     parse_citation_field_into_dict,
     ncname_safe,
     select_node_with_property,
+    transitive_reduction,
 )
 from pandasaurus_cxg.graph_generator.graph_namespaces import prefixes
 from pandasaurus_cxg.graph_generator.graph_predicates import (
@@ -38,17 +37,70 @@ from pandasaurus_cxg.graph_generator.graph_predicates import (
     HAS_SOURCE,
     SUBCLUSTER_OF,
 )
+from pandasaurus_cxg.graph_generator.triple_stream import (
+    GraphBatchWriter,
+    TripleSink,
+    TripleStreamWriter,
+    compressed_file_extension,
+    load_rdf_stream,
+    open_compressed,
+    write_ntriples_shards,
+)
+from pandasaurus_cxg.graph_generator.triple_table import TripleTable
 from pandasaurus_cxg.utils.exceptions import (
     InvalidGraphFormat,
     MissingAnalysisProcess,
     MissingEnrichmentProcess,
+    OperationCancelled,
 )
-from pandasaurus_cxg.utils.logging_config import configure_logger
+from pandasaurus_cxg.utils.instrumentation import lap, stage
+from pandasaurus_cxg.utils.logging_config import AggregatedWarnings, configure_logger
+from pandasaurus_cxg.utils.progress import track
+
+if TYPE_CHECKING:
+    from pandasaurus_cxg.enrichment_analysis import AnndataEnrichmentAnalyzer
+    from pandasaurus_cxg.graph_generator.subgraph_renderer import SubgraphRenderer
 
 # Set up logger
 logger = configure_logger()
 
 
+def _batched_graph_writes(method):
+    # lets the wrapped method add triples one by one while they reach the store in addN batches
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not isinstance(self.graph, Graph):
+            return method(self, *args, **kwargs)
+        graph = self.graph
+        try:
+            with GraphBatchWriter(graph, self.batch_size) as writer:
+                self.graph = writer
+                try:
+                    return method(self, *args, **kwargs)
+                except OperationCancelled:
+                    writer.discard()
+                    raise
+                finally:
+                    self.graph = graph
+        finally:
+            self.invalidate_indexes()
+
+    return wrapper
+
+
+def _graph_stage(name: str):
+    # measures the wrapped method as a pipeline stage, counting the triples it adds to self.graph
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with stage(name, graph=self.graph):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
 class GraphGenerator:
     cluster_reserved_keys = {
         "author_label_column",
@@ -61,9 +113,13 @@ class GraphGenerator:
 
     def __init__(
         self,
-        enrichment_analyzer: AnndataEnrichmentAnalyzer,
+        enrichment_analyzer: "AnndataEnrichmentAnalyzer",
         keys: Optional[List[str]] = None,
         dataset_metadata: Optional[Dict[str, str]] = None,
+        store: Union[str, Store] = "default",
+        store_path: Optional[str] = None,
+        batch_size: int = 10000,
+        census_version: Optional[str] = None,
     ):
         """
         Initializes GraphGenerator instance.
@@ -75,11 +131,23 @@ class GraphGenerator:
                 Please refrain from using this parameter until the next notification
             dataset_metadata (Optional[Dict[str, str]]): Optional CELLxGENE dataset metadata.
                 Supported keys are `dataset_id` and `dataset_version_id`.
+            store (Union[str, Store]): The rdflib store backing the graph, either a store plugin
+                name such as "BerkeleyDB" or "Oxigraph" or a Store instance. Defaults to rdflib's
+                in-memory store.
+            store_path (Optional[str]): The configuration string, typically a path, used to open a
+                persistent store. The store is created if it does not exist. Defaults to None.
+            batch_size (int): The number of generated triples inserted into the store at once.
+                Defaults to 10000.
+            census_version (Optional[str]): The Census release build recorded for the dataset.
+                Defaults to None, which resolves the "stable" release with
+                get_census_version_cached.
 
         """
         # TODO need to think about how to handle the requirement of enrichment and co_annotation_analysis methods
         self.ea = enrichment_analyzer
         if self.ea.analyzer_manager.report_df.empty:
+            from pandasaurus_cxg.anndata_analyzer import AnndataAnalyzer
+
             analysis_methods = [i for i in dir(AnndataAnalyzer) if "_report" in i]
             analysis_methods.sort()
             raise MissingAnalysisProcess(analysis_methods)
@@ -90,9 +158,29 @@ class GraphGenerator:
             else enrichment_analyzer.analyzer_manager.report_df
         )
         self.ns = Namespace("http://example.org/")
-        self.graph = Graph()
+        # a fixed graph name, so that a reopened persistent store holds the same graph
+        self.graph = Graph(store=store, identifier=self.ns["graph"])
+        if store_path:
+            self.graph.open(store_path, create=True)
+        self.batch_size = batch_size
+        self.census_version = census_version
         self.label_priority = None
         self.dataset_metadata = dataset_metadata
+        # (predicate, value) -> cluster resources, filled while the cluster resources are created
+        self._cluster_index: Dict[Tuple[URIRef, Any], List[URIRef]] = {}
+        self._dataset_seed_id = None
+        # a non-empty graph of a reopened persistent store was generated by an earlier instance
+        self._generation_complete = len(self.graph) != 0
+        # enrichment graph kept apart from the internal graph, see enrich_rdf_graph
+        self.enrichment_graph: Optional[Graph] = None
+        # source graphs and adjacency index of the last subgraph extraction
+        self._adjacency_index: Tuple[Tuple[Graph, ...], Optional[AdjacencyIndex]] = ((), None)
+        self._subgraph_renderer: Optional["SubgraphRenderer"] = None
+        self._property_index: Tuple[Tuple[Graph, ...], Optional[PropertyIndex]] = ((), None)
+        # sidecar table of the percentages added with PercentageMode.EDGE
+        self.metadata_percentages = pd.DataFrame(
+            columns=["cluster", "metadata", "target", "label", "percentage"]
+        )
         # TODO This part needs a better approach in the future
         self.graph.bind("ns", self.ns)
         self.graph.bind("obo", Namespace("http://purl.obolibrary.org/obo/"))
@@ -104,10 +192,29 @@ class GraphGenerator:
         Args:
             merge (bool): If True, combines cell cluster nodes with identical cell set memberships
                           to create a more concise graph representation. Defaults to False.
+
+        Raises:
+            OperationCancelled: If the generation is cancelled. The partially generated graph is
+                cleared, so that the generation can be retried.
         """
-        if len(self.graph) != 0:
+        if self._generation_complete:
+            if not self._cluster_index:
+                self._restore_generation_state()
             return
-
+        try:
+            self._generate_rdf_graph(merge)
+        except OperationCancelled:
+            if isinstance(self.graph, Graph):
+                self.graph.remove((None, None, None))
+                self.invalidate_indexes()
+            self._cluster_index = {}
+            self._dataset_seed_id = None
+            raise
+        self._generation_complete = True
+
+    @_graph_stage("graph_generator.generate_rdf_graph")
+    @_batched_graph_writes
+    def _generate_rdf_graph(self, merge: bool):
         # generate dataset entity and has_source property
         citation_dict = {}
         uns = self.ea.enricher_manager.anndata.uns
@@ -137,6 +244,7 @@ class GraphGenerator:
             # if citation_field_name doesn't exist we use random uuid as cxg_versioned_dataset_id
             dataset_seed_id = str(uuid.uuid4())
             dataset_class = URIRef(self.ns[dataset_seed_id])
+        self._dataset_seed_id = dataset_seed_id
         self.graph.add((dataset_class, RDF.type, URIRef(DATASET.get("iri"))))
         self.graph.add((dataset_class, RDFS.label, Literal(DATASET.get("label"))))
         for key, value in uns.items():
@@ -170,148 +278,220 @@ class GraphGenerator:
             (
                 dataset_class,
                 self.ns.census_version_cached,
-                Literal(get_census_version_cached()),
+                Literal(self.census_version or get_census_version_cached()),
             )
         )
         has_source = URIRef(HAS_SOURCE["iri"])
         self.graph.add((has_source, RDFS.label, Literal(HAS_SOURCE["label"])))
+        lap("dataset", self.graph)
 
         # preprocess for cell clusters
         column_group = ["field_name1", "value1"]
         df = self.df.sort_values(by=column_group).reset_index(drop=True)
         grouped_df = df.groupby(column_group)
         grouped_dict_uuid = {}
-        for (_, _), inner_dict in grouped_df:
-            temp_dict = {}
-            for inner_list in inner_dict.values.tolist():
-                # Initialize the base dictionary based on the current list
-                inner_dict_uuid = {inner_list[0]: inner_list[1], "cell_count": inner_list[5]}
-
-                # Update dictionary based on specific conditions
-                if inner_list[2] == "subcluster_of":
-                    inner_dict_uuid["subcluster_of"] = {inner_list[3]: inner_list[4]}
-                elif inner_list[2] == "cluster_matches":
-                    # Use different structures depending on the 'merge' flag
-                    update_value = (
-                        {inner_list[3]: inner_list[4]}
-                        if merge
-                        else {"cluster_matches": {inner_list[3]: inner_list[4]}}
-                    )
-                    inner_dict_uuid.update(update_value)
-
-                # Update temp_dict with inner_dict_uuid values
-                for key, value in inner_dict_uuid.items():
-                    if key not in temp_dict:
-                        temp_dict[key] = value
-                    else:
-                        temp_dict[key].update(value) if isinstance(
-                            temp_dict[key], dict
-                        ) else temp_dict.update({key: value})
-
-            if temp_dict not in grouped_dict_uuid.values():
-                grouped_dict_uuid[
-                    str(uuid.uuid5(uuid.UUID(dataset_seed_id), str(temp_dict)))
-                ] = temp_dict
+        seen_clusters = set()
+        grouping_progress = track(
+            "graph_generator.generate_rdf_graph/cluster_grouping", total=grouped_df.ngroups
+        )
+        with grouping_progress:
+            for (_, _), inner_dict in grouped_df:
+                temp_dict = {}
+                for inner_list in inner_dict.values.tolist():
+                    # Initialize the base dictionary based on the current list
+                    inner_dict_uuid = {inner_list[0]: inner_list[1], "cell_count": inner_list[5]}
+
+                    # Update dictionary based on specific conditions
+                    if inner_list[2] == "subcluster_of":
+                        inner_dict_uuid["subcluster_of"] = {inner_list[3]: inner_list[4]}
+                    elif inner_list[2] == "cluster_matches":
+                        # Use different structures depending on the 'merge' flag
+                        update_value = (
+                            {inner_list[3]: inner_list[4]}
+                            if merge
+                            else {"cluster_matches": {inner_list[3]: inner_list[4]}}
+                        )
+                        inner_dict_uuid.update(update_value)
+
+                    # Update temp_dict with inner_dict_uuid values
+                    for key, value in inner_dict_uuid.items():
+                        if key not in temp_dict:
+                            temp_dict[key] = value
+                        else:
+                            temp_dict[key].update(value) if isinstance(
+                                temp_dict[key], dict
+                            ) else temp_dict.update({key: value})
+
+                cluster_key = cluster_content_key(temp_dict)
+                if cluster_key not in seen_clusters:
+                    seen_clusters.add(cluster_key)
+                    grouped_dict_uuid[
+                        str(uuid.uuid5(uuid.UUID(dataset_seed_id), str(temp_dict)))
+                    ] = temp_dict
+                grouping_progress.advance()
+
+        lap("cluster_grouping", clusters=len(grouped_dict_uuid))
 
         # generate a resource for each free-text cell_type annotation and cell_type_ontology_term annotation
         cell_set_class = URIRef(CLUSTER.get("iri"))
         self.graph.add((cell_set_class, RDF.type, OWL.Class))
         self.graph.add((cell_set_class, RDFS.label, Literal(CLUSTER.get("label"))))
-        for _uuid, inner_dict in grouped_dict_uuid.items():
-            resource = self.ns[_uuid]
-            self.graph.add((resource, RDF.type, cell_set_class))
-            self.graph.add((resource, has_source, dataset_class))
-            author_fields = self._get_cluster_author_fields(inner_dict)
-            if author_fields:
-                author_label_column, author_synonym_columns = self._get_cluster_author_provenance(
-                    inner_dict
-                )
-                self.graph.add(
-                    (resource, self.ns.author_label_column, Literal(author_label_column))
-                )
-                if author_synonym_columns:
+        cluster_warnings = AggregatedWarnings(logger, "generate_rdf_graph")
+        cluster_progress = track(
+            "graph_generator.generate_rdf_graph/cluster_nodes", total=len(grouped_dict_uuid)
+        )
+        with cluster_progress:
+            for _uuid, inner_dict in grouped_dict_uuid.items():
+                resource = self.ns[_uuid]
+                self.graph.add((resource, RDF.type, cell_set_class))
+                self.graph.add((resource, has_source, dataset_class))
+                author_fields = self._get_cluster_author_fields(inner_dict)
+                if author_fields:
+                    (
+                        author_label_column,
+                        author_synonym_columns,
+                    ) = self._get_cluster_author_provenance(inner_dict)
                     self.graph.add(
-                        (
-                            resource,
-                            self.ns.author_synonym_columns,
-                            Literal(json.dumps(author_synonym_columns)),
-                        )
+                        (resource, self.ns.author_label_column, Literal(author_label_column))
                     )
-            else:
-                logger.warning(
-                    "Cluster %s has no author fields; omitting author provenance columns: %s",
-                    _uuid,
-                    inner_dict,
-                )
-            for k, v in inner_dict.items():
-                if k == "subcluster_of":
-                    continue
-                if k == "cluster_matches":
-                    for matched_key, matched_value in v.items():
-                        if matched_key == "cell_type":
-                            continue
+                    if author_synonym_columns:
                         self.graph.add(
                             (
                                 resource,
-                                self.ns[ncname_safe(matched_key)],
-                                Literal(matched_value),
+                                self.ns.author_synonym_columns,
+                                Literal(json.dumps(author_synonym_columns)),
                             )
                         )
-                    continue
-                self.graph.add((resource, self.ns[ncname_safe(k)], Literal(v)))
+                else:
+                    cluster_warnings.add(
+                        "Clusters without author fields; author provenance columns are omitted",
+                        {"cluster": _uuid, "content": inner_dict},
+                    )
+                for k, v in inner_dict.items():
+                    if k == "subcluster_of":
+                        continue
+                    if k == "cluster_matches":
+                        for matched_key, matched_value in v.items():
+                            if matched_key == "cell_type":
+                                continue
+                            self._add_cluster_literal(
+                                resource, self.ns[ncname_safe(matched_key)], matched_value
+                            )
+                        continue
+                    self._add_cluster_literal(resource, self.ns[ncname_safe(k)], v)
+                cluster_progress.advance()
+
+        cluster_warnings.flush()
+        lap("cluster_nodes", self.graph)
 
         # add relationship between each resource based on their predicate in the co_annotation_report
         subcluster = URIRef(SUBCLUSTER_OF.get("iri"))
         self.graph.add((subcluster, RDFS.label, Literal(SUBCLUSTER_OF.get("label"))))
         self.graph.add((subcluster, RDF.type, OWL.ObjectProperty))
-        for _uuid, inner_dict in grouped_dict_uuid.items():
-            resource = self.ns[_uuid]
-            # Define a mapping of inner keys to predicates and objects
-            key_predicate_map = {"subcluster_of": subcluster, "cluster_matches": OWL.sameAs}
-            # Iterate through the key-predicate map and apply the same logic for both keys
-            for key, predicate_object in key_predicate_map.items():
-                for ik, iv in inner_dict.get(key, {}).items():
-                    predicate = self.ns[ncname_safe(ik)]
-                    for s, _, _ in self.graph.triples((None, predicate, Literal(iv))):
-                        self.graph.add((resource, predicate_object, s))
+        # subcluster_of edges are collected on integer cluster ids so that only the
+        # transitively reduced edges are ever added to the graph
+        cluster_resources = [self.ns[_uuid] for _uuid in grouped_dict_uuid]
+        cluster_ids = {resource: i for i, resource in enumerate(cluster_resources)}
+        subcluster_edges = set()
+        linking_progress = track(
+            "graph_generator.generate_rdf_graph/linking", total=len(cluster_resources)
+        )
+        with linking_progress:
+            for resource, inner_dict in zip(cluster_resources, grouped_dict_uuid.values()):
+                for ik, iv in inner_dict.get("subcluster_of", {}).items():
+                    for s in self._cluster_index.get((self.ns[ncname_safe(ik)], iv), ()):
+                        subcluster_edges.add((cluster_ids[resource], cluster_ids[s]))
+                for ik, iv in inner_dict.get("cluster_matches", {}).items():
+                    for s in self._cluster_index.get((self.ns[ncname_safe(ik)], iv), ()):
+                        self.graph.add((resource, OWL.sameAs, s))
+                linking_progress.advance()
+
+        lap("linking", self.graph, subcluster_edges=len(subcluster_edges))
 
         # transitive reduction step
-        self.graph = graphgen.apply_transitive_reduction(self.graph, [subcluster.toPython()])
+        for u, v in transitive_reduction(subcluster_edges, len(cluster_resources)):
+            self.graph.add((cluster_resources[u], subcluster, cluster_resources[v]))
+        lap("transitive_reduction", self.graph)
 
         # add cell_type nodes and consists_of relations
         cl_namespace = Namespace(prefixes.get("CL"))
         consist_of = URIRef(CONSIST_OF.get("iri"))
         self.graph.add((consist_of, RDFS.label, Literal(CONSIST_OF.get("label"))))
-        for curie, label in self.ea.enricher_manager.seed_dict.items():
-            resource = cl_namespace[curie.split(":")[-1]]
-            self.graph.add((resource, RDFS.label, Literal(label)))
-            self.graph.add((resource, RDF.type, OWL.Class))
-            for s, _, _ in self.graph.triples((None, self.ns["cell_type"], Literal(label))):
-                # Add the triples to represent the restriction
-                class_expression_bnode = BNode()
-                self.graph.add((class_expression_bnode, RDF.type, OWL.Restriction))
-                # self.graph.add((class_expression_bnode, OWL.onProperty, self.ns["consist_of"]))
-                self.graph.add((class_expression_bnode, OWL.onProperty, consist_of))
-                self.graph.add((class_expression_bnode, OWL.someValuesFrom, resource))
-                # Add the restriction
-                self.graph.add((s, RDF.type, class_expression_bnode))
-
-    def enrich_rdf_graph(self):
+        seed_dict = self.ea.enricher_manager.seed_dict
+        consist_of_progress = track(
+            "graph_generator.generate_rdf_graph/consist_of", total=len(seed_dict)
+        )
+        with consist_of_progress:
+            for curie, label in seed_dict.items():
+                resource = cl_namespace[curie.split(":")[-1]]
+                self.graph.add((resource, RDFS.label, Literal(label)))
+                self.graph.add((resource, RDF.type, OWL.Class))
+                for s in self._cluster_index.get((self.ns["cell_type"], label), ()):
+                    # Add the triples to represent the restriction
+                    class_expression_bnode = BNode()
+                    self.graph.add((class_expression_bnode, RDF.type, OWL.Restriction))
+                    # self.graph.add((class_expression_bnode, OWL.onProperty, self.ns["consist_of"]))
+                    self.graph.add((class_expression_bnode, OWL.onProperty, consist_of))
+                    self.graph.add((class_expression_bnode, OWL.someValuesFrom, resource))
+                    # Add the restriction
+                    self.graph.add((s, RDF.type, class_expression_bnode))
+                consist_of_progress.advance()
+        lap("consist_of", self.graph)
+
+    @_graph_stage("graph_generator.enrich_rdf_graph")
+    def enrich_rdf_graph(self, copy_triples: bool = True, prune: bool = False):
         """
         Enrich RDF graph with enriched DataFrame from AnndataEnricher
 
+        Args:
+            copy_triples (bool): If True, the enrichment triples are copied into the internal graph.
+                If False, the enrichment graph is kept as a separate graph and get_rdf_graph returns
+                a read-only view over both graphs without copying. Defaults to True.
+            prune (bool): If True, only the enrichment terms reachable from the dataset's seed cell
+                types through subClassOf relations are kept. Defaults to False.
+
         Returns:
 
         """
         if self.ea.enricher_manager.enricher.enriched_df.empty:
             # TODO or we can just call simple_enrichment method
+            from pandasaurus_cxg.anndata_enricher import AnndataEnricher
+
             enrichment_methods = [i for i in dir(AnndataEnricher) if "_enrichment" in i]
             enrichment_methods.sort()
             raise MissingEnrichmentProcess(enrichment_methods)
-        # add enrichment graph, subClassOf relations
-        self.graph += self.ea.enricher_manager.enricher.graph
+        enrichment_graph = self.ea.enricher_manager.enricher.graph
+        if prune:
+            enrichment_graph = self._prune_enrichment_graph(enrichment_graph)
+        if copy_triples:
+            # add enrichment graph, subClassOf relations
+            self.graph += enrichment_graph
+        else:
+            self.enrichment_graph = enrichment_graph
+        self.invalidate_indexes()
 
-    def add_metadata_nodes(self, metadata_fields: List[str]):
+    def get_rdf_graph(self) -> Graph:
+        """
+        Returns the generated RDF graph together with the enrichment graph kept by
+        enrich_rdf_graph(copy_triples=False).
+
+        Returns:
+            The internal graph, or a read-only aggregate view over the internal graph and the
+            enrichment graph.
+
+        """
+        if self.enrichment_graph is None:
+            return self.graph
+        graph = ReadOnlyGraphAggregate([self.graph, self.enrichment_graph])
+        graph.namespace_manager = self.graph.namespace_manager
+        return graph
+
+    @_graph_stage("graph_generator.add_metadata_nodes")
+    def add_metadata_nodes(
+        self,
+        metadata_fields: List[str],
+        percentage_mode: Union[str, "PercentageMode"] = "axiom",
+    ):
         """
         Add metadata nodes to an RDF graph based on the specified metadata fields. Each node represents a metadata
         attribute, and edges connecting these metadata nodes to cell clusters indicate the percentage contribution
@@ -322,10 +502,25 @@ class GraphGenerator:
         Args:
             metadata_fields (List[str]): A list of metadata field names that exist in the schema and should be added
                                          to the RDF graph as nodes.
+            percentage_mode (Union[str, PercentageMode]): How the percentages are represented. "axiom" annotates
+                every cluster-metadata edge with an owl:Axiom carrying the percentage. "edge" only adds the
+                direct cluster-metadata edge and collects the percentages in the metadata_percentages
+                DataFrame. Defaults to "axiom".
 
         Returns:
 
+        Raises:
+            ValueError: If the provided percentage_mode is not valid.
+
         """
+        percentage_mode = PercentageMode(percentage_mode)
+        if not self._cluster_index and self._generation_complete and isinstance(self.graph, Graph):
+            # the graph was generated by another instance, e.g. into a reopened persistent store
+            self._restore_generation_state()
+        self._add_metadata_nodes(metadata_fields, percentage_mode)
+
+    @_batched_graph_writes
+    def _add_metadata_nodes(self, metadata_fields: List[str], percentage_mode: "PercentageMode"):
         obs = self.ea.enricher_manager.anndata.obs
         # metadata field validation
         # TODO schema should be involved
@@ -336,87 +531,531 @@ class GraphGenerator:
         author_cell_types = list(self.ea.analyzer_manager.all_cell_type_identifiers)
         # remove 'cell_type' from all_cell_type_identifiers
         author_cell_types.pop(-1)
+        author_cell_type_predicates = {
+            self.ns[a_cell_type]: a_cell_type for a_cell_type in author_cell_types
+        }
+        # cluster values are read from the cluster index, so this also works while streaming
+        author_cluster_values = {}
+        for (predicate, value), clusters in self._cluster_index.items():
+            a_cell_type = author_cell_type_predicates.get(predicate)
+            if a_cell_type is not None:
+                author_cluster_values.setdefault(a_cell_type, []).append((value, clusters))
         # add an annotation property for percentage
         percentage_annotation_property = self.ns["percentage"]
-        self.graph.add((percentage_annotation_property, RDF.type, OWL.AnnotationProperty))
-        for metadata in metadata_fields:
-            # Extract the ontology term ID mapping
-            ontology_term_id_mapping = (
-                obs[[metadata, f"{metadata}_ontology_term_id"]]
-                .drop_duplicates()
-                .set_index(metadata)
-                .to_dict()[f"{metadata}_ontology_term_id"]
+        if percentage_mode is PercentageMode.AXIOM:
+            self.graph.add((percentage_annotation_property, RDF.type, OWL.AnnotationProperty))
+        percentage_rows = []
+        metadata_progress = track(
+            "graph_generator.add_metadata_nodes",
+            total=len(metadata_fields) * sum(map(len, author_cluster_values.values())),
+        )
+        with metadata_progress:
+            for metadata in metadata_fields:
+                # Extract the ontology term ID mapping
+                ontology_term_id_mapping = (
+                    obs[[metadata, f"{metadata}_ontology_term_id"]]
+                    .drop_duplicates()
+                    .set_index(metadata)
+                    .to_dict()[f"{metadata}_ontology_term_id"]
+                )
+                # one target node per metadata label, shared by every cluster
+                metadata_targets = {}
+                for a_cell_type, cluster_values in author_cluster_values.items():
+                    # one crosstab per author field instead of filtering obs for every cluster
+                    percentages = self._get_metadata_percentages(obs, a_cell_type, metadata)
+                    for value, clusters in cluster_values:
+                        for s in clusters:
+                            for label, percentage in percentages.get(str(value), ()):
+                                annotated_target = metadata_targets.get(label)
+                                if annotated_target is None:
+                                    annotated_target = self._get_metadata_target(
+                                        metadata, label, ontology_term_id_mapping.get(label)
+                                    )
+                                    metadata_targets[label] = annotated_target
+                                    self.graph.add((annotated_target, RDFS.label, Literal(label)))
+                                    self.graph.add((annotated_target, RDF.type, OWL.Class))
+                                if percentage_mode is PercentageMode.EDGE:
+                                    self.graph.add((s, self.ns[metadata], annotated_target))
+                                    percentage_rows.append(
+                                        (
+                                            s,
+                                            metadata,
+                                            annotated_target,
+                                            label,
+                                            round(percentage, 2),
+                                        )
+                                    )
+                                    continue
+                                bnode_axiom = BNode()
+                                self.graph.add((bnode_axiom, RDF.type, OWL.Axiom))
+                                self.graph.add((bnode_axiom, OWL.annotatedSource, s))
+                                self.graph.add(
+                                    (bnode_axiom, OWL.annotatedProperty, self.ns[metadata])
+                                )
+                                self.graph.add((bnode_axiom, OWL.annotatedTarget, annotated_target))
+                                self.graph.add(
+                                    (
+                                        bnode_axiom,
+                                        percentage_annotation_property,
+                                        Literal("{:.2f}".format(percentage)),
+                                    )
+                                )
+                        metadata_progress.advance()
+        if percentage_rows:
+            percentages = pd.DataFrame(percentage_rows, columns=self.metadata_percentages.columns)
+            self.metadata_percentages = (
+                percentages
+                if self.metadata_percentages.empty
+                else pd.concat([self.metadata_percentages, percentages], ignore_index=True)
             )
 
-            for s, _, _ in self.graph.triples((None, RDF.type, URIRef(CLUSTER.get("iri")))):
-                for a_cell_type in author_cell_types:
-                    literal = self.graph.value(subject=s, predicate=self.ns[a_cell_type])
-                    if literal is None:
-                        continue
-                    percentages = (
-                        obs[obs[a_cell_type] == str(literal)][metadata].value_counts(normalize=True)
-                        * 100
-                    ).loc[lambda x: x != 0.0]
-
-                    for label, percentage in percentages.items():
-                        ontology_term_id = ontology_term_id_mapping.get(label)
-                        if isinstance(ontology_term_id, str) and ":" in ontology_term_id:
-                            ontology_term_id = ontology_term_id_mapping.get(label).split(":")
-                            annotated_target = Namespace(prefixes.get(ontology_term_id[0]))[
-                                ontology_term_id[-1]
-                            ]
-                        else:
-                            annotated_target = URIRef(self.ns[str(uuid.uuid4())])
-                        self.graph.add((annotated_target, RDFS.label, Literal(label)))
-                        self.graph.add((annotated_target, RDF.type, OWL.Class))
-                        bnode_axiom = BNode()
-                        self.graph.add((bnode_axiom, RDF.type, OWL.Axiom))
-                        self.graph.add((bnode_axiom, OWL.annotatedSource, s))
-                        self.graph.add((bnode_axiom, OWL.annotatedProperty, self.ns[metadata]))
-                        self.graph.add((bnode_axiom, OWL.annotatedTarget, annotated_target))
-                        self.graph.add(
-                            (
-                                bnode_axiom,
-                                percentage_annotation_property,
-                                Literal("{:.2f}".format(percentage)),
-                            )
-                        )
+    def close(self):
+        """
+        Closes the store backing the graph, which persists the graph of an on-disk store.
+        """
+        self.graph.close()
 
     def save_rdf_graph(
         self,
         graph: Optional[Graph] = None,
         file_name: Optional[str] = "mygraph",
         _format: Optional[str] = "xml",
-    ):
+        compression: Optional[str] = None,
+        shards: Optional[int] = None,
+        max_triples_per_shard: Optional[int] = None,
+    ) -> List[str]:
         """
         Serializes and saves the RDF graph to a file.
 
         Args:
             graph: An optional RDF graph that will be serialized.
                 If provided, this graph will be used for serialization.
-                If not provided, the graph inside the GraphGenerator instance will be used.
+                If not provided, the graph returned by get_rdf_graph will be used.
             file_name: The name of the output file without the extension.
                 Defaults to "mygraph".
-            _format: The format of the RDF serialization. Defaults to "xml".
+            _format: The format of the RDF serialization. Defaults to "xml". "nt" is the
+                fastest serializer for large graphs.
+            compression: Either "gzip" or "zstd", zstd requires the zstd extra.
+                Defaults to None.
+            shards: If provided, the graph is written as this number of N-Triples files in
+                parallel, e.g. for parallel loading into a triplestore. Only supported for the
+                "nt" format. Defaults to None.
+            max_triples_per_shard: If provided with shards, a shard rolls over to a new file once
+                it holds this many triples. Defaults to None.
+
+        Returns:
+            The paths of the written files.
 
         Raises:
             InvalidGraphFormat: If the provided _format is not valid.
+            ValueError: If the compression is not valid or shards is used with another format
+                than "nt".
 
         """
-        graph = graph if graph else self.graph
-        format_extension = {
-            RDFFormat.RDF_XML.value: "owl",
-            RDFFormat.TURTLE.value: "ttl",
-            RDFFormat.NTRIPLES.value: "nt",
-        }
-
+        graph = graph if graph else self.get_rdf_graph()
         if _format in format_extension:
             file_extension = format_extension[_format]
-            graph.serialize(f"{file_name}.{file_extension}", format=_format)
         else:
             valid_formats = [valid_format.value for valid_format in RDFFormat]
             raise InvalidGraphFormat(_format, valid_formats)
 
+        if shards and _format != RDFFormat.NTRIPLES.value:
+            raise ValueError("Sharded output is only supported for the nt format")
+        with stage("graph_generator.save_rdf_graph") as record:
+            record.count("triples", len(graph))
+            if shards:
+                return write_ntriples_shards(
+                    graph, file_name, shards, compression, max_triples_per_shard
+                )
+            path = f"{file_name}.{compressed_file_extension(file_extension, compression)}"
+            if compression is None:
+                graph.serialize(path, format=_format)
+            else:
+                with open_compressed(path, "wb", compression) as destination:
+                    graph.serialize(destination, format=_format, encoding="utf-8")
+        return [path]
+
+    def save_graph_snapshot(self, path: str = "mygraph.snapshot", graph: Optional[Graph] = None):
+        """
+        Saves the RDF graph as a binary snapshot, an interned term table plus integer triple arrays,
+        which loads much faster than a parsed RDF file.
+
+        Args:
+            path: The path of the snapshot directory. Defaults to "mygraph.snapshot".
+            graph: An optional RDF graph that will be saved. If not provided, the graph returned by
+                get_rdf_graph will be used.
+
+        """
+        graph = graph if graph else self.get_rdf_graph()
+        TripleTable.from_graph(graph).save(path)
+
+    @staticmethod
+    def load_graph_snapshot(path: str) -> Graph:
+        """
+        Loads a graph saved with save_graph_snapshot.
+
+        Args:
+            path: The path of the snapshot directory.
+
+        Returns:
+            The loaded graph.
+
+        """
+        graph = Graph()
+        graph.bind("ns", Namespace("http://example.org/"))
+        graph.bind("obo", Namespace("http://purl.obolibrary.org/obo/"))
+        return TripleTable.load(path).to_graph(graph)
+
+    def benchmark_serialization(
+        self,
+        graph: Optional[Graph] = None,
+        formats: Optional[List[str]] = None,
+        repeat: int = 3,
+    ) -> pd.DataFrame:
+        """
+        Measures the in-memory serialization throughput of the RDF graph for each RDFFormat.
+
+        Args:
+            graph: An optional RDF graph that will be serialized. If not provided, the graph
+                returned by get_rdf_graph will be used.
+            formats: The formats to compare. Defaults to every RDFFormat value.
+            repeat: The number of serializations per format, the fastest one is reported.
+                Defaults to 3.
+
+        Returns:
+            A DataFrame with the format, triple count, seconds, triples per second and output
+            size in bytes of each format, sorted from the fastest format.
+
+        """
+        graph = graph if graph else self.get_rdf_graph()
+        rows = []
+        for _format in formats or [valid_format.value for valid_format in RDFFormat]:
+            seconds = float("inf")
+            for _ in range(repeat):
+                output = io.BytesIO()
+                start = time.perf_counter()
+                graph.serialize(output, format=_format, encoding="utf-8")
+                seconds = min(seconds, time.perf_counter() - start)
+            rows.append(
+                {
+                    "format": _format,
+                    "triples": len(graph),
+                    "seconds": seconds,
+                    "triples_per_second": len(graph) / seconds if seconds else float("inf"),
+                    "bytes": output.getbuffer().nbytes,
+                }
+            )
+        return pd.DataFrame(rows).sort_values("seconds", ignore_index=True)
+
+    def stream_rdf_graph(
+        self,
+        file_name: Optional[str] = "mygraph",
+        _format: Optional[str] = "nt",
+        compress: Optional[bool] = False,
+        merge: bool = False,
+        metadata_fields: Optional[List[str]] = None,
+        percentage_mode: Union[str, "PercentageMode"] = "axiom",
+    ) -> str:
+        """
+        Generates the RDF graph straight into an N-Triples or N-Quads file without building the
+        in-memory graph. Cluster, relationship, consist_of and metadata triples are written in the
+        order they are generated, and the internal graph attribute is left untouched. An enrichment
+        graph kept apart by enrich_rdf_graph(copy_triples=False) is written after them.
+
+        Args:
+            file_name: The name of the output file without the extension. Defaults to "mygraph".
+            _format: The line-based serialization format, either "nt" or "nquads". Defaults to "nt".
+            compress: If True, the output file is gzip-compressed. Defaults to False.
+            merge (bool): If True, combines cell cluster nodes with identical cell set
+                memberships, as in generate_rdf_graph. Defaults to False.
+            metadata_fields (Optional[List[str]]): Metadata fields to add as in add_metadata_nodes.
+                Defaults to None.
+            percentage_mode (Union[str, PercentageMode]): The percentage representation used for
+                the metadata fields, see add_metadata_nodes. Defaults to "axiom".
+
+        Returns:
+            The path of the written file.
+
+        Raises:
+            InvalidGraphFormat: If the provided _format is not valid.
+
+        """
+        with TripleStreamWriter(file_name, _format, compress) as writer:
+            self._generate_into_sink(writer, merge, metadata_fields, percentage_mode)
+        return writer.path
+
+    def build_triple_table(
+        self,
+        merge: bool = False,
+        metadata_fields: Optional[List[str]] = None,
+        percentage_mode: Union[str, "PercentageMode"] = "axiom",
+    ) -> TripleTable:
+        """
+        Generates the RDF graph into a dictionary-encoded columnar TripleTable instead of the
+        in-memory graph. The table can be exported to Parquet, or converted to an rdflib graph on
+        demand. The internal graph attribute is left untouched.
+
+        Args:
+            merge (bool): If True, combines cell cluster nodes with identical cell set memberships,
+                as in generate_rdf_graph. Defaults to False.
+            metadata_fields (Optional[List[str]]): Metadata fields to add as in add_metadata_nodes.
+                Defaults to None.
+            percentage_mode (Union[str, PercentageMode]): The percentage representation used for
+                the metadata fields, see add_metadata_nodes. Defaults to "axiom".
+
+        Returns:
+            The table of the generated triples.
+
+        """
+        with TripleTable() as table:
+            self._generate_into_sink(table, merge, metadata_fields, percentage_mode)
+        return table
+
+    def _generate_into_sink(
+        self,
+        sink: TripleSink,
+        merge: bool,
+        metadata_fields: Optional[List[str]],
+        percentage_mode: Union[str, "PercentageMode"],
+    ):
+        state = self.graph, self._cluster_index, self._dataset_seed_id, self._generation_complete
+        self.graph, self._cluster_index, self._generation_complete = sink, {}, False
+        try:
+            self.generate_rdf_graph(merge)
+            if metadata_fields:
+                self.add_metadata_nodes(metadata_fields, percentage_mode)
+            if self.enrichment_graph is not None:
+                sink.add_all(self.enrichment_graph)
+        finally:
+            (
+                self.graph,
+                self._cluster_index,
+                self._dataset_seed_id,
+                self._generation_complete,
+            ) = state
+
+    def convert_rdf_stream(
+        self, source_path: str, file_name: Optional[str] = "mygraph", _format: Optional[str] = "xml"
+    ):
+        """
+        Converts a file written by stream_rdf_graph to one of the formats supported by
+        save_rdf_graph. The whole graph is loaded into memory for the conversion.
+
+        Args:
+            source_path: The path of the `.nt`, `.nq`, `.nt.gz` or `.nq.gz` file.
+            file_name: The name of the output file without the extension. Defaults to "mygraph".
+            _format: The format of the RDF serialization. Defaults to "xml".
+
+        Raises:
+            InvalidGraphFormat: If the source extension or the provided _format is not valid.
+
+        """
+        self.save_rdf_graph(load_rdf_stream(source_path), file_name, _format)
+
+    def invalidate_indexes(self):
+        """
+        Drops the cached adjacency and property indexes, so that they are rebuilt on their next use.
+
+        The GraphGenerator methods that change the graph call this themselves. Call it after
+        changing the graph directly, e.g. after replacing a triple, which keeps the graph size.
+        """
+        self._adjacency_index = ((), None)
+        self._property_index = ((), None)
+
+    def get_adjacency_index(self, graph: Optional[Graph] = None) -> AdjacencyIndex:
+        """
+        Returns the adjacency index of a graph. The index is cached and only rebuilt when another
+        graph is given, the graph has changed size or invalidate_indexes was called.
+
+        Args:
+            graph: An optional RDF graph. If not provided, the graph returned by get_rdf_graph will
+                be used.
+
+        Returns:
+            The forward and backward adjacency index of the graph.
+
+        """
+        graph = graph if graph is not None else self.get_rdf_graph()
+        sources = tuple(graph.graphs) if isinstance(graph, ReadOnlyGraphAggregate) else (graph,)
+        cached_sources, index = self._adjacency_index
+        if (
+            index is None
+            or len(cached_sources) != len(sources)
+            or any(cached is not source for cached, source in zip(cached_sources, sources))
+            or index.source_length != len(graph)
+        ):
+            index = AdjacencyIndex(graph)
+            self._adjacency_index = (sources, index)
+        return index
+
+    def get_property_index(self, graph: Optional[Graph] = None) -> PropertyIndex:
+        """
+        Returns the label and property value index of a graph. The index is built on first use,
+        cached, and rebuilt when another graph is given, the graph has changed size or
+        invalidate_indexes was called.
+
+        Args:
+            graph: An optional RDF graph. If not provided, the graph returned by get_rdf_graph will
+                be used.
+
+        Returns:
+            The inverted index from literal values to subjects.
+
+        """
+        graph = graph if graph is not None else self.get_rdf_graph()
+        sources = tuple(graph.graphs) if isinstance(graph, ReadOnlyGraphAggregate) else (graph,)
+        cached_sources, index = self._property_index
+        if (
+            index is None
+            or len(cached_sources) != len(sources)
+            or any(cached is not source for cached, source in zip(cached_sources, sources))
+            or index.source_length != len(graph)
+        ):
+            index = PropertyIndex(graph)
+            self._property_index = (sources, index)
+        return index
+
+    def find_nodes(
+        self, _property: str, value: str, ignore_case: bool = False, prefix: bool = False
+    ) -> List[str]:
+        """
+        Finds the nodes whose label or annotation has the given value, e.g. for search-as-you-type.
+
+        Args:
+            _property: Either "label" or the name of an annotation property, e.g. an author cell
+                type field.
+            value: The value to match.
+            ignore_case: If True, values are compared case-insensitively. Defaults to False.
+            prefix: If True, every value that starts with the given value matches.
+                Defaults to False.
+
+        Returns:
+            The IRIs of the matching nodes.
+
+        """
+        return self.get_property_index().select(_property, value, ignore_case, prefix)
+
+    def extract_subgraph(
+        self,
+        start_nodes: List[str],
+        predicate: Optional[str] = None,
+        bottom_up: bool = True,
+        graph: Optional[Graph] = None,
+    ) -> Graph:
+        """
+        Extracts the subgraph reachable from any of the start nodes with the cached adjacency index.
+
+        Args:
+            start_nodes: The IRIs of the nodes the traversal starts from.
+            predicate: The IRI of the predicate to follow. Defaults to None, which follows every
+                predicate.
+            bottom_up: If True, the traversal goes from subclusters up to their superclusters and
+                cell types, otherwise downwards. Defaults to True.
+            graph: An optional RDF graph. If not provided, the graph returned by get_rdf_graph will
+                be used.
+
+        Returns:
+            The extracted subgraph.
+
+        """
+        return self.get_adjacency_index(graph).generate_subgraph(
+            [URIRef(node) for node in start_nodes],
+            URIRef(predicate) if predicate else None,
+            bottom_up,
+        )
+
+    def render_subgraphs(
+        self,
+        start_nodes: Optional[List[Union[str, List[str]]]] = None,
+        node_selectors: Optional[List[Dict[str, str]]] = None,
+        output_dir: str = ".",
+        _format: str = "svg",
+        predicate: Optional[str] = None,
+        bottom_up: bool = True,
+        processes: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Renders the subgraphs of many start nodes to image files, e.g. for a report. Unlike
+        visualize_rdf_graph, no figure is shown, so no interactive Matplotlib backend is needed.
+
+        The transitive reduction is computed once for the whole graph, layouts are cached by
+        subgraph content across calls, and the figures are rendered in a process pool.
+
+        Args:
+            start_nodes: The start node IRIs of the figures. An item is either a single IRI or a list
+                of IRIs that are drawn in the same figure. Defaults to None.
+            node_selectors: Node selectors as described in visualize_rdf_graph. Every selector is
+                drawn as one figure of all the nodes it selects. Defaults to None.
+                If neither start_nodes nor node_selectors is provided, one figure is rendered for
+                every top-level cluster, i.e. every cluster that is not a subcluster.
+            output_dir: The directory the files are written to. Defaults to the working directory.
+            _format: One of "svg", "png" or "pdf". Defaults to "svg".
+            predicate: The predicate URI to visualize relationships. Defaults to None.
+            bottom_up: Determines the graph visualization approach. The default approach is
+                bottom-up (default=True). Set it to False for a top-down approach.
+            processes: The number of worker processes. Defaults to None, which uses one per CPU.
+                With 1, the figures are rendered in the calling process.
+
+        Returns:
+            The paths of the written files, one per figure.
+
+        Raises:
+            ValueError: If a node selector lacks the 'property' or 'value' key, if a start node does
+                not exist in the RDF graph, or if the provided _format is not valid.
+
+        """
+        from pandasaurus_cxg.graph_generator.subgraph_renderer import SubgraphRenderer
+
+        graph = self.get_rdf_graph()
+        index = self.get_adjacency_index(graph)
+        if self._subgraph_renderer is None or self._subgraph_renderer.index is not index:
+            self._subgraph_renderer = SubgraphRenderer(index)
+
+        root_sets = []
+        if start_nodes is None and node_selectors is None:
+            subcluster_of = URIRef(SUBCLUSTER_OF["iri"])
+            start_nodes = [
+                str(cluster)
+                for cluster in graph.subjects(RDF.type, URIRef(CLUSTER["iri"]))
+                if (cluster, subcluster_of, None) not in graph
+            ]
+        for nodes in start_nodes or []:
+            nodes = [nodes] if isinstance(nodes, str) else nodes
+            root_sets.append((re.split(r"[/#]", nodes[0])[-1] if nodes else "", nodes))
+        for node_selector in node_selectors or []:
+            if not {"property", "value"}.issubset(node_selector.keys()):
+                raise ValueError("node_selector must contain 'property' and 'value' keys")
+            nodes = select_node_with_property(
+                graph,
+                node_selector.get("property"),
+                node_selector.get("value"),
+                index=self.get_property_index(graph),
+            )
+            root_sets.append((node_selector.get("value"), nodes))
+
+        named_root_sets = {}
+        for name, nodes in root_sets:
+            for node in nodes:
+                if not URIRef(node) in index.outgoing:
+                    raise ValueError(
+                        f"None of the nodes in the list {node} exist in the RDF graph."
+                    )
+            name = ncname_safe(name) or "subgraph"
+            unique_name, suffix = name, 1
+            while unique_name in named_root_sets:
+                suffix += 1
+                unique_name = f"{name}_{suffix}"
+            named_root_sets[unique_name] = [URIRef(node) for node in nodes]
+
+        return self._subgraph_renderer.render(
+            named_root_sets,
+            output_dir,
+            _format,
+            URIRef(predicate) if predicate else None,
+            bottom_up,
+            processes,
+        )
+
     def visualize_rdf_graph(
         self,
         predicate: Optional[str] = None,
@@ -444,7 +1083,8 @@ class GraphGenerator:
 
                 - The 'property' key represents the property that will be queried.
                 - The 'value' key represents the desired property value to match.
-            file_path: Path to an RDF file in TTL format to load the graph from. Defaults to None.
+            file_path: Path to an RDF file in TTL format, or to a snapshot directory written by
+                save_graph_snapshot, to load the graph from. Defaults to None.
                 If provided, the graph will be loaded from this file. If empty, the method
                 will use the instance's 'graph' attribute.
             bottom_up: Determines the graph visualization approach. The default approach is
@@ -463,9 +1103,24 @@ class GraphGenerator:
               setting these parameters.
 
         """
+        import matplotlib.pyplot as plt
+
+        from pandasaurus_cxg.graph_generator.subgraph_renderer import (
+            build_visualization_graph,
+            draw_visualization_graph,
+            reduce_visualization_graph,
+        )
+
         # TODO visualize all graph, with parametric annotation properties to better visualize the nodes.
         # TODO apply redundancy striping to owl directly
-        graph = Graph().parse(file_path, format="ttl") if file_path else self.graph
+        if file_path:
+            graph = (
+                self.load_graph_snapshot(file_path)
+                if os.path.isdir(file_path)
+                else Graph().parse(file_path, format="ttl")
+            )
+        else:
+            graph = self.get_rdf_graph()
         if predicate and not graph.query(f"ASK {{ ?s {self.ns[predicate].n3()} ?o }}"):
             raise ValueError(f"The {self.ns[predicate]} relation does not exist in the graph")
         required_keys = {"property", "value"}
@@ -473,11 +1128,15 @@ class GraphGenerator:
             if not required_keys.issubset(node_selector.keys()):
                 raise ValueError("node_selector must contain 'property' and 'value' keys")
             start_node = select_node_with_property(
-                graph, node_selector.get("property"), node_selector.get("value")
+                graph,
+                node_selector.get("property"),
+                node_selector.get("value"),
+                index=self.get_property_index(graph),
             )
+        index = self.get_adjacency_index(graph)
         if start_node:
             for node in start_node:
-                if not URIRef(node) in graph.subjects():
+                if not URIRef(node) in index.outgoing:
                     raise ValueError(
                         f"None of the nodes in the list {node} exist in the RDF graph."
                     )
@@ -485,76 +1144,21 @@ class GraphGenerator:
         stack = [URIRef(node) for node in start_node] if start_node else None
         predicate_uri = URIRef(predicate) if predicate else None
 
-        subgraph = generate_subgraph(graph, predicate_uri, stack, bottom_up)
+        subgraph = generate_subgraph(graph, predicate_uri, stack, bottom_up, index)
 
         # TODO Discussion: Is it necessary to visualize a subgraph containing only the specified predicate if a start_node is not provided?
         if not start_node:
             subgraph = add_outgoing_edges_to_subgraph(graph, predicate_uri)
 
-        nx_graph = nx.DiGraph()
-        for s, p, o in subgraph:
-            if isinstance(o, URIRef) and p != RDF.type:
-                add_edge(nx_graph, s, p, o)
-            elif p == RDFS.label:
-                add_node(nx_graph, s, {"label": str(o)})
-            elif p == RDF.type:
-                add_node(nx_graph, s, {"type": str(o)})
-
-        # Identify and remove nodes without any edge
-        # cell cluster type generate a node independent of the whole graph. this fixes it
-        if len(nx_graph.nodes()) != 1:
-            nodes_to_remove = [
-                node for node, degree in dict(nx_graph.degree()).items() if degree == 0
-            ]
-            nx_graph.remove_nodes_from(nodes_to_remove)
-
         # Apply transitive reduction to remove redundancy
-        transitive_reduction_graph = nx.transitive_reduction(nx_graph)
-        transitive_reduction_graph.add_nodes_from(nx_graph.nodes(data=True))
-        transitive_reduction_graph.add_edges_from(
-            (u, v, nx_graph.edges[u, v]) for u, v in transitive_reduction_graph.edges
-        )
-
-        node_colors = []
-        # Get node colors based on node types
-        for node in transitive_reduction_graph.nodes:
-            node_colors.append(
-                colour_mapping.get(transitive_reduction_graph.nodes[node]["type"], "red")
-            )
-
+        transitive_reduction_graph = reduce_visualization_graph(build_visualization_graph(subgraph))
         pos = find_and_rotate_center_layout(transitive_reduction_graph)
         plt.figure(figsize=(10, 10))
-
         # Plot the graph as a hierarchical tree
-        node_labels = nx.get_node_attributes(transitive_reduction_graph, "label")
-        node_labels = {
-            node: "\n".join(textwrap.wrap(label, width=10)) for node, label in node_labels.items()
-        }
-        nx.draw(
-            transitive_reduction_graph,
-            pos,
-            with_labels=True,
-            labels=node_labels,
-            node_size=2000,
-            node_color=node_colors,
-            font_size=8,
-            font_weight="bold",
-        )
-        # Draw edge labels on the graph
-        edge_labels = nx.get_edge_attributes(transitive_reduction_graph, "label")
-        edge_labels = {
-            edge: "\n".join(textwrap.wrap(label, width=10)) for edge, label in edge_labels.items()
-        }
-        # edge_labels_formatted = {edge: label for edge, label in edge_labels.items()}
-        nx.draw_networkx_edge_labels(
-            transitive_reduction_graph,
-            pos,
-            edge_labels=edge_labels,
-            font_size=8,
-            font_color="red",
-        )
+        draw_visualization_graph(transitive_reduction_graph, pos, plt.gca())
         plt.show()
 
+    @_graph_stage("graph_generator.add_label_to_terms")
     def add_label_to_terms(self, graph_: Graph = None):
         if not self.label_priority:
             raise ValueError(
@@ -562,25 +1166,48 @@ class GraphGenerator:
             )
         graph = graph_ if graph_ else self.graph
         priority = self.label_priority
-        unique_subjects_query = (
-            "SELECT DISTINCT ?subject WHERE { ?subject ?predicate ?object FILTER (isIRI(?subject))}"
-        )
-        properties_query = prepareQuery(
-            "SELECT ?predicate ?object WHERE { ?subject ?predicate ?object. filter (isLiteral(?object) && ?predicate != rdfs:label)}"
+        # single pass over the literal triples of IRI subjects, keeping the best literal per subject
+        predicate_priority = {}
+        label_fields = {}
+        with track("graph_generator.add_label_to_terms", total=len(graph)) as progress:
+            for resource, predicate, object_ in graph:
+                progress.advance()
+                if (
+                    not isinstance(resource, URIRef)
+                    or not isinstance(object_, Literal)
+                    or predicate == RDFS.label
+                ):
+                    continue
+                priority_value = predicate_priority.get(predicate)
+                if priority_value is None:
+                    priority_value = priority.get(str(predicate).split("/")[-1], 0)
+                    predicate_priority[predicate] = priority_value
+                if priority_value > label_fields.get(resource, (None, 0))[1]:
+                    label_fields[resource] = (str(object_), priority_value)
+        graph.addN(
+            (resource, RDFS.label, Literal(label), graph)
+            for resource, (label, _) in label_fields.items()
+            if label
         )
-        for result in graph.query(unique_subjects_query):
-            resource = result.subject
-            label_field = (None, 0)
-            for properties_result in graph.query(
-                properties_query, initBindings={"subject": result.subject}, initNs={"rdfs": RDFS}
-            ):
-                predicate = properties_result.predicate
-                object_ = properties_result.object
-                priority_value = priority.get(str(predicate).split("/")[-1], 0)
-                if priority_value > label_field[1]:
-                    label_field = [str(object_), priority_value]
-            if label_field[0]:
-                graph.add((resource, RDFS.label, Literal(label_field[0])))
+        self.invalidate_indexes()
+
+    def _restore_generation_state(self):
+        # the graph was generated earlier, e.g. into a persistent store, so rebuild the cluster
+        # index and the dataset seed that generate_rdf_graph keeps in memory
+        for resource in self.graph.subjects(RDF.type, URIRef(CLUSTER.get("iri"))):
+            for predicate, object_ in self.graph.predicate_objects(resource):
+                if isinstance(object_, Literal):
+                    self._cluster_index.setdefault((predicate, object_.toPython()), []).append(
+                        resource
+                    )
+        dataset_class = next(self.graph.objects(predicate=URIRef(HAS_SOURCE["iri"])), None)
+        dataset_seed_ids = re.findall(r"[0-9a-f-]{36}", str(dataset_class))
+        if dataset_seed_ids:
+            self._dataset_seed_id = dataset_seed_ids[-1]
+
+    def _add_cluster_literal(self, resource: URIRef, predicate: URIRef, value: Any):
+        self.graph.add((resource, predicate, Literal(value)))
+        self._cluster_index.setdefault((predicate, value), []).append(resource)
 
     def _get_cluster_author_fields(self, cluster_dict: Dict[str, Union[str, Dict[str, str]]]) -> List[str]:
         author_fields = [
@@ -599,6 +1226,48 @@ class GraphGenerator:
             )
         return sorted(set(author_fields))
 
+    def _get_metadata_target(
+        self, metadata: str, label: Any, ontology_term_id: Optional[str]
+    ) -> URIRef:
+        if isinstance(ontology_term_id, str) and ":" in ontology_term_id:
+            ontology_term_id = ontology_term_id.split(":")
+            return Namespace(prefixes.get(ontology_term_id[0]))[ontology_term_id[-1]]
+        # labels without an ontology term get a stable id seeded like the cluster ids
+        return URIRef(
+            self.ns[str(uuid.uuid5(uuid.UUID(self._dataset_seed_id), f"{metadata}:{label}"))]
+        )
+
+    def _prune_enrichment_graph(self, enrichment_graph: Graph) -> Graph:
+        cl_namespace = Namespace(prefixes.get("CL"))
+        reachable = {
+            cl_namespace[curie.split(":")[-1]] for curie in self.ea.enricher_manager.seed_dict
+        }
+        superclasses = {}
+        for s, o in enrichment_graph.subject_objects(RDFS.subClassOf):
+            superclasses.setdefault(s, []).append(o)
+        frontier = list(reachable)
+        while frontier:
+            for parent in superclasses.get(frontier.pop(), ()):
+                if parent not in reachable:
+                    reachable.add(parent)
+                    frontier.append(parent)
+        pruned_graph = Graph()
+        for triple in enrichment_graph:
+            if triple[0] in reachable:
+                pruned_graph.add(triple)
+        return pruned_graph
+
+    @staticmethod
+    def _get_metadata_percentages(
+        obs: pd.DataFrame, author_field: str, metadata: str
+    ) -> Dict[Any, List[Tuple[Any, float]]]:
+        counts = pd.crosstab(obs[author_field], obs[metadata])
+        percentages = counts.div(counts.sum(axis=1), axis=0) * 100
+        return {
+            value: [(label, percentage) for label, percentage in row.items() if percentage != 0.0]
+            for value, row in zip(percentages.index, percentages.to_dict("records"))
+        }
+
     def _get_label_priority_mapping(self) -> Dict[str, int]:
         if self.label_priority:
             return self.label_priority
@@ -654,3 +1323,15 @@ class RDFFormat(Enum):
     RDF_XML = "xml"
     TURTLE = "ttl"
     NTRIPLES = "nt"
+
+
+format_extension = {
+    RDFFormat.RDF_XML.value: "owl",
+    RDFFormat.TURTLE.value: "ttl",
+    RDFFormat.NTRIPLES.value: "nt",
+}
+
+
+class PercentageMode(Enum):
+    AXIOM = "axiom"
+    EDGE = "edge"
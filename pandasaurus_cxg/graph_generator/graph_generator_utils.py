@@ -1,8 +1,27 @@
+import bisect
+import contextlib
+import json
+import os
 import re
-from typing import Dict, Optional
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-import networkx as nx
 from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.term import Node
+
+if TYPE_CHECKING:
+    import networkx as nx
 
 from pandasaurus_cxg.graph_generator.graph_predicates import (
     CLUSTER,
@@ -18,7 +37,7 @@ colour_mapping = {
 citation_field_name = "citation"
 
 
-def add_edge(nx_graph: nx.Graph, subject, predicate, obj):
+def add_edge(nx_graph: "nx.Graph", subject, predicate, obj):
     edge_data = {
         "label": (
             CONSIST_OF["label"]
@@ -39,7 +58,7 @@ def add_edge(nx_graph: nx.Graph, subject, predicate, obj):
     )
 
 
-def add_node(nx_graph: nx.Graph, subject, annotation):
+def add_node(nx_graph: "nx.Graph", subject, annotation):
     # nx_graph.add_node(str(subject), annotation=str(obj))
     nx_graph.add_node(str(subject), **annotation)
 
@@ -72,6 +91,8 @@ def find_and_rotate_center_layout(graph):
     Returns:
         dict: Rotated layout positions.
     """
+    import networkx as nx
+
     # Layout the graph as a hierarchical tree
     pos = nx.drawing.nx_agraph.graphviz_layout(graph, prog="dot")
     # Find the center of the layout
@@ -87,44 +108,253 @@ def find_and_rotate_center_layout(graph):
     return rotated_pos
 
 
-def generate_subgraph(graph, predicate_uri, stack, bottom_up):
-    subgraph = Graph()
-    visited = set()
-    while stack:
-        node = stack.pop()
-        if node not in visited:
+class AdjacencyIndex:
+    """
+    Forward and backward adjacency of an RDF graph, built in one pass over its triples.
+
+    Blank-node restrictions are resolved to their (subject, owl:onProperty, owl:someValuesFrom)
+    edge, so subgraph extraction is a pure in-memory traversal.
+    """
+
+    def __init__(self, graph: Graph):
+        self.source_length = len(graph)
+        self.outgoing: Dict[Node, List[Tuple[Node, Node]]] = {}
+        self.incoming: Dict[Node, List[Tuple[Node, Node]]] = {}
+        restriction_subjects, properties, fillers = {}, {}, {}
+        for s, p, o in graph:
+            self.outgoing.setdefault(s, []).append((p, o))
+            self.incoming.setdefault(o, []).append((s, p))
+            if p == RDF.type and isinstance(o, BNode):
+                restriction_subjects.setdefault(o, s)
+            elif p == OWL.onProperty:
+                properties.setdefault(s, o)
+            elif p == OWL.someValuesFrom:
+                fillers.setdefault(s, o)
+        self.restrictions: Dict[BNode, Tuple[Node, Node, Node]] = {
+            bnode: (subject, properties[bnode], fillers[bnode])
+            for bnode, subject in restriction_subjects.items()
+            if bnode in properties and bnode in fillers
+        }
+
+    def generate_subgraph(
+        self, roots: Iterable[Node], predicate_uri: Optional[URIRef] = None, bottom_up: bool = True
+    ) -> Graph:
+        """
+        Extract the subgraph reachable from any of the given roots.
+
+        Args:
+            roots: The nodes the traversal starts from.
+            predicate_uri: The predicate to follow. Defaults to None, which follows every predicate.
+            bottom_up: If True, the traversal follows the edges from subject to object, otherwise
+                from object to subject. Defaults to True.
+
+        Returns:
+            The subgraph with the literal and type triples of the visited nodes and the followed
+            edges, restrictions being replaced by their resolved edge.
+        """
+        subgraph = Graph()
+        stack = list(roots)
+        visited = set()
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
             visited.add(node)
-            for s, p, o in graph.triples((node, predicate_uri, None)):
+            outgoing = [
+                (p, o)
+                for p, o in self.outgoing.get(node, ())
+                if predicate_uri is None or p == predicate_uri
+            ]
+            for p, o in outgoing:
                 # Add all outgoing edges of the current node
                 if isinstance(o, Literal) or p == RDF.type and not isinstance(o, BNode):
-                    subgraph.add((s, p, o))
+                    subgraph.add((node, p, o))
             if bottom_up:
-                triples = graph.triples((node, predicate_uri, None))
+                triples = [(node, p, o) for p, o in outgoing]
             else:
-                triples = graph.triples((None, predicate_uri, node))
+                triples = [
+                    (s, p, node)
+                    for s, p in self.incoming.get(node, ())
+                    if predicate_uri is None or p == predicate_uri
+                ]
             for s, p, o in triples:
                 focused_node = o if bottom_up else s
                 if not isinstance(focused_node, BNode):
                     stack.append(focused_node)
                     subgraph.add((s, p, o))
-                else:
-                    _s = next(graph.subjects(RDF.type, focused_node))
-                    _p = next(graph.objects(focused_node, OWL.onProperty))
-                    _o = next(graph.objects(focused_node, OWL.someValuesFrom))
+                elif focused_node in self.restrictions:
+                    _s, _p, _o = self.restrictions[focused_node]
                     subgraph.add((_s, _p, _o))
-                    if bottom_up:
-                        stack.append(_o)
-                    else:
-                        stack.append(_s)
-    return subgraph
+                    stack.append(_o if bottom_up else _s)
+        return subgraph
+
+
+def generate_subgraph(
+    graph, predicate_uri, stack, bottom_up, index: Optional[AdjacencyIndex] = None
+):
+    index = index if index is not None else AdjacencyIndex(graph)
+    return index.generate_subgraph(stack or [], predicate_uri, bottom_up)
 
 
-def select_node_with_property(graph: Graph, _property: str, value: str):
-    ns = Namespace({k: v for k, v in graph.namespaces()}.get("ns"))
-    if _property == "label":
-        return [str(s) for s in graph.subjects(predicate=RDFS.label, object=Literal(value))]
-    else:
-        return [str(s) for s in graph.subjects(predicate=ns[_property], object=Literal(value))]
+class PropertyIndex:
+    """
+    Inverted index from the literal values of a graph to the subjects that have them.
+
+    Exact lookups are dictionary lookups. Case-insensitive and prefix lookups use a list of the
+    values of the queried property, sorted once on its first such lookup.
+    """
+
+    def __init__(self, graph: Graph):
+        self.source_length = len(graph)
+        self.ns = Namespace({k: v for k, v in graph.namespaces()}.get("ns"))
+        self._subjects: Dict[Tuple[Node, Literal], List[str]] = {}
+        self._values: Dict[Node, List[Tuple[Literal, str]]] = {}
+        self._sorted_values: Dict[Tuple[Node, bool], Tuple[List[str], List[str]]] = {}
+        for s, p, o in graph:
+            if isinstance(o, Literal):
+                self._subjects.setdefault((p, o), []).append(str(s))
+                self._values.setdefault(p, []).append((o, str(s)))
+
+    def predicate(self, _property: str) -> URIRef:
+        """
+        Returns the predicate of a property name, "label" being rdfs:label and any other name a
+        term of the graph's "ns" namespace.
+
+        Args:
+            _property: The property name.
+
+        Returns:
+            The IRI of the property.
+        """
+        return RDFS.label if _property == "label" else self.ns[_property]
+
+    def select(
+        self, _property: str, value: str, ignore_case: bool = False, prefix: bool = False
+    ) -> List[str]:
+        """
+        Returns the subjects whose property has the given value.
+
+        Args:
+            _property: The property name, "label" or a term of the graph's "ns" namespace.
+            value: The value to match.
+            ignore_case: If True, values are compared case-insensitively. Defaults to False.
+            prefix: If True, every value that starts with the given value matches.
+                Defaults to False.
+
+        Returns:
+            The IRIs of the matching subjects.
+        """
+        predicate = self.predicate(_property)
+        if not ignore_case and not prefix:
+            return list(self._subjects.get((predicate, Literal(value)), []))
+        if (predicate, ignore_case) not in self._sorted_values:
+            values = sorted(
+                (str(literal).casefold() if ignore_case else str(literal), subject)
+                for literal, subject in self._values.get(predicate, [])
+            )
+            self._sorted_values[predicate, ignore_case] = (
+                [key for key, _ in values],
+                [subject for _, subject in values],
+            )
+        keys, subjects = self._sorted_values[predicate, ignore_case]
+        value = value.casefold() if ignore_case else value
+        start = bisect.bisect_left(keys, value)
+        end = start
+        while end < len(keys) and (keys[end].startswith(value) if prefix else keys[end] == value):
+            end += 1
+        return list(dict.fromkeys(subjects[start:end]))
+
+
+def select_node_with_property(
+    graph: Graph,
+    _property: str,
+    value: str,
+    ignore_case: bool = False,
+    prefix: bool = False,
+    index: Optional[PropertyIndex] = None,
+):
+    if index is None and not ignore_case and not prefix:
+        # a single exact lookup is answered by the store's own indexes
+        ns = Namespace({k: v for k, v in graph.namespaces()}.get("ns"))
+        predicate = RDFS.label if _property == "label" else ns[_property]
+        return [str(s) for s in graph.subjects(predicate=predicate, object=Literal(value))]
+    index = index if index is not None else PropertyIndex(graph)
+    return index.select(_property, value, ignore_case, prefix)
+
+
+def cluster_content_key(cluster: Dict[str, Any]) -> Tuple:
+    """
+    Build a canonical, hashable key from the content of a cluster dictionary.
+
+    Nested dictionaries are converted recursively and keys are sorted, so two clusters with the
+    same content produce the same key regardless of their insertion order.
+
+    Args:
+        cluster: The cluster dictionary, as grouped from the co-annotation report.
+
+    Returns:
+        A tuple of sorted (key, value) pairs that can be used as a set member or dictionary key.
+    """
+    return tuple(
+        sorted(
+            (
+                (key, cluster_content_key(value) if isinstance(value, dict) else value)
+                for key, value in cluster.items()
+            ),
+            key=lambda item: item[0],
+        )
+    )
+
+
+def transitive_reduction(
+    edges: Iterable[Tuple[int, int]], node_count: int
+) -> List[Tuple[int, int]]:
+    """
+    Compute the transitive reduction of a DAG whose nodes are the integers 0..node_count-1.
+
+    Nodes are visited in reverse topological order while the descendants of every node are kept
+    as an integer bitset. An edge (u, v) is redundant if v is already a descendant of another
+    child of u.
+
+    Args:
+        edges: The (parent, child) edges of the graph.
+        node_count: The number of nodes in the graph.
+
+    Returns:
+        The sorted list of edges that remain after the transitive reduction.
+
+    Raises:
+        ValueError: If the graph contains a cycle.
+    """
+    successors = [[] for _ in range(node_count)]
+    in_degree = [0] * node_count
+    for u, v in set(edges):
+        successors[u].append(v)
+        in_degree[v] += 1
+
+    # Kahn's algorithm, the list is extended while it is iterated
+    topological_order = [node for node in range(node_count) if in_degree[node] == 0]
+    for node in topological_order:
+        for child in successors[node]:
+            in_degree[child] -= 1
+            if in_degree[child] == 0:
+                topological_order.append(child)
+    if len(topological_order) != node_count:
+        raise ValueError("Transitive reduction is only defined for directed acyclic graphs")
+
+    descendants = [0] * node_count
+    reduced_edges = []
+    for node in reversed(topological_order):
+        reachable_through_children = 0
+        for child in successors[node]:
+            reachable_through_children |= descendants[child]
+        for child in successors[node]:
+            if not (reachable_through_children >> child) & 1:
+                reduced_edges.append((node, child))
+        descendants[node] = reachable_through_children
+        for child in successors[node]:
+            descendants[node] |= 1 << child
+    return sorted(reduced_edges)
 
 
 def ncname_safe(term: str) -> str:
@@ -204,9 +434,151 @@ def extract_dataset_version_id(download_link: Optional[str]) -> Optional[str]:
     return match.group(1) if match else None
 
 
-def get_census_version_cached(requested_version: str = "stable") -> str:
-    """Resolve a Census version alias to its concrete release build."""
+def describe_census_version(requested_version: str) -> str:
+    """Resolve a Census version alias to its concrete release build with cellxgene_census."""
     import cellxgene_census
 
     version_info = cellxgene_census.get_census_version_description(requested_version)
     return version_info["release_build"]
+
+
+census_version_env = "PANDASAURUS_CXG_CENSUS_VERSION"
+cache_dir_env = "PANDASAURUS_CXG_CACHE_DIR"
+census_version_ttl = 24 * 60 * 60
+census_version_retry_ttl = 5 * 60
+
+_census_version_resolver: Callable[[str], str] = describe_census_version
+# alias -> (release build, cached at), plus the retry ttl of a fallback to an expired version
+_census_versions: Dict[str, Tuple] = {}
+_census_version_lock = threading.Lock()
+
+
+def set_census_version_resolver(resolver: Optional[Callable[[str], str]] = None):
+    """
+    Replaces the function that resolves a Census version alias, e.g. with a local stand-in in
+    tests and air-gapped runs. The in-process cache is cleared.
+
+    Args:
+        resolver: A function from a version alias such as "stable" to its release build.
+            Defaults to None, which restores describe_census_version.
+    """
+    global _census_version_resolver
+    with _census_version_lock:
+        _census_version_resolver = resolver or describe_census_version
+        _census_versions.clear()
+
+
+def census_version_cache_path(cache_dir: Optional[str] = None) -> str:
+    """
+    Returns the path of the on-disk Census version cache.
+
+    Args:
+        cache_dir: The cache directory. Defaults to the PANDASAURUS_CXG_CACHE_DIR environment
+            variable, or to pandasaurus_cxg in the user cache directory.
+
+    Returns:
+        The path of the JSON cache file.
+    """
+    cache_dir = (
+        cache_dir
+        or os.environ.get(cache_dir_env)
+        or os.path.join(
+            os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+            "pandasaurus_cxg",
+        )
+    )
+    return os.path.join(cache_dir, "census_version.json")
+
+
+def _read_census_version_cache(path: str) -> Dict[str, List]:
+    try:
+        with open(path, encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_census_version_fresh(cached: Optional[Sequence], ttl: float) -> bool:
+    return bool(cached) and time.time() - cached[1] < min((ttl, *cached[2:]))
+
+
+@contextlib.contextmanager
+def _census_version_file_lock(path: str):
+    # serializes the resolution across worker processes, where file locks are available
+    try:
+        import fcntl
+
+        lock_file = open(f"{path}.lock", "w")
+    except (ImportError, OSError):
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_census_version_cached(
+    requested_version: str = "stable",
+    version: Optional[str] = None,
+    ttl: float = census_version_ttl,
+    cache_dir: Optional[str] = None,
+    retry_ttl: float = census_version_retry_ttl,
+) -> str:
+    """
+    Resolve a Census version alias to its concrete release build.
+
+    The version is taken from, in order, the version argument, the PANDASAURUS_CXG_CENSUS_VERSION
+    environment variable, the in-process cache and the on-disk cache while they are younger than
+    ttl. Only then is the resolver called, by one thread and process at a time, and its result is
+    cached. If the resolver fails, e.g. offline, an expired cached version is returned instead and
+    cached for retry_ttl, so that the resolver is not called on every use until it recovers.
+
+    Args:
+        requested_version: The version alias. Defaults to "stable".
+        version: An explicit release build that is returned as is. Defaults to None.
+        ttl: The number of seconds a resolved version is cached. Defaults to one day.
+        cache_dir: The directory of the on-disk cache. Defaults to census_version_cache_path.
+        retry_ttl: The number of seconds an expired version is cached after the resolver failed.
+            Defaults to five minutes.
+
+    Returns:
+        The release build, e.g. "2025-11-08".
+    """
+    version = version or os.environ.get(census_version_env)
+    if version:
+        return version
+    cached = _census_versions.get(requested_version)
+    if _is_census_version_fresh(cached, ttl):
+        return cached[0]
+    with _census_version_lock:
+        cached = _census_versions.get(requested_version)
+        if _is_census_version_fresh(cached, ttl):
+            return cached[0]
+        path = census_version_cache_path(cache_dir)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        except OSError:
+            pass
+        with _census_version_file_lock(path):
+            cached = _read_census_version_cache(path).get(requested_version)
+            if not _is_census_version_fresh(cached, ttl):
+                try:
+                    cached = (_census_version_resolver(requested_version), time.time())
+                except Exception:
+                    if not cached:
+                        raise
+                    # keeps the expired version for a short while instead of retrying on every use
+                    cached = (cached[0], time.time(), retry_ttl)
+                cache = _read_census_version_cache(path)
+                cache[requested_version] = cached
+                try:
+                    with open(f"{path}.tmp", "w", encoding="utf-8") as cache_file:
+                        json.dump(cache, cache_file)
+                    os.replace(f"{path}.tmp", path)
+                except OSError:
+                    pass
+        _census_versions[requested_version] = tuple(cached)
+        return cached[0]
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import networkx as nx
+from matplotlib.axes import Axes
+from rdflib import RDF, RDFS, BNode, Graph, URIRef
+
+from pandasaurus_cxg.graph_generator.graph_generator_utils import (
+    AdjacencyIndex,
+    add_edge,
+    add_node,
+    colour_mapping,
+    find_and_rotate_center_layout,
+    transitive_reduction,
+)
+
+render_formats = ("svg", "png", "pdf")
+
+
+def build_visualization_graph(subgraph: Graph) -> nx.DiGraph:
+    """
+    Converts an RDF subgraph to the NetworkX graph that is drawn by the visualizations.
+
+    Args:
+        subgraph: The RDF subgraph, e.g. extracted with AdjacencyIndex.generate_subgraph.
+
+    Returns:
+        A directed graph of the IRI edges, with the labels and types of the nodes as attributes.
+
+    """
+    nx_graph = nx.DiGraph()
+    for s, p, o in subgraph:
+        if isinstance(o, URIRef) and p != RDF.type:
+            add_edge(nx_graph, s, p, o)
+        elif p == RDFS.label:
+            add_node(nx_graph, s, {"label": str(o)})
+        elif p == RDF.type:
+            add_node(nx_graph, s, {"type": str(o)})
+
+    # Identify and remove nodes without any edge
+    # cell cluster type generate a node independent of the whole graph. this fixes it
+    if len(nx_graph.nodes()) != 1:
+        nodes_to_remove = [node for node, degree in dict(nx_graph.degree()).items() if degree == 0]
+        nx_graph.remove_nodes_from(nodes_to_remove)
+    return nx_graph
+
+
+def reduce_visualization_graph(
+    nx_graph: nx.DiGraph, reduced_edges: Optional[Set[Tuple[str, str]]] = None
+) -> nx.DiGraph:
+    """
+    Removes the redundant edges of a visualization graph, keeping the node and edge attributes.
+
+    Args:
+        nx_graph: The graph returned by build_visualization_graph.
+        reduced_edges: The edges of the transitive reduction of a graph that nx_graph is a closed
+            subgraph of. Defaults to None, which computes the transitive reduction of nx_graph.
+
+    Returns:
+        The transitive reduction of nx_graph.
+
+    """
+    if reduced_edges is not None:
+        reduced_graph = nx_graph.copy()
+        reduced_graph.remove_edges_from(
+            [edge for edge in nx_graph.edges if edge not in reduced_edges]
+        )
+        return reduced_graph
+    reduced_graph = nx.transitive_reduction(nx_graph)
+    reduced_graph.add_nodes_from(nx_graph.nodes(data=True))
+    reduced_graph.add_edges_from((u, v, nx_graph.edges[u, v]) for u, v in reduced_graph.edges)
+    return reduced_graph
+
+
+def draw_visualization_graph(nx_graph: nx.DiGraph, pos: Dict[str, Tuple[float, float]], ax: Axes):
+    """
+    Draws a visualization graph as a hierarchical tree on the given axes.
+
+    Args:
+        nx_graph: The graph to draw.
+        pos: The positions of the nodes, e.g. from find_and_rotate_center_layout.
+        ax: The Matplotlib axes to draw on.
+
+    """
+    # Get node colors based on node types
+    node_colors = [
+        colour_mapping.get(nx_graph.nodes[node].get("type"), "red") for node in nx_graph.nodes
+    ]
+    node_labels = nx.get_node_attributes(nx_graph, "label")
+    node_labels = {
+        node: "\n".join(textwrap.wrap(label, width=10)) for node, label in node_labels.items()
+    }
+    nx.draw(
+        nx_graph,
+        pos,
+        ax=ax,
+        with_labels=True,
+        labels=node_labels,
+        node_size=2000,
+        node_color=node_colors,
+        font_size=8,
+        font_weight="bold",
+    )
+    # Draw edge labels on the graph
+    edge_labels = nx.get_edge_attributes(nx_graph, "label")
+    edge_labels = {
+        edge: "\n".join(textwrap.wrap(label, width=10)) for edge, label in edge_labels.items()
+    }
+    nx.draw_networkx_edge_labels(
+        nx_graph, pos, ax=ax, edge_labels=edge_labels, font_size=8, font_color="red"
+    )
+
+
+def subgraph_key(nx_graph: nx.DiGraph) -> str:
+    """
+    Hashes the nodes, edges and attributes of a visualization graph, e.g. to cache its layout.
+
+    Args:
+        nx_graph: The visualization graph.
+
+    Returns:
+        The hex digest of the graph content.
+
+    """
+    content = json.dumps(
+        [sorted(nx_graph.nodes(data=True)), sorted(nx_graph.edges(data=True))], sort_keys=True
+    )
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+def _render_figure(
+    nx_graph: nx.DiGraph, pos: Dict[str, Tuple[float, float]], path: str, _format: str
+) -> str:
+    from matplotlib.figure import Figure
+
+    # a bare Figure is not registered with pyplot, so no interactive backend is involved
+    figure = Figure(figsize=(10, 10))
+    draw_visualization_graph(nx_graph, pos, figure.add_subplot())
+    figure.savefig(path, format=_format)
+    return path
+
+
+class SubgraphRenderer:
+    """
+    Renders many subgraphs of one RDF graph to image files without an interactive backend.
+
+    The transitive reduction of the graph is computed once per predicate and shared by every
+    subgraph, layouts are cached by subgraph content, and figures are laid out and rendered in a
+    process pool.
+    """
+
+    def __init__(self, index: AdjacencyIndex):
+        """
+        Initializes SubgraphRenderer instance.
+
+        Args:
+            index: The adjacency index of the graph to render.
+
+        """
+        self.index = index
+        self._reduced_edges: Dict[Optional[URIRef], Optional[Set[Tuple[str, str]]]] = {}
+        self._layouts: Dict[str, Dict[str, Tuple[float, float]]] = {}
+
+    def reduced_edges(
+        self, predicate_uri: Optional[URIRef] = None
+    ) -> Optional[Set[Tuple[str, str]]]:
+        """
+        Returns the edges of the transitive reduction of every edge a subgraph can contain.
+
+        The subgraphs extracted from the index are closed under the followed edges, so the
+        transitive reduction of a subgraph is the restriction of this reduction to its nodes.
+
+        Args:
+            predicate_uri: The predicate the subgraphs follow. Defaults to None, which follows every
+                predicate.
+
+        Returns:
+            The reduced (subject, object) edges, or None if the graph has a cycle and every subgraph
+            has to be reduced on its own.
+
+        """
+        if predicate_uri not in self._reduced_edges:
+            edges = set()
+            for s, targets in self.index.outgoing.items():
+                if isinstance(s, BNode):
+                    continue
+                for p, o in targets:
+                    if predicate_uri is not None and p != predicate_uri:
+                        continue
+                    if isinstance(o, BNode):
+                        restriction_subject, _, restriction_filler = self.index.restrictions.get(
+                            o, (None, None, None)
+                        )
+                        if isinstance(restriction_filler, URIRef):
+                            edges.add((str(restriction_subject), str(restriction_filler)))
+                    elif isinstance(o, URIRef) and p != RDF.type:
+                        edges.add((str(s), str(o)))
+            nodes = sorted({node for edge in edges for node in edge})
+            node_ids = {node: node_id for node_id, node in enumerate(nodes)}
+            try:
+                reduced_edges = {
+                    (nodes[u], nodes[v])
+                    for u, v in transitive_reduction(
+                        ((node_ids[s], node_ids[o]) for s, o in edges), len(nodes)
+                    )
+                }
+            except ValueError:
+                reduced_edges = None
+            self._reduced_edges[predicate_uri] = reduced_edges
+        return self._reduced_edges[predicate_uri]
+
+    def visualization_graph(
+        self,
+        roots: Sequence[URIRef],
+        predicate_uri: Optional[URIRef] = None,
+        bottom_up: bool = True,
+    ) -> nx.DiGraph:
+        """
+        Extracts the subgraph of the given roots and returns its reduced visualization graph.
+
+        Args:
+            roots: The nodes the subgraph is extracted from.
+            predicate_uri: The predicate to follow. Defaults to None, which follows every predicate.
+            bottom_up: If True, the subgraph is extracted bottom-up, otherwise top-down.
+                Defaults to True.
+
+        Returns:
+            The transitive reduction of the visualization graph of the subgraph.
+
+        """
+        nx_graph = build_visualization_graph(
+            self.index.generate_subgraph(roots, predicate_uri, bottom_up)
+        )
+        return reduce_visualization_graph(nx_graph, self.reduced_edges(predicate_uri))
+
+    def render(
+        self,
+        root_sets: Dict[str, Sequence[URIRef]],
+        output_dir: str = ".",
+        _format: str = "svg",
+        predicate_uri: Optional[URIRef] = None,
+        bottom_up: bool = True,
+        processes: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Renders one figure per set of roots.
+
+        Args:
+            root_sets: The roots of every figure, by the name of its file without the extension.
+            output_dir: The directory the files are written to. Defaults to the working directory.
+            _format: One of "svg", "png" or "pdf". Defaults to "svg".
+            predicate_uri: The predicate to follow. Defaults to None, which follows every predicate.
+            bottom_up: If True, the subgraphs are extracted bottom-up, otherwise top-down.
+                Defaults to True.
+            processes: The number of worker processes. Defaults to None, which uses one per CPU.
+                With 1, the figures are rendered in the calling process.
+
+        Returns:
+            The paths of the written files, in the order of root_sets.
+
+        Raises:
+            ValueError: If the provided _format is not valid.
+
+        """
+        if _format not in render_formats:
+            raise ValueError(
+                f"Invalid format: {_format}. Please use one of {', '.join(render_formats)}"
+            )
+        os.makedirs(output_dir, exist_ok=True)
+        paths, nx_graphs, keys = [], [], []
+        for name, roots in root_sets.items():
+            nx_graph = self.visualization_graph(roots, predicate_uri, bottom_up)
+            paths.append(os.path.join(output_dir, f"{name}.{_format}"))
+            nx_graphs.append(nx_graph)
+            keys.append(subgraph_key(nx_graph))
+
+        missing_layouts = {
+            key: nx_graph for key, nx_graph in zip(keys, nx_graphs) if key not in self._layouts
+        }
+        if processes == 1:
+            self._layouts.update(
+                zip(missing_layouts, map(find_and_rotate_center_layout, missing_layouts.values()))
+            )
+            return [
+                _render_figure(nx_graph, self._layouts[key], path, _format)
+                for nx_graph, key, path in zip(nx_graphs, keys, paths)
+            ]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            self._layouts.update(
+                zip(
+                    missing_layouts,
+                    executor.map(find_and_rotate_center_layout, missing_layouts.values()),
+                )
+            )
+            return list(
+                executor.map(
+                    _render_figure,
+                    nx_graphs,
+                    [self._layouts[key] for key in keys],
+                    paths,
+                    [_format] * len(paths),
+                )
+            )
@@ -0,0 +1,405 @@
+import gzip
+import queue
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Dict, Iterable, List, Optional, Tuple, Union
+
+from rdflib import BNode, ConjunctiveGraph, Graph, Literal, URIRef
+from rdflib.term import Node
+
+from pandasaurus_cxg.utils.exceptions import (
+    InvalidGraphFormat,
+    MissingOptionalDependency,
+)
+
+stream_format_extension = {"nt": "nt", "nquads": "nq"}
+compression_extension = {"gzip": "gz", "zstd": "zst"}
+# the number of triples handed to a shard writer at once, and the batches a shard may have queued
+shard_batch_size = 1000
+shard_queue_size = 16
+_literal_escapes = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r"})
+
+
+def compressed_file_extension(extension: str, compression: Optional[str] = None) -> str:
+    """
+    Appends the extension of the given compression to a file extension.
+
+    Args:
+        extension: The file extension without the compression, e.g. "nt".
+        compression: Either "gzip" or "zstd". Defaults to None, which keeps the extension.
+
+    Returns:
+        The file extension, e.g. "nt.gz".
+
+    Raises:
+        ValueError: If the provided compression is not valid.
+
+    """
+    if compression is None:
+        return extension
+    if compression not in compression_extension:
+        raise ValueError(
+            f"Invalid compression: {compression}. "
+            f"Please use one of {', '.join(compression_extension)}"
+        )
+    return f"{extension}.{compression_extension[compression]}"
+
+
+def open_compressed(path: str, mode: str = "rb", compression: Optional[str] = None) -> IO:
+    """
+    Opens a file, compressing or decompressing it on the fly.
+
+    Args:
+        path: The path of the file.
+        mode: The file mode, e.g. "rb", "wb" or "wt". Defaults to "rb".
+        compression: Either "gzip" or "zstd". Defaults to None, which opens an uncompressed file.
+            zstd requires the zstd extra.
+
+    Returns:
+        The file object.
+
+    Raises:
+        ValueError: If the provided compression is not valid.
+        MissingOptionalDependency: If zstd is used without the zstandard package.
+
+    """
+    compressed_file_extension("", compression)
+    encoding = "utf-8" if "t" in mode else None
+    if compression == "gzip":
+        return gzip.open(path, mode, encoding=encoding)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise MissingOptionalDependency("zstandard", "zstd") from e
+
+        return zstandard.open(path, mode, encoding=encoding)
+    return open(path, mode, encoding=encoding)
+
+
+def _ntriples_term(term: Node) -> str:
+    if isinstance(term, Literal):
+        lexical = f'"{str(term).translate(_literal_escapes)}"'
+        if term.language:
+            return f"{lexical}@{term.language}"
+        if term.datatype:
+            return f"{lexical}^^<{term.datatype}>"
+        return lexical
+    return term.n3()
+
+
+class TripleSink:
+    """
+    Base class of the objects that stand in for an rdflib Graph while triples are generated.
+
+    A sink exposes the `add` method of an rdflib Graph and counts the triples it receives.
+    """
+
+    def __init__(self):
+        self._count = 0
+
+    def add(self, triple: Tuple):
+        raise NotImplementedError
+
+    def add_all(self, triples: Iterable[Tuple]):
+        """
+        Adds every triple of the given iterable, e.g. an rdflib Graph, to the sink.
+
+        Args:
+            triples: The (subject, predicate, object) triples.
+
+        """
+        for triple in triples:
+            self.add(triple)
+
+    def close(self):
+        pass
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GraphBatchWriter(TripleSink):
+    """
+    Buffers triples and inserts them into a graph in batches with `Graph.addN`.
+
+    Stores with a bulk insert path, such as on-disk or SQL-backed rdflib stores, write a batch in
+    one call instead of one call per triple.
+    """
+
+    def __init__(self, graph: Graph, batch_size: int = 10000):
+        """
+        Initializes GraphBatchWriter instance.
+
+        Args:
+            graph: The graph the triples are inserted into.
+            batch_size: The number of triples buffered before they are inserted. Defaults to 10000.
+
+        """
+        super().__init__()
+        self.graph = graph
+        self.batch_size = batch_size
+        self._batch = []
+
+    def add(self, triple: Tuple):
+        """
+        Buffers a single triple and inserts the buffer once it reaches batch_size triples.
+
+        Args:
+            triple: The (subject, predicate, object) triple.
+
+        """
+        self._batch.append((*triple, self.graph))
+        self._count += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Inserts the buffered triples into the graph."""
+        if self._batch:
+            self.graph.addN(self._batch)
+            self._batch = []
+
+    def discard(self):
+        """Drops the buffered triples without inserting them, e.g. when an operation is cancelled."""
+        self._batch = []
+
+    def close(self):
+        self.flush()
+
+
+class TripleStreamWriter(TripleSink):
+    """
+    Writes triples straight to an N-Triples or N-Quads file, in the order they are added.
+
+    The writer can stand in for the in-memory graph while triples are generated. Nothing is kept in
+    memory apart from the number of written triples.
+    """
+
+    def __init__(
+        self,
+        file_name: str = "mygraph",
+        _format: str = "nt",
+        compress: Union[bool, str] = False,
+        context: Optional[URIRef] = None,
+    ):
+        """
+        Initializes TripleStreamWriter instance and opens the output file.
+
+        Args:
+            file_name: The name of the output file without the extension. Defaults to "mygraph".
+            _format: The line-based serialization format, either "nt" or "nquads". Defaults to "nt".
+            compress: If True or "gzip", the output file is gzip-compressed and `.gz` is appended to
+                its name. "zstd" compresses it with zstandard, from the zstd extra, and appends `.zst`.
+                Defaults to False.
+            context: The graph name written as the fourth term of every quad. It is only used with
+                the "nquads" format. Defaults to None, which writes the triples to the default
+                graph.
+
+        Raises:
+            InvalidGraphFormat: If the provided _format is not valid.
+            ValueError: If the provided compression is not valid.
+
+        """
+        super().__init__()
+        if _format not in stream_format_extension:
+            raise InvalidGraphFormat(_format, list(stream_format_extension))
+        compression = "gzip" if compress is True else compress or None
+        self.path = f"{file_name}." + compressed_file_extension(
+            stream_format_extension[_format], compression
+        )
+        self._suffix = " ." if context is None or _format != "nquads" else f" {context.n3()} ."
+        self._file: IO[str] = open_compressed(self.path, "wt", compression)
+
+    def add(self, triple: Tuple):
+        """
+        Writes a single triple to the output file.
+
+        Args:
+            triple: The (subject, predicate, object) triple.
+
+        """
+        s, p, o = triple
+        self._file.write(
+            f"{_ntriples_term(s)} {_ntriples_term(p)} {_ntriples_term(o)}{self._suffix}\n"
+        )
+        self._count += 1
+
+    def close(self):
+        self._file.close()
+
+
+def load_rdf_stream(path: str) -> Graph:
+    """
+    Loads an N-Triples or N-Quads file written by TripleStreamWriter into an in-memory graph.
+
+    The format is taken from the file extension, and `.gz` and `.zst` files are decompressed on the
+    fly. Graph names of N-Quads files are dropped, so that the result can be serialized to any
+    RDFFormat.
+
+    Args:
+        path: The path of the `.nt` or `.nq` file, optionally followed by `.gz` or `.zst`.
+
+    Returns:
+        The graph that contains every triple of the file.
+
+    Raises:
+        InvalidGraphFormat: If the file extension is not a valid stream format.
+
+    """
+    compressions = {
+        extension: compression for compression, extension in compression_extension.items()
+    }
+    name, extension = path.rsplit(".", 1) if "." in path else (path, "")
+    compression = compressions.get(extension)
+    if compression:
+        extension = name.rsplit(".", 1)[-1]
+    formats = {extension: _format for _format, extension in stream_format_extension.items()}
+    if extension not in formats:
+        raise InvalidGraphFormat(extension, list(formats))
+
+    graph = Graph()
+    with open_compressed(path, "rb", compression) as source:
+        if formats[extension] == "nquads":
+            conjunctive_graph = ConjunctiveGraph()
+            conjunctive_graph.parse(source=source, format="nquads")
+            for triple in conjunctive_graph.triples((None, None, None)):
+                graph.add(triple)
+        else:
+            graph.parse(source=source, format="nt")
+    return graph
+
+
+def write_ntriples_shards(
+    graph: Graph,
+    file_name: str,
+    shards: int,
+    compression: Optional[str] = None,
+    max_triples_per_shard: Optional[int] = None,
+) -> List[str]:
+    """
+    Writes a graph as a number of N-Triples files, e.g. for parallel triplestore loads.
+
+    The graph is partitioned in a single pass that hands the triples of every shard to its own
+    writer thread, so the serialization to and compression of the shard files overlap with the
+    pass. The triples without blank nodes are spread over the shards by subject and streamed.
+    Blank node labels are local to an N-Triples document, so the triples that use a blank node are
+    buffered in memory until the pass is complete, and the triples connected through blank nodes
+    are then written to the same file.
+
+    Args:
+        graph: The graph to write.
+        file_name: The name of the output files without the shard number and extension.
+        shards: The number of shards, each written by its own thread.
+        compression: Either "gzip" or "zstd", zstd requires the zstd extra. Defaults to None.
+        max_triples_per_shard: If provided, a shard rolls over to a new file once it holds this
+            many triples, and the file names get a part number, e.g. `-0000-of-0004-0001.nt`.
+            Triples connected through blank nodes are never split, so a file can exceed the limit
+            by the size of such a group. Defaults to None, which writes one file per shard.
+
+    Returns:
+        The paths of the written files, ordered by shard and part.
+
+    Raises:
+        ValueError: If shards or max_triples_per_shard is not positive or the provided compression
+            is not valid.
+
+    """
+    if shards < 1:
+        raise ValueError("The number of shards must be positive")
+    if max_triples_per_shard is not None and max_triples_per_shard < 1:
+        raise ValueError("The maximum number of triples per shard must be positive")
+    compressed_file_extension("nt", compression)
+    # a (triples, grouped) batch per queue item, the triples of a grouped batch share a file
+    queues = [queue.Queue(maxsize=shard_queue_size) for _ in range(shards)]
+
+    def write_shard(i: int) -> List[str]:
+        name = f"{file_name}-{i:04d}-of-{shards:04d}"
+        paths = []
+        writer = None
+
+        def writer_for(group_size: int) -> TripleStreamWriter:
+            nonlocal writer
+            full = (
+                max_triples_per_shard is not None
+                and writer is not None
+                and len(writer) != 0
+                and len(writer) + group_size > max_triples_per_shard
+            )
+            if writer is None or full:
+                if writer is not None:
+                    writer.close()
+                part = f"-{len(paths):04d}" if max_triples_per_shard is not None else ""
+                writer = TripleStreamWriter(f"{name}{part}", "nt", compression or False)
+                paths.append(writer.path)
+            return writer
+
+        try:
+            writer_for(0)
+            for triples, grouped in iter(queues[i].get, None):
+                if grouped:
+                    writer_for(len(triples)).add_all(triples)
+                else:
+                    for triple in triples:
+                        writer_for(1).add(triple)
+        except BaseException:
+            # keeps taking batches, so that the partitioning pass is not blocked by a full queue
+            for _ in iter(queues[i].get, None):
+                pass
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
+        return paths
+
+    def shard_of(node: Node) -> int:
+        return zlib.crc32(node.encode("utf-8")) % shards
+
+    with ThreadPoolExecutor(max_workers=shards) as executor:
+        futures = [executor.submit(write_shard, i) for i in range(shards)]
+        try:
+            batches = [[] for _ in range(shards)]
+            blank_node_triples = []
+            for triple in graph:
+                s, _, o = triple
+                if isinstance(s, BNode) or isinstance(o, BNode):
+                    blank_node_triples.append(triple)
+                    continue
+                i = shard_of(s)
+                batches[i].append(triple)
+                if len(batches[i]) >= shard_batch_size:
+                    queues[i].put((batches[i], False))
+                    batches[i] = []
+            for i, batch in enumerate(batches):
+                if batch:
+                    queues[i].put((batch, False))
+
+            # union-find over the blank nodes that share a triple
+            parents = {}
+
+            def find(node):
+                parents.setdefault(node, node)
+                while parents[node] != node:
+                    parents[node] = parents[parents[node]]
+                    node = parents[node]
+                return node
+
+            for s, _, o in blank_node_triples:
+                if isinstance(s, BNode) and isinstance(o, BNode):
+                    parents[find(s)] = find(o)
+            groups: Dict[Node, List[Tuple]] = {}
+            for triple in blank_node_triples:
+                s, _, o = triple
+                groups.setdefault(find(s) if isinstance(s, BNode) else find(o), []).append(triple)
+            for key, group in groups.items():
+                queues[shard_of(key)].put((group, True))
+        finally:
+            for shard_queue in queues:
+                shard_queue.put(None)
+        return [path for future in futures for path in future.result()]
@@ -0,0 +1,188 @@
+import json
+import os
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.term import Node
+
+from pandasaurus_cxg.graph_generator.triple_stream import TripleSink
+
+
+class TripleTable(TripleSink):
+    """
+    Dictionary-encoded columnar table of triples.
+
+    Every distinct term is stored once in a term dictionary, and the triples are kept as three
+    integer id arrays. rdflib graphs and serializations are only built on demand, and the table can
+    be exported to Parquet as dictionary-encoded columns.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.terms: List[Node] = []
+        self._term_ids: Dict[Node, int] = {}
+        self.subjects = array("q")
+        self.predicates = array("q")
+        self.objects = array("q")
+
+    @classmethod
+    def from_graph(cls, graph: Graph) -> "TripleTable":
+        """
+        Builds a table from the triples of an rdflib graph.
+
+        Args:
+            graph: The graph to encode.
+
+        Returns:
+            The table of the graph's triples.
+
+        """
+        table = cls()
+        table.add_all(graph)
+        return table
+
+    def add(self, triple: Tuple):
+        """
+        Appends a single triple to the table.
+
+        Args:
+            triple: The (subject, predicate, object) triple.
+
+        """
+        subject, predicate, object_ = triple
+        self.subjects.append(self._term_id(subject))
+        self.predicates.append(self._term_id(predicate))
+        self.objects.append(self._term_id(object_))
+        self._count += 1
+
+    def _term_id(self, term: Node) -> int:
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self.terms)
+            self.terms.append(term)
+        return term_id
+
+    def _id_frame(self) -> pd.DataFrame:
+        # a graph is a set of triples, so repeated triples are only kept once
+        return pd.DataFrame(
+            {"subject": self.subjects, "predicate": self.predicates, "object": self.objects}
+        ).drop_duplicates(ignore_index=True)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the triples as a DataFrame of categorical columns sharing the term dictionary.
+
+        The subject, predicate and object columns hold the N3 form of the terms. The datatype and
+        language columns describe literal objects and are empty for IRIs and blank nodes.
+
+        Returns:
+            A DataFrame with subject, predicate, object, datatype and language columns.
+
+        """
+        ids = self._id_frame()
+        categories = pd.Index([term.n3() for term in self.terms])
+        datatypes = [
+            str(term.datatype) if isinstance(term, Literal) and term.datatype else None
+            for term in self.terms
+        ]
+        languages = [term.language if isinstance(term, Literal) else None for term in self.terms]
+        object_ids = ids["object"].to_numpy()
+        return pd.DataFrame(
+            {
+                column: pd.Categorical.from_codes(ids[column].to_numpy(), categories=categories)
+                for column in ("subject", "predicate", "object")
+            }
+        ).assign(
+            datatype=pd.Categorical([datatypes[i] for i in object_ids]),
+            language=pd.Categorical([languages[i] for i in object_ids]),
+        )
+
+    def to_parquet(self, path: str):
+        """
+        Writes the table returned by to_dataframe to a Parquet file. The categorical columns are
+        stored with Parquet dictionary encoding. Requires pyarrow, installed with the `parquet`
+        extra.
+
+        Args:
+            path: The path of the Parquet file.
+
+        """
+        self.to_dataframe().to_parquet(path, engine="pyarrow", index=False)
+
+    def to_graph(self, graph: Optional[Graph] = None) -> Graph:
+        """
+        Builds an rdflib graph from the table, e.g. to serialize it with save_rdf_graph.
+
+        Args:
+            graph: An optional graph the triples are added to. Defaults to a new in-memory graph.
+
+        Returns:
+            The graph that contains every triple of the table.
+
+        """
+        graph = graph if graph is not None else Graph()
+        terms = self.terms
+        graph.addN(
+            (terms[subject], terms[predicate], terms[object_], graph)
+            for subject, predicate, object_ in zip(
+                self.subjects.tolist(), self.predicates.tolist(), self.objects.tolist()
+            )
+        )
+        return graph
+
+    def save(self, path: str):
+        """
+        Saves the table as a binary snapshot directory. The directory holds the term dictionary as
+        terms.json and the subject, predicate and object id arrays as a (3, n) int64 triples.npy.
+
+        Args:
+            path: The path of the snapshot directory, created if it does not exist.
+
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(
+            os.path.join(path, "triples.npy"),
+            np.array([self.subjects, self.predicates, self.objects], dtype=np.int64).reshape(3, -1),
+        )
+        with open(os.path.join(path, "terms.json"), "w", encoding="utf-8") as terms_file:
+            json.dump([_encode_term(term) for term in self.terms], terms_file)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "TripleTable":
+        """
+        Loads a table saved with save. Tables loaded with mmap are read-only.
+
+        Args:
+            path: The path of the snapshot directory.
+            mmap: If True, the id arrays are memory-mapped instead of read into memory.
+                Defaults to True.
+
+        Returns:
+            The loaded table.
+
+        """
+        table = cls()
+        triples = np.load(os.path.join(path, "triples.npy"), mmap_mode="r" if mmap else None)
+        if not mmap:
+            triples = [array("q", column.tobytes()) for column in triples]
+        table.subjects, table.predicates, table.objects = triples
+        table._count = len(table.subjects)
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as terms_file:
+            table.terms = [_decode_term(term) for term in json.load(terms_file)]
+        table._term_ids = {term: term_id for term_id, term in enumerate(table.terms)}
+        return table
+
+
+def _encode_term(term: Node) -> List[Optional[str]]:
+    if isinstance(term, Literal):
+        return ["l", str(term), term.datatype and str(term.datatype), term.language]
+    return ["b" if isinstance(term, BNode) else "u", str(term)]
+
+
+def _decode_term(encoded_term: List[Optional[str]]) -> Node:
+    if encoded_term[0] == "l":
+        return Literal(encoded_term[1], datatype=encoded_term[2], lang=encoded_term[3])
+    return BNode(encoded_term[1]) if encoded_term[0] == "b" else URIRef(encoded_term[1])
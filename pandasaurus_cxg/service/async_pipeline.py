@@ -0,0 +1,295 @@
+import asyncio
+import contextlib
+import contextvars
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+from rdflib import Graph
+
+from pandasaurus_cxg.enrichment_analysis import AnndataEnrichmentAnalyzer
+from pandasaurus_cxg.graph_generator.graph_generator import GraphGenerator
+from pandasaurus_cxg.utils.progress import (
+    CancellationToken,
+    ProgressCallback,
+    ProgressMonitor,
+)
+
+
+class AsyncPipeline:
+    """
+    Runs the blocking analysis, enrichment and graph generation calls of many datasets without
+    blocking the event loop.
+
+    CPU-bound calls run in one executor and the enrichments, which are dominated by ontology
+    lookups, run concurrently in another. Each kind of call is limited by a semaphore, so callers
+    wait for a free slot instead of queueing unbounded work in the executors. A call whose task is
+    cancelled cancels the running stage through its CancellationToken, and its slot is released
+    once the stage stopped.
+
+    Examples:
+        async with AsyncPipeline(max_cpu_calls=4) as pipeline:
+            analyzer = await pipeline.load("kidney.h5ad")
+            await analyzer.simple_enrichment()
+            await analyzer.co_annotation_report()
+            graph_generator = await analyzer.graph_generator()
+            await graph_generator.generate_rdf_graph()
+    """
+
+    def __init__(
+        self,
+        executor: Optional[Executor] = None,
+        max_cpu_calls: int = 4,
+        max_lookups: int = 8,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        """
+        Initializes AsyncPipeline instance.
+
+        Args:
+            executor: The executor of the CPU-bound calls. The datasets are shared between calls,
+                so it has to run the calls in threads of this process. Defaults to a
+                ThreadPoolExecutor with max_cpu_calls workers, shut down by close.
+            max_cpu_calls: The maximum number of CPU-bound calls that run at the same time.
+                Defaults to 4.
+            max_lookups: The maximum number of enrichments that run at the same time.
+                Defaults to 8.
+            progress: A progress callback of the running stages, see ProgressMonitor. It is called
+                from the executor threads. Defaults to None.
+        """
+        self._owned_executors: List[Executor] = []
+        if executor is None:
+            executor = ThreadPoolExecutor(max_cpu_calls, thread_name_prefix="pandasaurus_cxg")
+            self._owned_executors.append(executor)
+        self.executor = executor
+        self.lookup_executor = ThreadPoolExecutor(
+            max_lookups, thread_name_prefix="pandasaurus_cxg_lookup"
+        )
+        self._owned_executors.append(self.lookup_executor)
+        self.progress = progress
+        self._cpu_slots = asyncio.Semaphore(max_cpu_calls)
+        self._lookup_slots = asyncio.Semaphore(max_lookups)
+
+    async def run(self, func: Callable[..., Any], *args: Any, io_bound: bool = False, **kwargs):
+        """
+        Runs a blocking call in the executor once a slot is free.
+
+        Args:
+            func: The blocking function.
+            *args: The positional arguments of func.
+            io_bound: If True, the call runs in the lookup executor and takes a lookup slot,
+                otherwise a CPU slot. Defaults to False.
+            **kwargs: The keyword arguments of func.
+
+        Returns:
+            The result of func.
+        """
+        if io_bound:
+            slots, executor = self._lookup_slots, self.lookup_executor
+        else:
+            slots, executor = self._cpu_slots, self.executor
+        token = CancellationToken()
+
+        def call():
+            with ProgressMonitor(self.progress, token):
+                return func(*args, **kwargs)
+
+        async with slots:
+            loop = asyncio.get_running_loop()
+            # the context is copied, so an active PipelineProfiler also records the call
+            future = loop.run_in_executor(executor, contextvars.copy_context().run, call)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                token.cancel()
+                with contextlib.suppress(Exception):
+                    await future
+                raise
+
+    async def load(
+        self, file_path: str, author_cell_type_list: Optional[List[str]] = None
+    ) -> "AsyncEnrichmentAnalyzer":
+        """
+        Loads a dataset.
+
+        Args:
+            file_path: The path to the h5ad file.
+            author_cell_type_list: Names of optional free text cell type fields. Defaults to None.
+
+        Returns:
+            The async facade of the AnndataEnrichmentAnalyzer of the dataset.
+        """
+        analyzer = await self.run(AnndataEnrichmentAnalyzer, file_path, author_cell_type_list)
+        return AsyncEnrichmentAnalyzer(analyzer, self)
+
+    def close(self):
+        """Shuts the executors created by the pipeline down."""
+        for executor in self._owned_executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class _AsyncFacade:
+    wrapped: Any
+    pipeline: AsyncPipeline
+    lock: asyncio.Lock
+
+    async def _run(self, func: Callable[..., Any], *args: Any, io_bound: bool = False, **kwargs):
+        # one call per dataset at a time, as the wrapped objects keep the state of the last call
+        async with self.lock:
+            return await self.pipeline.run(func, *args, io_bound=io_bound, **kwargs)
+
+
+class AsyncEnrichmentAnalyzer(_AsyncFacade):
+    """
+    The async facade of an AnndataEnrichmentAnalyzer. The analyzer keeps the state of the last
+    analysis, so the calls of one dataset run one at a time, while the calls of different datasets
+    run concurrently.
+    """
+
+    def __init__(self, analyzer: AnndataEnrichmentAnalyzer, pipeline: AsyncPipeline):
+        """
+        Initializes AsyncEnrichmentAnalyzer instance.
+
+        Args:
+            analyzer: The wrapped analyzer.
+            pipeline: The pipeline that runs the calls.
+        """
+        self.wrapped = analyzer
+        self.pipeline = pipeline
+        self.lock = asyncio.Lock()
+
+    async def co_annotation_report(
+        self, disease: Optional[str] = None, enrich: bool = False, max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.co_annotation_report."""
+        return await self._run(self.wrapped.co_annotation_report, disease, enrich, max_hops)
+
+    async def enriched_co_annotation_report(
+        self, disease: Optional[str] = None, max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.enriched_co_annotation_report."""
+        return await self._run(self.wrapped.enriched_co_annotation_report, disease, max_hops)
+
+    async def simple_enrichment(self, max_hops: Optional[int] = None) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.simple_enrichment."""
+        return await self._run(self.wrapped.simple_enrichment, max_hops, io_bound=True)
+
+    async def minimal_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.minimal_slim_enrichment."""
+        return await self._run(
+            self.wrapped.minimal_slim_enrichment, slim_list, max_hops, io_bound=True
+        )
+
+    async def full_slim_enrichment(
+        self, slim_list: List[str], max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.full_slim_enrichment."""
+        return await self._run(
+            self.wrapped.full_slim_enrichment, slim_list, max_hops, io_bound=True
+        )
+
+    async def contextual_slim_enrichment(
+        self, max_hops: Optional[int] = None
+    ) -> Optional[pd.DataFrame]:
+        """See AnndataEnrichmentAnalyzer.contextual_slim_enrichment."""
+        return await self._run(self.wrapped.contextual_slim_enrichment, max_hops, io_bound=True)
+
+    async def filter_anndata_with_enriched_cell_type(self, cell_type: str) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.filter_anndata_with_enriched_cell_type."""
+        return await self._run(self.wrapped.filter_anndata_with_enriched_cell_type, cell_type)
+
+    async def annotate_anndata_with_cell_type(
+        self, cell_type_list: List[str], field_name: str, field_value: str
+    ) -> pd.DataFrame:
+        """See AnndataEnrichmentAnalyzer.annotate_anndata_with_cell_type."""
+        return await self._run(
+            self.wrapped.annotate_anndata_with_cell_type, cell_type_list, field_name, field_value
+        )
+
+    async def graph_generator(self, **kwargs: Any) -> "AsyncGraphGenerator":
+        """
+        Creates the graph generator of the dataset. A co-annotation report has to be generated
+        first.
+
+        Args:
+            **kwargs: The arguments of GraphGenerator, besides the enrichment analyzer.
+
+        Returns:
+            The async facade of the graph generator. It shares the lock of this analyzer.
+        """
+        async with self.lock:
+            graph_generator = await self.pipeline.run(GraphGenerator, self.wrapped, **kwargs)
+        return AsyncGraphGenerator(graph_generator, self.pipeline, self.lock)
+
+
+class AsyncGraphGenerator(_AsyncFacade):
+    """
+    The async facade of a GraphGenerator. Its calls run one at a time with the calls of the
+    analyzer it was created from.
+    """
+
+    def __init__(
+        self,
+        graph_generator: GraphGenerator,
+        pipeline: AsyncPipeline,
+        lock: Optional[asyncio.Lock] = None,
+    ):
+        """
+        Initializes AsyncGraphGenerator instance.
+
+        Args:
+            graph_generator: The wrapped graph generator.
+            pipeline: The pipeline that runs the calls.
+            lock: The lock of the dataset. Defaults to a new lock.
+        """
+        self.wrapped = graph_generator
+        self.pipeline = pipeline
+        self.lock = lock if lock is not None else asyncio.Lock()
+
+    async def generate_rdf_graph(self, merge: bool = False):
+        """See GraphGenerator.generate_rdf_graph."""
+        return await self._run(self.wrapped.generate_rdf_graph, merge)
+
+    async def enrich_rdf_graph(self, copy_triples: bool = True, prune: bool = False):
+        """See GraphGenerator.enrich_rdf_graph."""
+        return await self._run(self.wrapped.enrich_rdf_graph, copy_triples, prune)
+
+    async def add_metadata_nodes(self, metadata_fields: List[str], percentage_mode: str = "axiom"):
+        """See GraphGenerator.add_metadata_nodes."""
+        return await self._run(self.wrapped.add_metadata_nodes, metadata_fields, percentage_mode)
+
+    async def add_label_to_terms(self, graph_: Optional[Graph] = None):
+        """See GraphGenerator.add_label_to_terms."""
+        return await self._run(self.wrapped.add_label_to_terms, graph_)
+
+    async def save_rdf_graph(self, *args: Any, **kwargs: Any) -> List[str]:
+        """See GraphGenerator.save_rdf_graph."""
+        return await self._run(self.wrapped.save_rdf_graph, *args, **kwargs)
+
+    async def extract_subgraph(
+        self,
+        start_nodes: List[str],
+        predicate: Optional[str] = None,
+        bottom_up: bool = True,
+        graph: Optional[Graph] = None,
+    ) -> Graph:
+        """See GraphGenerator.extract_subgraph."""
+        return await self._run(
+            self.wrapped.extract_subgraph, start_nodes, predicate, bottom_up, graph
+        )
+
+    def set_label_adding_priority(self, label_priority: Union[List[str], Dict[str, int]]):
+        """See GraphGenerator.set_label_adding_priority."""
+        self.wrapped.set_label_adding_priority(label_priority)
+
+    def get_rdf_graph(self) -> Graph:
+        """See GraphGenerator.get_rdf_graph."""
+        return self.wrapped.get_rdf_graph()
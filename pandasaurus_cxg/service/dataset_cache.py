@@ -0,0 +1,480 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from rdflib import Graph
+
+from pandasaurus_cxg.enrichment_analysis import AnndataEnrichmentAnalyzer
+from pandasaurus_cxg.graph_generator.graph_generator import GraphGenerator
+from pandasaurus_cxg.utils.exceptions import CellTypeFieldNotFoundError
+from pandasaurus_cxg.utils.logging_config import configure_logger
+
+logger = configure_logger()
+
+enrichment_methods = ("simple", "minimal_slim", "full_slim", "contextual")
+slim_enrichment_methods = ("minimal_slim", "full_slim")
+session_operations = ("co_annotation_report", "enrichment", "filter", "subgraph")
+# rough in-memory size of one triple of an rdflib Memory store, with its indexes
+triple_bytes = 1024
+
+
+class Coalescer:
+    """
+    Runs concurrent calls with the same key once. The first caller computes the result, the other
+    callers wait for it and get the same result or exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Calls func, unless a call with the same key is running, in which case its result is
+        returned.
+
+        Args:
+            key: The key of the call.
+            func: The function computing the result.
+
+        Returns:
+            The result of func.
+        """
+        with self._lock:
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._pending[key]
+
+
+class DatasetSession:
+    """
+    The analyzer, enricher and generated graphs of one loaded dataset, with the results computed
+    so far.
+
+    The analyzer and the enricher keep the state of the last analysis, so the operations of a
+    session run one at a time.
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        author_cell_type_list: Optional[List[str]] = None,
+        analyzer_factory: Callable[..., AnndataEnrichmentAnalyzer] = AnndataEnrichmentAnalyzer,
+    ):
+        """
+        Initializes DatasetSession instance and loads the dataset.
+
+        Args:
+            file_path: The path to the h5ad file.
+            author_cell_type_list: Names of optional free text cell type fields. Defaults to None.
+            analyzer_factory: Creates the AnndataEnrichmentAnalyzer of the dataset. Defaults to
+                AnndataEnrichmentAnalyzer.
+
+        Raises:
+            CellTypeFieldNotFoundError: If an author cell type field is not an observation column.
+        """
+        self.file_path = file_path
+        self.ea = analyzer_factory(file_path, author_cell_type_list)
+        obs = self.ea.enricher_manager.anndata.obs
+        missing_fields = [field for field in author_cell_type_list or [] if field not in obs]
+        if missing_fields:
+            raise CellTypeFieldNotFoundError(missing_fields, list(obs.columns))
+        self.lock = threading.RLock()
+        self.results: Dict[Hashable, Any] = {}
+        # the enrichment the enricher state belongs to, see _use_enrichment
+        self._enrichment: Optional[Tuple] = None
+        self._memory_usage = 0
+        self._memory_usage_stale = True
+
+    def _memoized(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        with self.lock:
+            if key not in self.results:
+                self.results[key] = func()
+                self._memory_usage_stale = True
+            return self.results[key]
+
+    def co_annotation_report(
+        self, disease: Optional[str] = None, enrich: bool = False, max_hops: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Returns the co-annotation report, see AnndataEnrichmentAnalyzer.co_annotation_report.
+        """
+
+        def report():
+            return (
+                self.ea.co_annotation_report(disease, enrich, max_hops),
+                self.ea.analyzer_manager.report_df,
+            )
+
+        return self._memoized(("co_annotation_report", disease, enrich, max_hops), report)[0]
+
+    def _use_enrichment(
+        self, method: str, slim_list: Optional[Sequence[str]], max_hops: Optional[int]
+    ) -> Optional[pd.DataFrame]:
+        # runs the enrichment, unless the enricher state already belongs to it
+        if method not in enrichment_methods:
+            raise ValueError(
+                f"Invalid enrichment method: {method}. "
+                f"Please use one of {', '.join(enrichment_methods)}"
+            )
+        key = ("enrichment", method, tuple(slim_list or ()), max_hops)
+        with self.lock:
+            if self._enrichment != key:
+                enrich = getattr(self.ea, f"{method}_enrichment")
+                if method in slim_enrichment_methods:
+                    result = enrich(list(slim_list or ()), max_hops)
+                else:
+                    result = enrich(max_hops)
+                self.results[key] = result
+                self._enrichment = key
+                self._memory_usage_stale = True
+            return self.results[key]
+
+    def enrichment(
+        self,
+        method: str = "simple",
+        slim_list: Optional[Sequence[str]] = None,
+        max_hops: Optional[int] = None,
+    ) -> Optional[pd.DataFrame]:
+        """
+        Returns the enrichment table of one of the enrichment methods.
+
+        Args:
+            method: One of "simple", "minimal_slim", "full_slim" or "contextual".
+                Defaults to "simple".
+            slim_list: The slims of the minimal_slim and full_slim methods. Defaults to None.
+            max_hops: The maximum number of subClassOf hops of the enriched terms.
+                Defaults to None.
+
+        Returns:
+            The enrichment table, or None if the contextual enrichment has no context.
+
+        Raises:
+            ValueError: If the provided method is not valid.
+        """
+        key = ("enrichment", method, tuple(slim_list or ()), max_hops)
+        with self.lock:
+            if key in self.results:
+                return self.results[key]
+            return self._use_enrichment(method, slim_list, max_hops)
+
+    def filter(
+        self,
+        cell_type: str,
+        method: str = "simple",
+        slim_list: Optional[Sequence[str]] = None,
+        max_hops: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        Returns the observations of a cell type and its enriched subclasses, see
+        AnndataEnrichmentAnalyzer.filter_anndata_with_enriched_cell_type.
+
+        Args:
+            cell_type: CURIE of the cell type for filtering.
+            method: The enrichment method, see enrichment. Defaults to "simple".
+            slim_list: The slims of the minimal_slim and full_slim methods. Defaults to None.
+            max_hops: The maximum number of subClassOf hops of the enriched terms.
+                Defaults to None.
+
+        Returns:
+            The filtered observations.
+        """
+
+        def filter_observations():
+            self._use_enrichment(method, slim_list, max_hops)
+            return self.ea.filter_anndata_with_enriched_cell_type(cell_type)
+
+        return self._memoized(
+            ("filter", cell_type, method, tuple(slim_list or ()), max_hops), filter_observations
+        )
+
+    def graph_generator(
+        self,
+        merge: bool = False,
+        method: Optional[str] = None,
+        slim_list: Optional[Sequence[str]] = None,
+        max_hops: Optional[int] = None,
+    ) -> GraphGenerator:
+        """
+        Returns the graph generator of the dataset, with the graph generated from the default
+        co-annotation report.
+
+        Args:
+            merge: If True, cell clusters with identical cell set memberships are merged.
+                Defaults to False.
+            method: The enrichment method whose graph is added to the generated graph, see
+                enrichment. Defaults to None, which does not enrich the graph.
+            slim_list: The slims of the minimal_slim and full_slim methods. Defaults to None.
+            max_hops: The maximum number of subClassOf hops of the enriched terms.
+                Defaults to None.
+
+        Returns:
+            The graph generator.
+        """
+
+        def generate():
+            self.co_annotation_report()
+            # the graph generator reads the report of the analyzer, so it is restored first
+            self.ea.analyzer_manager.report_df = self.results[
+                ("co_annotation_report", None, False, None)
+            ][1]
+            graph_generator = GraphGenerator(self.ea)
+            graph_generator.generate_rdf_graph(merge)
+            if method is not None:
+                self._use_enrichment(method, slim_list, max_hops)
+                graph_generator.enrich_rdf_graph(copy_triples=False)
+            return graph_generator
+
+        return self._memoized(
+            ("graph_generator", merge, method, tuple(slim_list or ()), max_hops), generate
+        )
+
+    def subgraph(
+        self,
+        start_nodes: Sequence[str],
+        predicate: Optional[str] = None,
+        bottom_up: bool = True,
+        **graph_options: Any,
+    ) -> Graph:
+        """
+        Extracts the subgraph reachable from any of the start nodes, see
+        GraphGenerator.extract_subgraph.
+
+        Args:
+            start_nodes: The IRIs of the nodes the traversal starts from.
+            predicate: The IRI of the predicate to follow. Defaults to None, which follows every
+                predicate.
+            bottom_up: If True, the traversal goes upwards, otherwise downwards. Defaults to True.
+            **graph_options: The options of the generated graph, see graph_generator.
+
+        Returns:
+            The extracted subgraph.
+        """
+        graph_generator = self.graph_generator(**graph_options)
+        with self.lock:
+            return graph_generator.extract_subgraph(list(start_nodes), predicate, bottom_up)
+
+    def memory_usage(self) -> int:
+        """
+        Estimates the memory used by the session: the observations, the DataFrames computed so
+        far and the triples of the generated and enrichment graphs. While another thread runs an
+        operation of the session, the previous estimate is returned.
+
+        Returns:
+            The estimated size in bytes.
+        """
+        if self._memory_usage_stale and self.lock.acquire(blocking=False):
+            try:
+                size = int(self.ea.enricher_manager.anndata.obs.memory_usage(deep=True).sum())
+                enrichment_graph = getattr(self.ea.enricher_manager.enricher, "graph", None)
+                triples = len(enrichment_graph) if enrichment_graph is not None else 0
+                for result in self.results.values():
+                    for value in result if isinstance(result, tuple) else (result,):
+                        if isinstance(value, pd.DataFrame):
+                            size += int(value.memory_usage(deep=True).sum())
+                        elif isinstance(value, GraphGenerator):
+                            triples += len(value.graph)
+                self._memory_usage = size + triples * triple_bytes
+                self._memory_usage_stale = False
+            finally:
+                self.lock.release()
+        return self._memory_usage
+
+    def close(self):
+        """
+        Closes the h5ad file of the dataset, which is opened in backed mode, once the running
+        operation of the session is finished. The file is reopened if the data matrix is used
+        again.
+        """
+        with self.lock:
+            anndata = self.ea.enricher_manager.anndata
+            if getattr(anndata, "isbacked", False) and anndata.file.is_open:
+                anndata.file.close()
+
+
+class DatasetCache:
+    """
+    Keeps the sessions of recently used datasets in a memory-bounded LRU, so that the reports,
+    enrichments and graphs of a dataset are computed once and served from memory afterwards.
+
+    Concurrent requests for the same dataset load it once, and concurrent requests for the same
+    result compute it once. The h5ad files of evicted sessions are closed, and close closes those
+    of the cached sessions.
+
+    Examples:
+        cache = DatasetCache(max_bytes=8 * 1024**3)
+        report = cache.call("data/kidney.h5ad", "co_annotation_report", disease="MONDO:0004975")
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 4 * 1024**3,
+        session_factory: Callable[..., DatasetSession] = DatasetSession,
+    ):
+        """
+        Initializes DatasetCache instance.
+
+        Args:
+            max_bytes: The estimated memory the cached sessions may use, see
+                DatasetSession.memory_usage. The least recently used sessions are evicted when it
+                is exceeded, except for the session of the latest request. Defaults to 4 GiB.
+            session_factory: Creates the session of a dataset from its path and author cell type
+                fields. Defaults to DatasetSession.
+        """
+        self.max_bytes = max_bytes
+        self.session_factory = session_factory
+        self._sessions: "OrderedDict[Tuple, DatasetSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loads = Coalescer()
+        self._calls = Coalescer()
+
+    @staticmethod
+    def _dataset_key(file_path: str, author_cell_type_list: Optional[Sequence[str]]) -> Tuple:
+        return file_path, tuple(author_cell_type_list or ())
+
+    def get(
+        self, file_path: str, author_cell_type_list: Optional[Sequence[str]] = None
+    ) -> DatasetSession:
+        """
+        Returns the session of a dataset, loading it if it is not cached.
+
+        Args:
+            file_path: The path to the h5ad file.
+            author_cell_type_list: Names of optional free text cell type fields. Defaults to None.
+
+        Returns:
+            The session of the dataset.
+        """
+        key = self._dataset_key(file_path, author_cell_type_list)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+
+        def load():
+            # another caller may have loaded the dataset since the lookup above
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is not None:
+                    self._sessions.move_to_end(key)
+                    return session
+            logger.info("Loading dataset %s", file_path)
+            session = self.session_factory(
+                file_path, list(author_cell_type_list) if author_cell_type_list else None
+            )
+            with self._lock:
+                self._sessions[key] = session
+            self._evict(key)
+            return session
+
+        return self._loads.run(key, load)
+
+    def call(
+        self,
+        file_path: str,
+        operation: str,
+        author_cell_type_list: Optional[Sequence[str]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Runs an operation of the session of a dataset.
+
+        Args:
+            file_path: The path to the h5ad file.
+            operation: One of the DatasetSession methods "co_annotation_report", "enrichment",
+                "filter" or "subgraph".
+            author_cell_type_list: Names of optional free text cell type fields. Defaults to None.
+            **kwargs: The arguments of the operation. List values are passed as they are.
+
+        Returns:
+            The result of the operation.
+
+        Raises:
+            ValueError: If the provided operation is not valid.
+        """
+        if operation not in session_operations:
+            raise ValueError(
+                f"Invalid operation: {operation}. Please use one of {', '.join(session_operations)}"
+            )
+        session = self.get(file_path, author_cell_type_list)
+        call_key = (
+            self._dataset_key(file_path, author_cell_type_list),
+            operation,
+            tuple(
+                sorted(
+                    (name, tuple(value) if isinstance(value, list) else value)
+                    for name, value in kwargs.items()
+                )
+            ),
+        )
+        result = self._calls.run(call_key, lambda: getattr(session, operation)(**kwargs))
+        self._evict(call_key[0])
+        return result
+
+    def _evict(self, keep: Tuple):
+        with self._lock:
+            sessions = list(self._sessions.items())
+        total = sum(session.memory_usage() for _, session in sessions)
+        evicted = []
+        for key, session in sessions:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= session.memory_usage()
+            evicted.append(key)
+        closed = []
+        with self._lock:
+            for key in evicted:
+                session = self._sessions.pop(key, None)
+                if session is not None:
+                    logger.info("Evicted dataset %s", key[0])
+                    closed.append(session)
+        # the file handle and HDF5 cache of a backed dataset are only released once it is closed
+        for session in closed:
+            session.close()
+
+    def close(self):
+        """
+        Removes every session from the cache and closes the h5ad files of their datasets.
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def datasets(self) -> List[Dict[str, Any]]:
+        """
+        Lists the cached datasets, from the least to the most recently used.
+
+        Returns:
+            The path, author cell type fields and estimated memory usage of every dataset.
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+        return [
+            {
+                "file_path": file_path,
+                "author_cell_type_list": list(author_cell_type_list),
+                "memory_usage": session.memory_usage(),
+            }
+            for (file_path, author_cell_type_list), session in sessions
+        ]
@@ -0,0 +1,296 @@
+import argparse
+import json
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from rdflib import Graph
+
+from pandasaurus_cxg.graph_generator.graph_generator import RDFFormat
+from pandasaurus_cxg.service.dataset_cache import DatasetCache, enrichment_methods
+from pandasaurus_cxg.utils.exceptions import (
+    CellTypeFieldNotFoundError,
+    CellTypeNotFoundError,
+    InvalidSlimName,
+    MissingAnalysisProcess,
+    MissingAuthorCellTypeFields,
+    MissingEnrichmentProcess,
+)
+from pandasaurus_cxg.utils.logging_config import configure_logger
+
+logger = configure_logger()
+
+rdf_media_types = {
+    RDFFormat.RDF_XML.value: "application/rdf+xml",
+    RDFFormat.TURTLE.value: "text/turtle",
+    RDFFormat.NTRIPLES.value: "application/n-triples",
+}
+# errors caused by the requested dataset, cell types or slims; any other error is a server error
+client_errors = (
+    CellTypeFieldNotFoundError,
+    CellTypeNotFoundError,
+    InvalidSlimName,
+    MissingAnalysisProcess,
+    MissingAuthorCellTypeFields,
+    MissingEnrichmentProcess,
+)
+
+
+class RequestError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        self.status = status
+        self.message = message
+        super().__init__(self.message)
+
+
+def _single(
+    params: Dict[str, List[str]], name: str, default: Optional[str] = None
+) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _required(params: Dict[str, List[str]], name: str) -> str:
+    value = _single(params, name)
+    if not value:
+        raise RequestError(HTTPStatus.BAD_REQUEST, f"Missing query parameter: {name}")
+    return value
+
+
+def _boolean(params: Dict[str, List[str]], name: str, default: bool) -> bool:
+    value = _single(params, name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def _integer(params: Dict[str, List[str]], name: str) -> Optional[int]:
+    value = _single(params, name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RequestError(
+            HTTPStatus.BAD_REQUEST, f"Query parameter {name} must be an integer"
+        ) from None
+
+
+def _max_hops(params: Dict[str, List[str]]) -> Optional[int]:
+    max_hops = _integer(params, "max_hops")
+    if max_hops is not None and max_hops < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Query parameter max_hops must not be negative")
+    return max_hops
+
+
+def _enrichment_options(params: Dict[str, List[str]], default_method: Optional[str]):
+    method = _single(params, "method", default_method)
+    if method is not None and method not in enrichment_methods:
+        raise RequestError(
+            HTTPStatus.BAD_REQUEST,
+            f"Invalid enrichment method: {method}. "
+            f"Please use one of {', '.join(enrichment_methods)}",
+        )
+    return {"method": method, "slim_list": params.get("slim"), "max_hops": _max_hops(params)}
+
+
+class ReportService:
+    """
+    Serves the co-annotation reports, enrichment tables, filtered observations and subgraphs of
+    the datasets in a data directory, from a DatasetCache.
+
+    Every endpoint takes the path of the dataset relative to the data directory as the "dataset"
+    query parameter, and optionally its free text cell type fields as repeated
+    "author_cell_type" parameters:
+
+    - GET /co_annotation_report?dataset=...&disease=...&enrich=false&max_hops=...
+    - GET /enrichment?dataset=...&method=simple&slim=...&max_hops=...
+    - GET /filter?dataset=...&cell_type=CL:0000084&method=simple
+    - GET /subgraph?dataset=...&node=IRI&predicate=IRI&bottom_up=true&merge=false&format=ttl
+    - GET /datasets, which lists the cached datasets
+    """
+
+    def __init__(self, data_dir: str, cache: Optional[DatasetCache] = None):
+        """
+        Initializes ReportService instance.
+
+        Args:
+            data_dir: The directory the datasets are read from. Paths outside of it are rejected.
+            cache: The cache of the loaded datasets. Defaults to a DatasetCache with its default
+                memory bound.
+        """
+        self.data_dir = os.path.realpath(data_dir)
+        self.cache = cache if cache is not None else DatasetCache()
+
+    def _dataset_path(self, params: Dict[str, List[str]]) -> str:
+        path = os.path.realpath(os.path.join(self.data_dir, _required(params, "dataset")))
+        if os.path.commonpath([self.data_dir, path]) != self.data_dir:
+            raise RequestError(HTTPStatus.FORBIDDEN, "The dataset is outside of the data directory")
+        if not os.path.isfile(path):
+            raise RequestError(HTTPStatus.NOT_FOUND, "The dataset does not exist")
+        return path
+
+    def _call(self, params: Dict[str, List[str]], operation: str, **kwargs: Any) -> Any:
+        return self.cache.call(
+            self._dataset_path(params),
+            operation,
+            author_cell_type_list=params.get("author_cell_type"),
+            **kwargs,
+        )
+
+    def handle(self, path: str, params: Dict[str, List[str]]) -> Tuple[HTTPStatus, str, bytes]:
+        """
+        Handles a GET request.
+
+        Args:
+            path: The path of the request URL.
+            params: The query parameters of the request, as parsed by urllib.parse.parse_qs.
+
+        Returns:
+            The status, media type and body of the response. Invalid requests and the
+            client_errors of the pipeline get an error status in the 400 range.
+
+        Raises:
+            Exception: Any other error, which ReportRequestHandler answers with a 500 response.
+        """
+        try:
+            return HTTPStatus.OK, *self._route(path, params)
+        except RequestError as e:
+            return e.status, "application/json", json.dumps({"error": e.message}).encode("utf-8")
+        except client_errors as e:
+            message = getattr(e, "message", None) or str(e)
+            return (
+                HTTPStatus.BAD_REQUEST,
+                "application/json",
+                json.dumps({"error": message}).encode("utf-8"),
+            )
+
+    def _route(self, path: str, params: Dict[str, List[str]]) -> Tuple[str, bytes]:
+        if path == "/datasets":
+            return "application/json", json.dumps(self.cache.datasets()).encode("utf-8")
+        if path == "/co_annotation_report":
+            result = self._call(
+                params,
+                "co_annotation_report",
+                disease=_single(params, "disease"),
+                enrich=_boolean(params, "enrich", False),
+                max_hops=_max_hops(params),
+            )
+        elif path == "/enrichment":
+            result = self._call(params, "enrichment", **_enrichment_options(params, "simple"))
+        elif path == "/filter":
+            result = self._call(
+                params,
+                "filter",
+                cell_type=_required(params, "cell_type"),
+                **_enrichment_options(params, "simple"),
+            )
+        elif path == "/subgraph":
+            _format = _single(params, "format", RDFFormat.TURTLE.value)
+            if _format not in rdf_media_types:
+                raise RequestError(
+                    HTTPStatus.BAD_REQUEST,
+                    f"Invalid format: {_format}. Please use one of {', '.join(rdf_media_types)}",
+                )
+            if not params.get("node"):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "Missing query parameter: node")
+            subgraph: Graph = self._call(
+                params,
+                "subgraph",
+                start_nodes=params["node"],
+                predicate=_single(params, "predicate"),
+                bottom_up=_boolean(params, "bottom_up", True),
+                merge=_boolean(params, "merge", False),
+                **_enrichment_options(params, None),
+            )
+            return rdf_media_types[_format], subgraph.serialize(format=_format, encoding="utf-8")
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {path}")
+        if result is None:
+            return "application/json", b"null"
+        if isinstance(result, pd.DataFrame):
+            if not isinstance(result.index, pd.RangeIndex):
+                # e.g. the cell ids of filtered observations
+                result = result.reset_index()
+            return "application/json", result.to_json(orient="records").encode("utf-8")
+        return "application/json", json.dumps(result, default=str).encode("utf-8")
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    service: ReportService
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            status, media_type, body = self.service.handle(url.path, parse_qs(url.query))
+        except Exception:
+            logger.exception("Request %s failed", self.path)
+            status, media_type = HTTPStatus.INTERNAL_SERVER_ERROR, "application/json"
+            body = json.dumps({"error": "Internal server error"}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(
+    data_dir: str,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache: Optional[DatasetCache] = None,
+) -> ThreadingHTTPServer:
+    """
+    Creates a threaded HTTP server for a ReportService. Requests are handled in their own threads,
+    so requests for other datasets are not blocked by a long computation.
+
+    Args:
+        data_dir: The directory the datasets are read from.
+        host: The address the server listens on. Defaults to "127.0.0.1".
+        port: The port the server listens on, or 0 for any free port. Defaults to 8000.
+        cache: The cache of the loaded datasets. Defaults to a DatasetCache with its default
+            memory bound.
+
+    Returns:
+        The server, started with serve_forever.
+    """
+    handler = type(
+        "BoundReportRequestHandler",
+        (ReportRequestHandler,),
+        {"service": ReportService(data_dir, cache)},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(args: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serves pandasaurus_cxg reports over HTTP.")
+    parser.add_argument("data_dir", help="The directory the datasets are read from.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--max-memory",
+        type=float,
+        default=4.0,
+        help="The estimated memory of the cached datasets, in GiB. Defaults to 4.",
+    )
+    options = parser.parse_args(args)
+    cache = DatasetCache(max_bytes=int(options.max_memory * 1024**3))
+    server = create_server(options.data_dir, options.host, options.port, cache)
+    logger.info("Serving %s on http://%s:%d", options.data_dir, *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from typing import Optional
 
 import anndata
 
+from pandasaurus_cxg.utils.instrumentation import stage
+
 
 class AnndataLoader:
     @staticmethod
@@ -22,7 +24,9 @@ class AnndataLoader:
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", category=anndata.ImplicitModificationWarning)
             try:
-                anndata_obj = anndata.read_h5ad(file_path, backed="r")
+                with stage("anndata_loader.load") as record:
+                    anndata_obj = anndata.read_h5ad(file_path, backed="r")
+                    record.count("rows", anndata_obj.n_obs)
                 return anndata_obj
             except Exception as e:
                 print(f"An error occurred while loading the file: {e}")
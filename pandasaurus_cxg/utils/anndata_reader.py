@@ -0,0 +1,180 @@
+import copy
+import threading
+from typing import Any, List, Optional, Sequence, Union
+
+import anndata
+import h5py
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from pandasaurus_cxg.utils.anndata_loader import AnndataLoader
+from pandasaurus_cxg.utils.instrumentation import stage
+
+sparse_encodings = ("csr_matrix", "csc_matrix")
+
+
+def _read_sparse_rows(group: h5py.Group, positions: np.ndarray) -> sparse.csr_matrix:
+    # reads the rows at the sorted positions of a sparse matrix stored in an h5ad group
+    encoding = group.attrs.get("encoding-type")
+    if encoding not in sparse_encodings:
+        raise ValueError(f"Unsupported matrix encoding: {encoding}")
+    shape = tuple(group.attrs["shape"])
+    data, indices, indptr = group["data"], group["indices"], group["indptr"][:]
+    if encoding == "csc_matrix":
+        # the rows of a csc matrix are spread over every column, so the matrix is read whole
+        matrix = sparse.csc_matrix((data[:], indices[:], indptr), shape=shape)
+        return matrix.tocsr()[positions]
+    # consecutive rows are stored contiguously and read at once
+    run_starts = np.flatnonzero(np.diff(positions, prepend=-2) != 1)
+    run_ends = np.append(run_starts[1:], len(positions))
+    row_data, row_indices = [], []
+    for start, end in zip(run_starts, run_ends):
+        first, last = indptr[positions[start]], indptr[positions[end - 1] + 1]
+        row_data.append(data[first:last])
+        row_indices.append(indices[first:last])
+    row_lengths = indptr[positions + 1] - indptr[positions]
+    return sparse.csr_matrix(
+        (
+            np.concatenate(row_data) if row_data else np.array([], dtype=data.dtype),
+            np.concatenate(row_indices) if row_indices else np.array([], dtype=indices.dtype),
+            np.concatenate([[0], np.cumsum(row_lengths)]),
+        ),
+        shape=(len(positions), shape[1]),
+    )
+
+
+class AnndataReader:
+    """
+    Thread-safe reads from an h5ad file.
+
+    A backed AnnData shares one h5py file handle, which is not safe for concurrent access. The
+    reader loads the observations, variables and unstructured metadata once, and hands out AnnData
+    objects built from them without any file handle, so AnndataAnalyzer, AnndataEnricher and
+    GraphGenerator.add_metadata_nodes can be used from thread pools. The matrix is read on demand
+    through one h5py handle per thread, opened on the first read of the thread.
+
+    Examples:
+        with AnndataReader("kidney.h5ad") as reader:
+            analyzer = AnndataAnalyzer(reader.metadata(), author_cell_type_list)
+            with ThreadPoolExecutor() as executor:
+                blocks = list(executor.map(reader.read_rows, [range(0, 100), range(100, 200)]))
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Initializes AnndataReader instance and loads the metadata of the file.
+
+        Args:
+            file_path: The path to the h5ad file.
+
+        Raises:
+            ValueError: If the file cannot be loaded.
+        """
+        self.file_path = file_path
+        backed = AnndataLoader.load_from_file(file_path)
+        if backed is None:
+            raise ValueError(f"Could not load the AnnData file: {file_path}")
+        try:
+            self.obs: pd.DataFrame = backed.obs
+            self.var: pd.DataFrame = backed.var
+            self.uns = backed.uns
+            self.shape = backed.shape
+        finally:
+            backed.file.close()
+        self._local = threading.local()
+        self._handles: List[h5py.File] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def metadata(self, copy_obs: bool = False) -> anndata.AnnData:
+        """
+        Returns an AnnData object with the observations, variables and unstructured metadata of
+        the file, and without the matrix or any file handle.
+
+        Args:
+            copy_obs: If True, the observations are copied, e.g. for an enricher that annotates
+                them. Otherwise they are shared by every object returned by this method and must
+                not be modified. Defaults to False.
+
+        Returns:
+            The AnnData object. Its unstructured metadata is a copy, as the analyzer records its
+            author cell type fields there.
+        """
+        return anndata.AnnData(
+            obs=self.obs.copy() if copy_obs else self.obs,
+            var=self.var,
+            uns=copy.deepcopy(self.uns),
+        )
+
+    def _handle(self) -> h5py.File:
+        if self._closed:
+            raise ValueError("The reader is closed")
+        handle = getattr(self._local, "handle", None)
+        if handle is None:
+            with self._lock:
+                if self._closed:
+                    raise ValueError("The reader is closed")
+                handle = h5py.File(self.file_path, "r")
+                self._handles.append(handle)
+            self._local.handle = handle
+        return handle
+
+    def read_rows(self, rows: Union[slice, Sequence[int], np.ndarray]) -> Any:
+        """
+        Reads rows of the matrix with the handle of the calling thread.
+
+        Args:
+            rows: A slice or the positions of the rows, in any order.
+
+        Returns:
+            The rows as a dense array, or a sparse matrix if the matrix is stored sparse.
+        """
+        element = self._handle()["X"]
+        with stage("anndata_reader.read_rows") as record:
+            if isinstance(rows, slice) and isinstance(element, h5py.Dataset):
+                block = element[rows]
+            else:
+                if isinstance(rows, slice):
+                    rows = range(*rows.indices(self.shape[0]))
+                # h5py reads increasing positions only, so the rows are read sorted and reordered
+                positions, order = np.unique(np.asarray(rows, dtype=np.int64), return_inverse=True)
+                if isinstance(element, h5py.Group):
+                    block = _read_sparse_rows(element, positions)[order]
+                else:
+                    block = element[positions][order]
+            record.count("rows", block.shape[0])
+        return block
+
+    def read_obs_rows(self, names: Sequence[str]) -> Any:
+        """
+        Reads the matrix rows of the named observations, see read_rows.
+
+        Args:
+            names: The names of the observations.
+
+        Returns:
+            The rows, in the order of names.
+
+        Raises:
+            KeyError: If any of the names is not an observation.
+        """
+        positions = self.obs.index.get_indexer(names)
+        if (positions < 0).any():
+            missing = [name for name, position in zip(names, positions) if position < 0]
+            raise KeyError(f"Missing observations: {', '.join(missing)}")
+        return self.read_rows(positions)
+
+    def close(self):
+        """Closes the file handles of every thread. Reads after closing raise a ValueError."""
+        with self._lock:
+            self._closed = True
+            handles, self._handles = self._handles, []
+        for handle in handles:
+            handle.close()
+
+    def __enter__(self) -> "AnndataReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 
 class InvalidSlimName(Exception):
@@ -20,7 +20,7 @@ class InvalidGraphFormat(Exception):
         super().__init__(self.message)
 
 
-class CellTypeNotFoundError(Exception):
+class CellTypeNotFoundError(LookupError):
     def __init__(self, missing_cell_types: List[str], cell_type_list: List[str]):
         self.message = (
             f"Following cell types not found in the annotation: {', '.join(missing_cell_types)}. "
@@ -29,6 +29,21 @@ class CellTypeNotFoundError(Exception):
         super().__init__(self.message)
 
 
+class CellTypeFieldNotFoundError(LookupError):
+    def __init__(self, missing_fields: List[str], field_list: List[str]):
+        self.message = (
+            f"Following cell type fields not found in the observations: {', '.join(missing_fields)}. "
+            f"Please use fields from: {', '.join(field_list)}."
+        )
+        super().__init__(self.message)
+
+
+class MissingAuthorCellTypeFields(ValueError):
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(self.message)
+
+
 class MissingEnrichmentProcess(Exception):
     def __init__(self, enrichment_methods: List[str]):
         self.message = (
@@ -55,3 +70,20 @@ class SubclassWarning(Exception):
             f"{joined_relations}."
         )
         super().__init__(self.message)
+
+
+class OperationCancelled(Exception):
+    def __init__(self, stage: Optional[str] = None):
+        self.stage = stage
+        self.message = "The operation was cancelled"
+        self.message += f" during {stage}." if stage else "."
+        super().__init__(self.message)
+
+
+class MissingOptionalDependency(ImportError):
+    def __init__(self, package: str, extra: str):
+        self.message = (
+            f"The {package} package is not installed. "
+            f'Please install it with: pip install "pandasaurus_cxg[{extra}]"'
+        )
+        super().__init__(self.message, name=package)
@@ -0,0 +1,287 @@
+import contextlib
+import contextvars
+import functools
+import json
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from pandasaurus_cxg.utils.logging_config import log_stage
+
+_active_profiler: contextvars.ContextVar[Optional["PipelineProfiler"]] = contextvars.ContextVar(
+    "active_profiler", default=None
+)
+_open_stages: contextvars.ContextVar[tuple] = contextvars.ContextVar("open_stages", default=())
+
+
+def _max_rss() -> Optional[int]:
+    # the peak resident set size of the process in bytes, if the platform reports it
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StageRecord:
+    """
+    Wall time, memory and counts of one pipeline stage.
+
+    Attributes:
+        name: The stage name, prefixed with the name of the enclosing stage.
+        seconds: The wall time of the stage.
+        memory_delta: The change of the memory traced by tracemalloc during the stage, in bytes.
+            None unless memory is traced, see PipelineProfiler.
+        memory_peak: The peak traced memory during the stage, in bytes. None unless memory is
+            traced.
+        max_rss: The peak resident set size of the process at the end of the stage, in bytes.
+        counts: Row, triple and other counts of the stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds: Optional[float] = None
+        self.memory_delta: Optional[int] = None
+        self.memory_peak: Optional[int] = None
+        self.max_rss: Optional[int] = None
+        self.counts: Dict[str, int] = {}
+        self._peak = 0
+        # start of the current lap, see lap
+        self._lap_time = 0.0
+        self._lap_memory = 0
+        self._lap_triples = 0
+
+    def count(self, name: str, value: int):
+        """
+        Records a count of the stage, e.g. the number of rows or triples it produced.
+
+        Args:
+            name: The name of the count.
+            value: The counted value.
+        """
+        self.counts[name] = int(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "memory_delta": self.memory_delta,
+            "memory_peak": self.memory_peak,
+            "max_rss": self.max_rss,
+            "counts": dict(self.counts),
+        }
+
+
+class _NullStageRecord(StageRecord):
+    def count(self, name: str, value: int):
+        pass
+
+
+class PipelineProfiler:
+    """
+    Records the stages that run while the profiler is active.
+
+    The loader, analyzer, enricher and graph generator stages report to the profiler that is active
+    in the current context. Without an active profiler, stages are not measured.
+
+    Examples:
+        with PipelineProfiler() as profiler:
+            graph_generator.generate_rdf_graph()
+            graph_generator.save_rdf_graph(file_name="graph", _format="ttl")
+        profiler.to_json("profile.json")
+    """
+
+    def __init__(
+        self,
+        trace_memory: bool = False,
+        log_stages: bool = True,
+        hooks: Optional[List[Callable[[StageRecord], None]]] = None,
+    ):
+        """
+        Initializes PipelineProfiler instance.
+
+        Args:
+            trace_memory: If True, memory is traced with tracemalloc while the profiler is active,
+                which adds memory_delta and memory_peak to the records. Tracing slows every Python
+                allocation down, so it is meant for profiling runs. Defaults to False, which only
+                records the cheap max_rss.
+            log_stages: If True, every finished stage is logged with log_stage. Defaults to True.
+            hooks: Functions called with the record of every finished stage. Defaults to None.
+        """
+        self.trace_memory = trace_memory
+        self.log_stages = log_stages
+        self.hooks = list(hooks or [])
+        self.records: List[StageRecord] = []
+        self._token = None
+        self._started_tracing = False
+
+    def add_hook(self, hook: Callable[[StageRecord], None]):
+        """
+        Registers a function that is called with the record of every finished stage.
+
+        Args:
+            hook: The function to call.
+        """
+        self.hooks.append(hook)
+
+    def __enter__(self) -> "PipelineProfiler":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_profiler.reset(self._token)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _finish(self, record: StageRecord):
+        self.records.append(record)
+        if self.log_stages:
+            log_stage(record.to_dict())
+        for hook in self.hooks:
+            hook(record)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the records as a DataFrame with one row per stage, in the order the stages
+        finished. Every count is a column.
+
+        Returns:
+            The DataFrame of the stage records.
+        """
+        return pd.json_normalize([record.to_dict() for record in self.records])
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """
+        Exports the records as a JSON list of stages.
+
+        Args:
+            path: An optional path the JSON is written to. Defaults to None.
+
+        Returns:
+            The JSON string.
+        """
+        content = json.dumps([record.to_dict() for record in self.records], indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as json_file:
+                json_file.write(content)
+        return content
+
+
+@contextlib.contextmanager
+def stage(name: str, graph: Optional[Any] = None) -> Iterator[StageRecord]:
+    """
+    Measures a pipeline stage for the active PipelineProfiler. Without an active profiler, the
+    stage is not measured.
+
+    Args:
+        name: The stage name. Stages nested in other stages are prefixed with the name of the
+            enclosing stage and a slash.
+        graph: An optional graph or triple sink whose number of added triples is counted as
+            "triples". Defaults to None.
+
+    Yields:
+        The record of the stage, for recording further counts.
+    """
+    profiler = _active_profiler.get()
+    if profiler is None:
+        yield _NullStageRecord(name)
+        return
+
+    parents = _open_stages.get()
+    record = StageRecord("/".join([parent.name for parent in parents[-1:]] + [name]))
+    token = _open_stages.set(parents + (record,))
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        memory_before, peak = tracemalloc.get_traced_memory()
+        # the peak is reset for the new stage, so the enclosing stage keeps the peak so far
+        if parents:
+            parents[-1]._peak = max(parents[-1]._peak, peak)
+        tracemalloc.reset_peak()
+    triples_before = len(graph) if graph is not None else None
+    start = record._lap_time = time.perf_counter()
+    if tracing:
+        record._lap_memory = memory_before
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _open_stages.reset(token)
+        if triples_before is not None:
+            record.count("triples", len(graph) - triples_before)
+        if tracing and tracemalloc.is_tracing():
+            memory_after, peak = tracemalloc.get_traced_memory()
+            record._peak = max(record._peak, peak)
+            record.memory_delta = memory_after - memory_before
+            record.memory_peak = record._peak - memory_before
+            if parents:
+                parents[-1]._peak = max(parents[-1]._peak, record._peak)
+        record.max_rss = _max_rss()
+        profiler._finish(record)
+
+
+def lap(name: str, graph: Optional[Any] = None, **counts: int):
+    """
+    Records the part of the enclosing stage since its start or its previous lap as a nested stage,
+    so that consecutive steps of a long function are measured without nesting them in blocks.
+    Without an active profiler or an enclosing stage, nothing is recorded.
+
+    Args:
+        name: The name of the step.
+        graph: An optional graph or triple sink whose triples added since the previous lap are
+            counted as "triples". The first lap counts every triple of the graph.
+        **counts: Further counts of the step, e.g. the number of clusters.
+    """
+    profiler = _active_profiler.get()
+    parents = _open_stages.get()
+    if profiler is None or not parents:
+        return
+    parent = parents[-1]
+    record = StageRecord(f"{parent.name}/{name}")
+    now = time.perf_counter()
+    record.seconds, parent._lap_time = now - parent._lap_time, now
+    if graph is not None:
+        triples = len(graph)
+        record.count("triples", triples - parent._lap_triples)
+        parent._lap_triples = triples
+    for count_name, value in counts.items():
+        record.count(count_name, value)
+    if tracemalloc.is_tracing():
+        memory, peak = tracemalloc.get_traced_memory()
+        record.memory_delta = memory - parent._lap_memory
+        record.memory_peak = peak - parent._lap_memory
+        parent._peak = max(parent._peak, peak)
+        parent._lap_memory = memory
+        tracemalloc.reset_peak()
+    record.max_rss = _max_rss()
+    profiler._finish(record)
+
+
+def profiled_stage(name: str):
+    """
+    Decorator that runs a function as a stage of the active PipelineProfiler. The rows of a
+    DataFrame result are counted as "rows".
+
+    Args:
+        name: The stage name.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if isinstance(result, pd.DataFrame):
+                    record.count("rows", len(result))
+                return result
+
+        return wrapper
+
+    return decorator
@@ -1,4 +1,10 @@
+import json
 import logging
+import os
+from typing import Any, Dict, List, Optional
+
+# Set PANDASAURUS_CXG_LOG_FORMAT=json to log one JSON object per line
+log_format_env = "PANDASAURUS_CXG_LOG_FORMAT"
 
 
 # Create a filter to exclude ERROR log records
@@ -7,8 +13,56 @@ class NoErrorFilter(logging.Filter):
         return record.levelno != logging.ERROR
 
 
-def configure_logger():
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as single-line JSON objects. The fields passed as
+    `extra={"fields": {...}}` are added to the object.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _formatter(json_output: bool) -> logging.Formatter:
+    if json_output:
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+
+def configure_logger(json_output: Optional[bool] = None):
+    """
+    Configures the package logger. Calling it again does not add handlers, it only switches the
+    output format if json_output is given.
+
+    Args:
+        json_output: If True, records are logged as JSON lines. Defaults to None, which keeps the
+            current format, or uses JSON if the PANDASAURUS_CXG_LOG_FORMAT environment variable is
+            "json".
+
+    Returns:
+        The package logger.
+    """
     logger = logging.getLogger(__name__)
+    handlers = [
+        handler for handler in logger.handlers if getattr(handler, "_pandasaurus_cxg", False)
+    ]
+    if handlers:
+        if json_output is not None:
+            for handler in handlers:
+                handler.setFormatter(_formatter(json_output))
+        return logger
+    if json_output is None:
+        json_output = os.environ.get(log_format_env, "").lower() == "json"
+
     logger.setLevel(logging.INFO)
     logger.propagate = False
 
@@ -20,12 +74,89 @@ def configure_logger():
     error.setLevel(logging.ERROR)
 
     # Create a formatter and set the format for log messages
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    formatter = _formatter(json_output)
     info.setFormatter(formatter)
     error.setFormatter(formatter)
     error.addFilter(NoErrorFilter())
     # Add the console handler to the logger
-    logger.addHandler(info)
-    logger.addHandler(error)
+    for handler in (info, error):
+        handler._pandasaurus_cxg = True
+        logger.addHandler(handler)
 
     return logger
+
+
+def log_stage(record: Dict[str, Any]):
+    """
+    Logs the record of a profiled pipeline stage as a single JSON line at INFO level.
+
+    Args:
+        record: The stage record, as returned by StageRecord.to_dict.
+    """
+    logging.getLogger(__name__).info(
+        "Pipeline stage %s", json.dumps(record), extra={"fields": {"stage": record}}
+    )
+
+
+class AggregatedWarnings:
+    """
+    Collects the repeated warnings of a stage and logs one summary per kind of warning, with the
+    number of occurrences and a sample of the offending items, instead of one message per item.
+
+    Examples:
+        with AggregatedWarnings(logger, "generate_rdf_graph") as warnings:
+            for cluster in clusters:
+                if not author_fields(cluster):
+                    warnings.add("Clusters without author fields", cluster)
+    """
+
+    def __init__(self, logger: logging.Logger, stage: str, sample_size: int = 5):
+        """
+        Initializes AggregatedWarnings instance.
+
+        Args:
+            logger: The logger the summaries are logged to.
+            stage: The name of the stage, added to every summary.
+            sample_size: The number of items kept as a sample per kind of warning. Defaults to 5.
+        """
+        self.logger = logger
+        self.stage = stage
+        self.sample_size = sample_size
+        self.counts: Dict[str, int] = {}
+        self.samples: Dict[str, List[Any]] = {}
+
+    def add(self, kind: str, item: Any):
+        """
+        Counts one occurrence of a warning.
+
+        Args:
+            kind: The warning message shared by every occurrence.
+            item: The offending item. Only the first sample_size items are kept.
+        """
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        sample = self.samples.setdefault(kind, [])
+        if len(sample) < self.sample_size:
+            sample.append(item)
+
+    def flush(self):
+        """Logs one warning per kind of warning and resets the counts."""
+        for kind, count in self.counts.items():
+            sample = self.samples[kind]
+            self.logger.warning(
+                "%s: %s: %d occurrences, e.g. %s",
+                self.stage,
+                kind,
+                count,
+                json.dumps(sample, default=str),
+                extra={
+                    "fields": {"stage": self.stage, "kind": kind, "count": count, "sample": sample}
+                },
+            )
+        self.counts.clear()
+        self.samples.clear()
+
+    def __enter__(self) -> "AggregatedWarnings":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
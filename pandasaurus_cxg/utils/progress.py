@@ -0,0 +1,247 @@
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pandasaurus_cxg.utils.exceptions import (
+    MissingOptionalDependency,
+    OperationCancelled,
+)
+
+# called with the stage name, the number of items done and the total number of items, if known
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+_active_monitor: contextvars.ContextVar[Optional["ProgressMonitor"]] = contextvars.ContextVar(
+    "active_monitor", default=None
+)
+
+
+class CancellationToken:
+    """
+    A thread-safe flag that asks the running operations to stop. The operations check the token
+    in their loops and raise OperationCancelled, so a worker can abort a job without being killed.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Requests the cancellation of the operations that check this token."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self, stage: Optional[str] = None):
+        """
+        Raises OperationCancelled if the cancellation was requested.
+
+        Args:
+            stage: The name of the stage that checks the token. Defaults to None.
+
+        Raises:
+            OperationCancelled: If the cancellation was requested.
+        """
+        if self._event.is_set():
+            raise OperationCancelled(stage)
+
+
+class ProgressMonitor:
+    """
+    Reports the progress of the stages that run while the monitor is active and lets them be
+    cancelled.
+
+    The analyzer, enricher and graph generator stages report the items they processed to the
+    monitor that is active in the current context, and check its cancellation token in their loops.
+    Without an active monitor, progress is not reported and the stages cannot be cancelled.
+
+    Examples:
+        token = CancellationToken()
+        with ProgressMonitor(lambda stage, done, total: print(stage, done, total), token):
+            graph_generator.generate_rdf_graph()
+
+        # from another thread
+        token.cancel()
+    """
+
+    def __init__(
+        self,
+        callback: Optional[ProgressCallback] = None,
+        token: Optional[CancellationToken] = None,
+        min_interval: float = 0.1,
+    ):
+        """
+        Initializes ProgressMonitor instance.
+
+        Args:
+            callback: Called with the stage name, the number of items done and the total number of
+                items, or None if the total is unknown. Defaults to None.
+            token: The cancellation token checked by the stages. Defaults to a new token.
+            min_interval: The minimum number of seconds between two reports of a stage. The start
+                and the end of a stage are always reported. Defaults to 0.1.
+        """
+        self.callback = callback
+        self.token = token if token is not None else CancellationToken()
+        self.min_interval = min_interval
+        self._context_token = None
+
+    def cancel(self):
+        """Requests the cancellation of the running stages."""
+        self.token.cancel()
+
+    def __enter__(self) -> "ProgressMonitor":
+        self._context_token = _active_monitor.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_monitor.reset(self._context_token)
+
+
+class StageProgress:
+    """
+    The progress of one stage, see track.
+
+    Attributes:
+        stage: The stage name.
+        done: The number of items done.
+        total: The total number of items, or None if it is unknown.
+    """
+
+    def __init__(self, monitor: ProgressMonitor, stage: str, total: Optional[int] = None):
+        self.stage = stage
+        self.done = 0
+        self.total = total
+        self._monitor = monitor
+        self._last_report = 0.0
+
+    def _report(self, now: float):
+        self._last_report = now
+        if self._monitor.callback is not None:
+            self._monitor.callback(self.stage, self.done, self.total)
+
+    def check_cancelled(self):
+        """
+        Raises OperationCancelled if the cancellation of the stage was requested.
+
+        Raises:
+            OperationCancelled: If the cancellation was requested.
+        """
+        self._monitor.token.raise_if_cancelled(self.stage)
+
+    def advance(self, items: int = 1):
+        """
+        Marks items as done, reports the progress if min_interval has passed since the previous
+        report and checks the cancellation token.
+
+        Args:
+            items: The number of items done. Defaults to 1.
+
+        Raises:
+            OperationCancelled: If the cancellation was requested.
+        """
+        self.done += items
+        self._monitor.token.raise_if_cancelled(self.stage)
+        now = time.monotonic()
+        if now - self._last_report >= self._monitor.min_interval:
+            self._report(now)
+
+    def __enter__(self) -> "StageProgress":
+        self.check_cancelled()
+        self._report(time.monotonic())
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self._report(time.monotonic())
+
+
+class _NullStageProgress(StageProgress):
+    def check_cancelled(self):
+        pass
+
+    def advance(self, items: int = 1):
+        pass
+
+    def __enter__(self) -> "StageProgress":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+def track(stage: str, total: Optional[int] = None) -> StageProgress:
+    """
+    Tracks the progress of a stage for the active ProgressMonitor. Used as a context manager, the
+    start and the end of the stage are reported. Without an active monitor, nothing is reported.
+
+    Args:
+        stage: The stage name.
+        total: The total number of items of the stage, or None if it is unknown. Defaults to None.
+
+    Returns:
+        The progress of the stage, advanced by the stage for every item it processed.
+    """
+    monitor = _active_monitor.get()
+    if monitor is None:
+        return _NullStageProgress(None, stage, total)
+    return StageProgress(monitor, stage, total)
+
+
+def check_cancelled(stage: Optional[str] = None):
+    """
+    Raises OperationCancelled if the cancellation was requested through the active ProgressMonitor.
+
+    Args:
+        stage: The name of the stage that checks the token. Defaults to None.
+
+    Raises:
+        OperationCancelled: If the cancellation was requested.
+    """
+    monitor = _active_monitor.get()
+    if monitor is not None:
+        monitor.token.raise_if_cancelled(stage)
+
+
+class TqdmProgress:
+    """
+    A progress callback that shows one tqdm progress bar per stage. It requires tqdm, installed with
+    the `progress` extra.
+
+    Examples:
+        with ProgressMonitor(TqdmProgress()):
+            graph_generator.add_metadata_nodes(["disease"])
+    """
+
+    def __init__(self, **tqdm_kwargs):
+        """
+        Initializes TqdmProgress instance.
+
+        Args:
+            **tqdm_kwargs: Further arguments of the tqdm progress bars.
+
+        Raises:
+            MissingOptionalDependency: If tqdm is not installed.
+        """
+        try:
+            from tqdm.auto import tqdm
+        except ImportError as e:
+            raise MissingOptionalDependency("tqdm", "progress") from e
+        self._tqdm = tqdm
+        self.tqdm_kwargs = tqdm_kwargs
+        self._bars: Dict[str, Any] = {}
+
+    def __call__(self, stage: str, done: int, total: Optional[int]):
+        bar = self._bars.get(stage)
+        if bar is None:
+            bar = self._bars[stage] = self._tqdm(desc=stage, total=total, **self.tqdm_kwargs)
+        bar.update(done - bar.n)
+        if total is not None and done >= total:
+            bar.close()
+            del self._bars[stage]
+
+    def close(self):
+        """Closes the progress bars of the unfinished stages."""
+        for bar in self._bars.values():
+            bar.close()
+        self._bars.clear()
@@ -1,19 +1,27 @@
+import gzip
 import os
 import json
+import uuid
 from types import SimpleNamespace
 
 import pandas as pd
 import pytest
 from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
+from rdflib.compare import isomorphic
+from rdflib.plugins.stores.memory import Memory
 
 from pandasaurus_cxg.enrichment_analysis import AnndataEnrichmentAnalyzer
 from pandasaurus_cxg.graph_generator.graph_generator import GraphGenerator
 from pandasaurus_cxg.graph_generator.graph_predicates import CONSIST_OF
+from pandasaurus_cxg.graph_generator.triple_stream import load_rdf_stream
 from pandasaurus_cxg.utils.exceptions import (
     InvalidGraphFormat,
     MissingAnalysisProcess,
     MissingEnrichmentProcess,
+    OperationCancelled,
 )
+from pandasaurus_cxg.utils.instrumentation import PipelineProfiler
+from pandasaurus_cxg.utils.progress import CancellationToken, ProgressMonitor
 
 
 SCHEMA_TEST_DATASET_VERSION_ID = "75c059c8-8fb7-4e6e-a618-a3e01ac42060"
@@ -728,3 +736,534 @@ def test_generate_rdf_graph_preserves_legacy_uuid_seeding_without_dataset_metada
         )
     )
     assert cluster_nodes == [URIRef(f"http://example.org/{SCHEMA_TEST_LEGACY_CLUSTER_ID}")]
+
+
+def test_generate_rdf_graph_deduplicates_clusters_with_same_content(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    # the mirrored rows produce the same cluster content with a different key order
+    mirrored_rows = graph_generator.df.iloc[[0]].rename(
+        columns={
+            "field_name1": "field_name2",
+            "value1": "value2",
+            "field_name2": "field_name1",
+            "value2": "value1",
+        }
+    )
+    graph_generator.df = pd.concat(
+        [graph_generator.df.iloc[[0]], mirrored_rows[graph_generator.df.columns]],
+        ignore_index=True,
+    )
+    graph_generator.generate_rdf_graph(merge=True)
+
+    cluster_nodes = list(
+        graph_generator.graph.subjects(
+            predicate=RDF.type, object=URIRef("http://purl.obolibrary.org/obo/PCL_0010001")
+        )
+    )
+    assert len(cluster_nodes) == 1
+
+
+def test_generate_rdf_graph_links_consist_of_to_clusters_only(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.seed_dict = {"CL:0000235": "macrophage"}
+    # a dataset level annotation sharing the cell_type predicate must not be linked
+    graph_generator.ea.enricher_manager.anndata.uns["cell_type"] = "macrophage"
+    graph_generator.generate_rdf_graph(merge=True)
+
+    cluster_node = URIRef(f"http://example.org/{SCHEMA_TEST_LEGACY_CLUSTER_ID}")
+    restrictions = list(graph_generator.graph.subjects(RDF.type, OWL.Restriction))
+    assert len(restrictions) == 1
+    assert (cluster_node, RDF.type, restrictions[0]) in graph_generator.graph
+    assert (
+        restrictions[0],
+        OWL.someValuesFrom,
+        URIRef("http://purl.obolibrary.org/obo/CL_0000235"),
+    ) in graph_generator.graph
+
+
+def test_stream_rdf_graph(graph_generator_instance_for_schema_unit_test, tmp_path):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    path = graph_generator.stream_rdf_graph(str(tmp_path / "graph"), "nt", True, merge=True)
+
+    assert path == str(tmp_path / "graph.nt.gz")
+    assert len(graph_generator.graph) == 0
+    assert graph_generator._cluster_index == {}
+
+    graph_generator.generate_rdf_graph(merge=True)
+    assert set(load_rdf_stream(path)) == set(graph_generator.graph)
+
+    graph_generator.convert_rdf_stream(path, str(tmp_path / "graph"), "ttl")
+    assert set(Graph().parse(str(tmp_path / "graph.ttl"))) == set(graph_generator.graph)
+
+
+SCHEMA_TEST_OBS = pd.DataFrame(
+    {
+        "subclass.full": ["Monocyte-derived macrophages"] * 5,
+        "subclass.l1": ["macrophage"] * 5,
+        "author_cell_type": ["Monocyte-derived macrophages"] * 5,
+        "tissue": ["lung", "lung", "lung", "free text", "free text"],
+        "tissue_ontology_term_id": ["UBERON:0002048"] * 3 + ["na"] * 2,
+    },
+    dtype="category",
+)
+
+
+def test_add_metadata_nodes(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.anndata.obs = SCHEMA_TEST_OBS
+    graph_generator.generate_rdf_graph(merge=True)
+    graph_generator.add_metadata_nodes(["tissue"])
+
+    cluster_node = URIRef(f"http://example.org/{SCHEMA_TEST_LEGACY_CLUSTER_ID}")
+    axioms = list(graph_generator.graph.subjects(OWL.annotatedSource, cluster_node))
+    # one axiom per author field and tissue label
+    assert len(axioms) == 6
+    percentages = {
+        (
+            str(graph_generator.graph.value(axiom, OWL.annotatedTarget)),
+            str(graph_generator.graph.value(axiom, URIRef("http://example.org/percentage"))),
+        )
+        for axiom in axioms
+    }
+    lung = "http://purl.obolibrary.org/obo/UBERON_0002048"
+    assert (lung, "60.00") in percentages
+    assert {percentage for target, percentage in percentages if target != lung} == {"40.00"}
+
+    with pytest.raises(KeyError):
+        graph_generator.add_metadata_nodes(["disease"])
+
+
+def test_add_metadata_nodes_shares_stable_target_nodes(
+    graph_generator_instance_for_schema_unit_test_with_metadata,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test_with_metadata
+    graph_generator.ea.enricher_manager.anndata.obs = SCHEMA_TEST_OBS
+    graph_generator.generate_rdf_graph(merge=True)
+    graph_generator.add_metadata_nodes(["tissue"])
+
+    free_text_nodes = list(graph_generator.graph.subjects(RDFS.label, Literal("free text")))
+    assert len(free_text_nodes) == 1
+    assert free_text_nodes[0] == URIRef(
+        f"http://example.org/{uuid.uuid5(uuid.UUID(SCHEMA_TEST_DATASET_ID), 'tissue:free text')}"
+    )
+    # every author field of the cluster points at the same free text node
+    assert len(list(graph_generator.graph.subjects(OWL.annotatedTarget, free_text_nodes[0]))) == 3
+
+
+def test_add_metadata_nodes_with_edge_percentage_mode(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.anndata.obs = SCHEMA_TEST_OBS
+    graph_generator.generate_rdf_graph(merge=True)
+    graph_size = len(graph_generator.graph)
+    graph_generator.add_metadata_nodes(["tissue"], percentage_mode="edge")
+
+    cluster_node = URIRef(f"http://example.org/{SCHEMA_TEST_LEGACY_CLUSTER_ID}")
+    lung = URIRef("http://purl.obolibrary.org/obo/UBERON_0002048")
+    assert (cluster_node, URIRef("http://example.org/tissue"), lung) in graph_generator.graph
+    assert not list(graph_generator.graph.subjects(RDF.type, OWL.Axiom))
+    # one edge per cluster and label, plus the label and type of both targets
+    assert len(graph_generator.graph) - graph_size == 2 + 4
+
+    percentages = graph_generator.metadata_percentages
+    assert len(percentages) == 6
+    assert set(percentages.columns) == {"cluster", "metadata", "target", "label", "percentage"}
+    assert set(percentages[percentages["target"] == lung]["percentage"]) == {60.0}
+
+    with pytest.raises(ValueError):
+        graph_generator.add_metadata_nodes(["tissue"], percentage_mode="invalid")
+
+
+def test_add_label_to_terms_with_external_graph(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.set_label_adding_priority(["subclass.full", "subclass.l1"])
+    subject = URIRef("http://example.org/subject")
+    blank_subject = BNode()
+    sample_graph = Graph()
+    sample_graph.add((subject, URIRef("http://example.org/subclass.l1"), Literal("macrophage")))
+    sample_graph.add((subject, URIRef("http://example.org/subclass.full"), Literal("MDM")))
+    sample_graph.add((subject, URIRef("http://example.org/unranked"), Literal("unranked")))
+    sample_graph.add((blank_subject, URIRef("http://example.org/subclass.full"), Literal("blank")))
+
+    graph_generator.add_label_to_terms(sample_graph)
+
+    assert set(sample_graph.objects(subject, RDFS.label)) == {Literal("MDM")}
+    assert (blank_subject, RDFS.label, None) not in sample_graph
+    assert len(graph_generator.graph) == 0
+
+
+def test_enrich_rdf_graph_without_copying_triples(
+    graph_generator_instance_for_schema_unit_test, tmp_path
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    cl = Namespace("http://purl.obolibrary.org/obo/CL_")
+    enrichment_graph = Graph()
+    enrichment_graph.add((cl["0000235"], RDFS.subClassOf, cl["0000113"]))
+    enrichment_graph.add((cl["0000113"], RDFS.label, Literal("mononuclear phagocyte")))
+    # not reachable from the seed cell types
+    enrichment_graph.add((cl["0000084"], RDFS.subClassOf, cl["0000000"]))
+    graph_generator.ea.enricher_manager.seed_dict = {"CL:0000235": "macrophage"}
+    graph_generator.ea.enricher_manager.enricher = SimpleNamespace(
+        enriched_df=pd.DataFrame({"s": ["CL:0000235"]}), graph=enrichment_graph
+    )
+    graph_generator.generate_rdf_graph(merge=True)
+    graph_size = len(graph_generator.graph)
+
+    graph_generator.enrich_rdf_graph(copy_triples=False, prune=True)
+
+    assert len(graph_generator.graph) == graph_size
+    combined_graph = graph_generator.get_rdf_graph()
+    assert len(combined_graph) == graph_size + 2
+    assert (cl["0000235"], RDFS.subClassOf, cl["0000113"]) in combined_graph
+    assert (cl["0000084"], RDFS.subClassOf, cl["0000000"]) not in combined_graph
+
+    graph_generator.save_rdf_graph(file_name=str(tmp_path / "graph"), _format="nt")
+    saved_graph = Graph().parse(str(tmp_path / "graph.nt"))
+    assert len(saved_graph) == len(combined_graph)
+    assert (cl["0000235"], RDFS.subClassOf, cl["0000113"]) in saved_graph
+
+
+def store_test_analyzer():
+    report_df = pd.DataFrame(
+        [["subclass.l1", "macrophage", "cluster_matches", "cell_type", "macrophage", 5, 5]],
+        columns=[
+            "field_name1",
+            "value1",
+            "predicate",
+            "field_name2",
+            "value2",
+            "field_name1_cell_count",
+            "field_name2_cell_count",
+        ],
+    )
+    return SimpleNamespace(
+        analyzer_manager=SimpleNamespace(
+            report_df=report_df, all_cell_type_identifiers=["subclass.l1", "cell_type"]
+        ),
+        enricher_manager=SimpleNamespace(
+            anndata=SimpleNamespace(
+                uns={},
+                obs=pd.DataFrame(
+                    {
+                        "subclass.l1": ["macrophage"],
+                        "tissue": ["lung"],
+                        "tissue_ontology_term_id": ["na"],
+                    }
+                ),
+            ),
+            seed_dict={"CL:0000235": "macrophage"},
+        ),
+    )
+
+
+def test_graph_generator_with_configured_store(mocker):
+    ea = store_test_analyzer()
+    open_store = mocker.patch("rdflib.plugins.stores.memory.Memory.open")
+    add_n = mocker.spy(Graph, "addN")
+    graph_generator = GraphGenerator(
+        ea,
+        dataset_metadata={"dataset_id": SCHEMA_TEST_DATASET_ID},
+        store="Memory",
+        store_path="graph_store",
+        batch_size=5,
+    )
+    open_store.assert_called_once_with("graph_store", True)
+
+    graph_generator.generate_rdf_graph()
+    graph_generator.add_metadata_nodes(["tissue"])
+
+    graph_size = len(graph_generator.graph)
+    # triples reach the store in batches of at most batch_size triples
+    assert add_n.call_count >= graph_size // 5
+    assert all(len(call.args[1]) <= 5 for call in add_n.call_args_list)
+
+    # a generator opened on an already populated store restores its cluster index
+    restored_generator = GraphGenerator(ea, dataset_metadata={"dataset_id": SCHEMA_TEST_DATASET_ID})
+    restored_generator.graph = graph_generator.graph
+    restored_generator.generate_rdf_graph()
+    restored_generator.add_metadata_nodes(["tissue"])
+    assert restored_generator._dataset_seed_id == SCHEMA_TEST_DATASET_ID
+    assert graph_generator._cluster_index.items() <= restored_generator._cluster_index.items()
+    assert len(list(restored_generator.graph.subjects(RDFS.label, Literal("lung")))) == 1
+    assert len(list(restored_generator.graph.subjects(RDF.type, OWL.Axiom))) == 2
+
+
+def test_add_metadata_nodes_on_a_reopened_store():
+    ea = store_test_analyzer()
+    store = Memory()
+    graph_generator = GraphGenerator(
+        ea, dataset_metadata={"dataset_id": SCHEMA_TEST_DATASET_ID}, store=store
+    )
+    graph_generator.generate_rdf_graph()
+    graph_size = len(graph_generator.graph)
+
+    # a new generator on the same store sees the graph without generating it again
+    reopened_generator = GraphGenerator(
+        ea, dataset_metadata={"dataset_id": SCHEMA_TEST_DATASET_ID}, store=store
+    )
+    assert len(reopened_generator.graph) == graph_size
+    reopened_generator.add_metadata_nodes(["tissue"])
+
+    assert reopened_generator._dataset_seed_id == SCHEMA_TEST_DATASET_ID
+    assert len(list(reopened_generator.graph.subjects(RDFS.label, Literal("lung")))) == 1
+    assert len(list(reopened_generator.graph.subjects(RDF.type, OWL.Axiom))) == 1
+
+
+def test_build_triple_table(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    table = graph_generator.build_triple_table(merge=True)
+
+    assert len(graph_generator.graph) == 0
+    graph_generator.generate_rdf_graph(merge=True)
+    assert set(table.to_graph()) == set(graph_generator.graph)
+
+
+def test_save_rdf_graph_with_compression_and_shards(
+    graph_generator_instance_for_schema_unit_test, tmp_path
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.generate_rdf_graph(merge=True)
+    file_name = str(tmp_path / "graph")
+
+    paths = graph_generator.save_rdf_graph(file_name=file_name, _format="ttl", compression="gzip")
+    assert paths == [f"{file_name}.ttl.gz"]
+    with gzip.open(paths[0]) as source:
+        assert set(Graph().parse(source, format="ttl")) == set(graph_generator.graph)
+
+    paths = graph_generator.save_rdf_graph(file_name=file_name, _format="nt", shards=2)
+    assert len(paths) == 2
+    assert set().union(*(set(load_rdf_stream(path)) for path in paths)) == set(
+        graph_generator.graph
+    )
+
+    with pytest.raises(ValueError):
+        graph_generator.save_rdf_graph(file_name=file_name, _format="ttl", shards=2)
+
+
+def test_benchmark_serialization(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.generate_rdf_graph(merge=True)
+
+    benchmark = graph_generator.benchmark_serialization(repeat=1)
+
+    assert set(benchmark["format"]) == {"xml", "ttl", "nt"}
+    assert (benchmark["triples"] == len(graph_generator.graph)).all()
+    assert (benchmark["bytes"] > 0).all()
+    assert benchmark["seconds"].is_monotonic_increasing
+
+
+def test_save_and_load_graph_snapshot(graph_generator_instance_for_schema_unit_test, tmp_path):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.seed_dict = {"CL:0000235": "macrophage"}
+    graph_generator.generate_rdf_graph(merge=True)
+
+    graph_generator.save_graph_snapshot(str(tmp_path / "graph.snapshot"))
+    graph = graph_generator.load_graph_snapshot(str(tmp_path / "graph.snapshot"))
+
+    # blank node ids are kept, so the loaded graph is identical
+    assert set(graph) == set(graph_generator.graph)
+
+
+def test_extract_subgraph_reuses_adjacency_index(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.seed_dict = {"CL:0000235": "macrophage"}
+    graph_generator.generate_rdf_graph(merge=True)
+
+    index = graph_generator.get_adjacency_index()
+    assert graph_generator.get_adjacency_index() is index
+
+    cluster_class = URIRef("http://purl.obolibrary.org/obo/PCL_0010001")
+    clusters = [str(s) for s in graph_generator.graph.subjects(RDF.type, cluster_class)]
+    subgraph = graph_generator.extract_subgraph(clusters)
+    assert set(subgraph.subjects(RDF.type, cluster_class)) == {URIRef(c) for c in clusters}
+
+    graph_generator.graph.add((URIRef(clusters[0]), RDFS.comment, Literal("changed")))
+    assert graph_generator.get_adjacency_index() is not index
+
+
+def test_adjacency_index_is_invalidated_when_a_triple_is_replaced(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.generate_rdf_graph(merge=True)
+    cluster_class = URIRef("http://purl.obolibrary.org/obo/PCL_0010001")
+    cluster = next(graph_generator.graph.subjects(RDF.type, cluster_class))
+    old_target, new_target = URIRef("http://example.org/old"), URIRef("http://example.org/new")
+    graph_generator.graph.add((cluster, RDFS.seeAlso, old_target))
+    index = graph_generator.get_adjacency_index()
+    assert (RDFS.seeAlso, old_target) in index.outgoing[cluster]
+
+    # a replaced triple keeps the graph size, so the index has to be invalidated explicitly
+    graph_generator.graph.remove((cluster, RDFS.seeAlso, old_target))
+    graph_generator.graph.add((cluster, RDFS.seeAlso, new_target))
+    assert graph_generator.get_adjacency_index() is index
+    graph_generator.invalidate_indexes()
+    index = graph_generator.get_adjacency_index()
+    assert (RDFS.seeAlso, new_target) in index.outgoing[cluster]
+    assert (RDFS.seeAlso, old_target) not in index.outgoing[cluster]
+
+    # the methods that change the graph invalidate the index themselves
+    graph_generator.set_label_adding_priority(["cell_type"])
+    graph_generator.add_label_to_terms()
+    assert graph_generator.get_adjacency_index() is not index
+
+
+def test_render_subgraphs_of_top_level_clusters(
+    graph_generator_instance_for_schema_unit_test, mocker, tmp_path
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    graph_generator.ea.enricher_manager.seed_dict = {"CL:0000235": "macrophage"}
+    graph_generator.generate_rdf_graph(merge=True)
+    mocker.patch(
+        "pandasaurus_cxg.graph_generator.subgraph_renderer.find_and_rotate_center_layout",
+        side_effect=lambda graph: {node: (i, i) for i, node in enumerate(graph)},
+    )
+
+    paths = graph_generator.render_subgraphs(output_dir=str(tmp_path), processes=1)
+
+    cluster_class = URIRef("http://purl.obolibrary.org/obo/PCL_0010001")
+    subcluster_of = URIRef("http://purl.obolibrary.org/obo/RO_0015003")
+    top_level_clusters = [
+        cluster
+        for cluster in graph_generator.graph.subjects(RDF.type, cluster_class)
+        if (cluster, subcluster_of, None) not in graph_generator.graph
+    ]
+    assert len(paths) == len(top_level_clusters) > 0
+    assert all(os.path.exists(path) and path.endswith(".svg") for path in paths)
+
+    with pytest.raises(ValueError):
+        graph_generator.render_subgraphs(start_nodes=["http://example.org/missing"], processes=1)
+
+
+def test_find_nodes_rebuilds_index_when_graph_changes(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    node = URIRef("http://example.org/node")
+    graph_generator.graph.add((node, RDFS.label, Literal("Alveolar macrophage")))
+
+    assert graph_generator.find_nodes("label", "alveolar", ignore_case=True, prefix=True) == [
+        str(node)
+    ]
+    index = graph_generator.get_property_index()
+    assert graph_generator.get_property_index() is index
+
+    graph_generator.graph.add((node, RDFS.label, Literal("Lung macrophage")))
+    assert graph_generator.find_nodes("label", "Lung macrophage") == [str(node)]
+    assert graph_generator.get_property_index() is not index
+
+    # a replaced label keeps the graph size, so the index has to be invalidated explicitly
+    graph_generator.graph.remove((node, RDFS.label, Literal("Lung macrophage")))
+    graph_generator.graph.add((node, RDFS.label, Literal("Interstitial macrophage")))
+    graph_generator.invalidate_indexes()
+    assert graph_generator.find_nodes("label", "Lung macrophage") == []
+    assert graph_generator.find_nodes("label", "Interstitial macrophage") == [str(node)]
+
+
+def test_generate_rdf_graph_with_census_version_override(
+    graph_generator_instance_for_schema_unit_test,
+):
+    graph_generator = GraphGenerator(
+        graph_generator_instance_for_schema_unit_test.ea, census_version="2024-07-01"
+    )
+    graph_generator.generate_rdf_graph()
+
+    assert set(graph_generator.graph.objects(None, graph_generator.ns.census_version_cached)) == {
+        Literal("2024-07-01")
+    }
+
+
+def test_generate_rdf_graph_reports_pipeline_stages(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+
+    with PipelineProfiler(log_stages=False) as profiler:
+        graph_generator.generate_rdf_graph()
+
+    records = {record.name: record for record in profiler.records}
+    assert list(records) == [
+        f"graph_generator.generate_rdf_graph/{step}"
+        for step in [
+            "dataset",
+            "cluster_grouping",
+            "cluster_nodes",
+            "linking",
+            "transitive_reduction",
+            "consist_of",
+        ]
+    ] + ["graph_generator.generate_rdf_graph"]
+    assert records["graph_generator.generate_rdf_graph"].counts["triples"] == len(
+        graph_generator.graph
+    )
+
+
+def test_generate_rdf_graph_aggregates_missing_author_field_warnings(
+    graph_generator_instance_for_schema_unit_test, mocker
+):
+    ea = graph_generator_instance_for_schema_unit_test.ea
+    ea.analyzer_manager.report_df = pd.DataFrame(
+        [
+            ["cell_type", cell_type, "subcluster_of", "subclass.l1", "myeloid cell", 5, 5]
+            for cell_type in ["macrophage", "monocyte", "dendritic cell"]
+        ],
+        columns=ea.analyzer_manager.report_df.columns,
+    )
+    warning = mocker.patch("pandasaurus_cxg.graph_generator.graph_generator.logger.warning")
+
+    GraphGenerator(ea).generate_rdf_graph()
+
+    warning.assert_called_once()
+    fields = warning.call_args.kwargs["extra"]["fields"]
+    assert fields["count"] == 3
+    assert [cluster["content"]["cell_type"] for cluster in fields["sample"]] == [
+        "dendritic cell",
+        "macrophage",
+        "monocyte",
+    ]
+
+
+def test_generate_rdf_graph_reports_progress(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    reports = []
+
+    with ProgressMonitor(lambda *report: reports.append(report)):
+        graph_generator.generate_rdf_graph()
+        graph_generator.set_label_adding_priority(["subclass.l1"])
+        graph_generator.add_label_to_terms()
+
+    finished = {stage: (done, total) for stage, done, total in reports}
+    assert list(finished) == [
+        "graph_generator.generate_rdf_graph/cluster_grouping",
+        "graph_generator.generate_rdf_graph/cluster_nodes",
+        "graph_generator.generate_rdf_graph/linking",
+        "graph_generator.generate_rdf_graph/consist_of",
+        "graph_generator.add_label_to_terms",
+    ]
+    assert all(done == total for done, total in finished.values())
+
+
+def test_generate_rdf_graph_can_be_cancelled(graph_generator_instance_for_schema_unit_test):
+    graph_generator = graph_generator_instance_for_schema_unit_test
+    # every triple is inserted on its own, so the cancelled generation has written triples
+    graph_generator.batch_size = 1
+    token = CancellationToken()
+
+    def cancel_after_grouping(stage, done, total):
+        if stage.endswith("cluster_grouping") and done == total:
+            token.cancel()
+
+    with ProgressMonitor(cancel_after_grouping, token):
+        with pytest.raises(OperationCancelled, match="cluster_nodes"):
+            graph_generator.generate_rdf_graph()
+
+    assert len(graph_generator.graph) == 0
+
+    # a retry generates the whole graph instead of keeping the partial one
+    graph_generator.generate_rdf_graph()
+    clean_generator = GraphGenerator(graph_generator.ea)
+    clean_generator.generate_rdf_graph()
+    assert isomorphic(graph_generator.graph, clean_generator.graph)
@@ -1,15 +1,25 @@
+import time
+
 import networkx as nx
 import pytest
 from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, Namespace, URIRef
 
 from pandasaurus_cxg.graph_generator.graph_generator_utils import (
+    AdjacencyIndex,
+    PropertyIndex,
     add_edge,
     add_node,
     add_outgoing_edges_to_subgraph,
+    census_version_retry_ttl,
+    census_version_ttl,
+    cluster_content_key,
     find_and_rotate_center_layout,
     generate_subgraph,
+    get_census_version_cached,
     ncname_safe,
     select_node_with_property,
+    set_census_version_resolver,
+    transitive_reduction,
 )
 from pandasaurus_cxg.graph_generator.graph_predicates import (
     CLUSTER,
@@ -167,6 +177,23 @@ def test_generate_subgraph_top_down():
     ) in subgraph
 
 
+def test_adjacency_index_generate_subgraph_from_multiple_roots():
+    index = AdjacencyIndex(sample_graph)
+    assert index.restrictions == {bnode: (subject2, URIRef(CONSIST_OF.get("iri")), cl_term)}
+
+    subgraph = index.generate_subgraph([subject1, subject2], predicate1, bottom_up=True)
+
+    assert set(subgraph) == {
+        (subject1, predicate1, object1),
+        (subject1, predicate1, subject3),
+        (subject3, predicate1, subject4),
+        (subject2, predicate1, subject1),
+    }
+    assert set(subgraph) == set(
+        generate_subgraph(sample_graph, predicate1, [subject1], True)
+    ) | set(generate_subgraph(sample_graph, predicate1, [subject2], True))
+
+
 def test_select_node_with_property_label():
     _property = "label"
     value = "Label1"
@@ -187,6 +214,40 @@ def test_select_node_with_property_predicate():
     assert "http://example.org/subject2" in result
 
 
+@pytest.mark.parametrize(
+    "_property, value, ignore_case, prefix, expected",
+    [
+        ("label", "Label1", False, False, ["http://example.org/subject1"]),
+        ("label", "label1", False, False, []),
+        ("label", "label1", True, False, ["http://example.org/subject1"]),
+        (
+            "label",
+            "Lab",
+            False,
+            True,
+            ["http://example.org/subject1", "http://example.org/subject2"],
+        ),
+        ("label", "lab", False, True, []),
+        (
+            "label",
+            "lab",
+            True,
+            True,
+            ["http://example.org/subject1", "http://example.org/subject2"],
+        ),
+        ("predicate3", "VALUE", True, True, ["http://example.org/subject2"]),
+    ],
+)
+def test_property_index_select(_property, value, ignore_case, prefix, expected):
+    index = PropertyIndex(sample_graph)
+
+    assert index.select(_property, value, ignore_case, prefix) == expected
+    assert (
+        select_node_with_property(sample_graph, _property, value, ignore_case, prefix, index)
+        == expected
+    )
+
+
 @pytest.mark.parametrize(
     "input_string, expected_output",
     [
@@ -201,3 +262,93 @@ def test_select_node_with_property_predicate():
 )
 def test_ncname_safe(input_string, expected_output):
     assert ncname_safe(input_string) == expected_output
+
+
+def test_cluster_content_key():
+    cluster = {"subclass.l1": "B cell", "cell_count": 5, "cluster_matches": {"a": "1", "b": "2"}}
+    reordered_cluster = {
+        "cluster_matches": {"b": "2", "a": "1"},
+        "cell_count": 5,
+        "subclass.l1": "B cell",
+    }
+
+    assert cluster_content_key(cluster) == cluster_content_key(reordered_cluster)
+    assert hash(cluster_content_key(cluster)) == hash(cluster_content_key(reordered_cluster))
+    assert cluster_content_key(cluster) != cluster_content_key({**cluster, "cell_count": 6})
+
+
+def test_transitive_reduction():
+    edges = [(0, 1), (1, 2), (0, 2), (2, 3), (0, 3), (1, 3), (4, 3)]
+
+    expected = sorted(nx.transitive_reduction(nx.DiGraph(edges)).edges())
+
+    assert transitive_reduction(edges, 5) == expected
+    assert transitive_reduction([], 3) == []
+    with pytest.raises(ValueError):
+        transitive_reduction([(0, 1), (1, 0)], 2)
+
+
+@pytest.fixture
+def census_resolver(monkeypatch):
+    monkeypatch.delenv("PANDASAURUS_CXG_CENSUS_VERSION", raising=False)
+    calls = []
+
+    def resolver(requested_version):
+        calls.append(requested_version)
+        return "2025-11-08"
+
+    set_census_version_resolver(resolver)
+    yield calls
+    set_census_version_resolver()
+
+
+def test_get_census_version_cached_memoizes_and_caches_on_disk(census_resolver, tmp_path):
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2025-11-08"
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2025-11-08"
+    assert census_resolver == ["stable"]
+
+    # a new process starts with an empty in-process cache and reads the version from disk
+    set_census_version_resolver(lambda requested_version: pytest.fail("resolver was called"))
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2025-11-08"
+
+
+def test_get_census_version_cached_falls_back_to_expired_version(census_resolver, tmp_path):
+    get_census_version_cached(cache_dir=str(tmp_path))
+
+    def offline_resolver(requested_version):
+        raise ConnectionError("offline")
+
+    set_census_version_resolver(offline_resolver)
+    assert get_census_version_cached(ttl=0, cache_dir=str(tmp_path)) == "2025-11-08"
+    with pytest.raises(ConnectionError):
+        get_census_version_cached("latest", ttl=0, cache_dir=str(tmp_path))
+
+
+def test_get_census_version_cached_retries_after_fallback(census_resolver, monkeypatch, tmp_path):
+    get_census_version_cached(cache_dir=str(tmp_path))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    calls = []
+
+    def offline_resolver(requested_version):
+        calls.append(requested_version)
+        raise ConnectionError("offline")
+
+    set_census_version_resolver(offline_resolver)
+    now += census_version_ttl + 1
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2025-11-08"
+    # the fallback is cached, also on disk for other processes, until the retry ttl has passed
+    set_census_version_resolver(offline_resolver)
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2025-11-08"
+    assert calls == ["stable"]
+
+    now += census_version_retry_ttl
+    set_census_version_resolver(lambda requested_version: "2026-01-15")
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2026-01-15"
+
+
+def test_get_census_version_cached_with_override(census_resolver, monkeypatch, tmp_path):
+    assert get_census_version_cached(version="2024-07-01", cache_dir=str(tmp_path)) == "2024-07-01"
+    monkeypatch.setenv("PANDASAURUS_CXG_CENSUS_VERSION", "2023-12-15")
+    assert get_census_version_cached(cache_dir=str(tmp_path)) == "2023-12-15"
+    assert census_resolver == []
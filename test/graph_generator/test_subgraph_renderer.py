@@ -0,0 +1,88 @@
+import networkx as nx
+import pytest
+from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, URIRef
+
+from pandasaurus_cxg.graph_generator.graph_generator_utils import AdjacencyIndex
+from pandasaurus_cxg.graph_generator.graph_predicates import CONSIST_OF
+from pandasaurus_cxg.graph_generator.subgraph_renderer import (
+    SubgraphRenderer,
+    build_visualization_graph,
+    reduce_visualization_graph,
+    subgraph_key,
+)
+
+ex = "http://example.org/"
+subclass_of = URIRef(f"{ex}subclass_of")
+cl_term = URIRef("http://purl.obolibrary.org/obo/CL_0000000")
+
+
+@pytest.fixture
+def sample_graph():
+    graph = Graph()
+    restriction = BNode()
+    for name in ("a", "b", "c"):
+        graph.add((URIRef(f"{ex}{name}"), RDF.type, OWL.Class))
+        graph.add((URIRef(f"{ex}{name}"), RDFS.label, Literal(name)))
+    graph.add((URIRef(f"{ex}a"), subclass_of, URIRef(f"{ex}b")))
+    graph.add((URIRef(f"{ex}b"), subclass_of, URIRef(f"{ex}c")))
+    # redundant edge that the transitive reduction removes
+    graph.add((URIRef(f"{ex}a"), subclass_of, URIRef(f"{ex}c")))
+    graph.add((restriction, RDF.type, OWL.Restriction))
+    graph.add((restriction, OWL.onProperty, URIRef(CONSIST_OF["iri"])))
+    graph.add((restriction, OWL.someValuesFrom, cl_term))
+    graph.add((URIRef(f"{ex}c"), RDF.type, restriction))
+    return graph
+
+
+@pytest.fixture
+def fake_layout(mocker):
+    return mocker.patch(
+        "pandasaurus_cxg.graph_generator.subgraph_renderer.find_and_rotate_center_layout",
+        side_effect=lambda graph: {node: (i, i) for i, node in enumerate(graph)},
+    )
+
+
+def test_reduced_edges_match_per_subgraph_reduction(sample_graph):
+    renderer = SubgraphRenderer(AdjacencyIndex(sample_graph))
+
+    for roots in ([URIRef(f"{ex}a")], [URIRef(f"{ex}b")]):
+        nx_graph = build_visualization_graph(renderer.index.generate_subgraph(roots))
+        assert set(renderer.visualization_graph(roots).edges) == set(
+            reduce_visualization_graph(nx_graph).edges
+        )
+    assert (f"{ex}a", f"{ex}c") not in renderer.reduced_edges()
+    assert (f"{ex}c", str(cl_term)) in renderer.reduced_edges()
+
+
+def test_render_writes_files_and_caches_layouts(sample_graph, fake_layout, tmp_path):
+    renderer = SubgraphRenderer(AdjacencyIndex(sample_graph))
+    root_sets = {"a": [URIRef(f"{ex}a")], "a_again": [URIRef(f"{ex}a")], "b": [URIRef(f"{ex}b")]}
+
+    paths = renderer.render(root_sets, str(tmp_path), "svg", processes=1)
+
+    assert paths == [str(tmp_path / f"{name}.svg") for name in root_sets]
+    assert all(
+        (tmp_path / f"{name}.svg").read_text().lstrip().startswith("<?xml") for name in root_sets
+    )
+    # a and a_again share their subgraph, so only two layouts are computed
+    assert fake_layout.call_count == 2
+
+    renderer.render({"b": [URIRef(f"{ex}b")]}, str(tmp_path), "png", processes=1)
+    assert fake_layout.call_count == 2
+
+
+def test_render_with_invalid_format(sample_graph, tmp_path):
+    renderer = SubgraphRenderer(AdjacencyIndex(sample_graph))
+
+    with pytest.raises(ValueError):
+        renderer.render({"a": [URIRef(f"{ex}a")]}, str(tmp_path), "gif")
+
+
+def test_subgraph_key_ignores_insertion_order():
+    graph, reversed_graph = nx.DiGraph(), nx.DiGraph()
+    graph.add_edge("x", "y", label="l")
+    graph.add_edge("y", "z", label="l")
+    reversed_graph.add_edge("y", "z", label="l")
+    reversed_graph.add_edge("x", "y", label="l")
+
+    assert subgraph_key(graph) == subgraph_key(reversed_graph)
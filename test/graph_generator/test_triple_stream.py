@@ -0,0 +1,147 @@
+import gzip
+import sys
+
+import pytest
+from rdflib import OWL, RDF, RDFS, BNode, Graph, Literal, URIRef
+
+from pandasaurus_cxg.graph_generator.triple_stream import (
+    TripleStreamWriter,
+    load_rdf_stream,
+    open_compressed,
+    write_ntriples_shards,
+)
+from pandasaurus_cxg.utils.exceptions import (
+    InvalidGraphFormat,
+    MissingOptionalDependency,
+)
+
+TRIPLES = [
+    (URIRef("http://example.org/subject"), RDF.type, URIRef("http://example.org/Class")),
+    (URIRef("http://example.org/subject"), RDFS.label, Literal('multi\nline "label"\\')),
+    (URIRef("http://example.org/subject"), RDFS.comment, Literal("comment", lang="en")),
+    (URIRef("http://example.org/restriction"), OWL.cardinality, Literal(1)),
+]
+
+
+@pytest.mark.parametrize(
+    "_format, compress, expected_extension",
+    [
+        ("nt", False, "nt"),
+        ("nt", True, "nt.gz"),
+        ("nquads", False, "nq"),
+        ("nquads", True, "nq.gz"),
+    ],
+)
+def test_triple_stream_writer_round_trip(tmp_path, _format, compress, expected_extension):
+    with TripleStreamWriter(
+        str(tmp_path / "graph"), _format, compress, context=URIRef("http://example.org/graph")
+    ) as writer:
+        writer.add_all(TRIPLES)
+
+    assert writer.path == str(tmp_path / f"graph.{expected_extension}")
+    assert len(writer) == 4
+    if compress:
+        with gzip.open(writer.path, "rt", encoding="utf-8") as stream:
+            lines = stream.readlines()
+    else:
+        with open(writer.path, encoding="utf-8") as stream:
+            lines = stream.readlines()
+    # triples are written one per line in the order they are added
+    assert len(lines) == 4
+    assert lines[0].startswith("<http://example.org/subject> <http://www.w3.org/1999/02/22")
+    assert set(load_rdf_stream(writer.path)) == set(TRIPLES)
+
+
+def test_triple_stream_writer_invalid_format(tmp_path):
+    with pytest.raises(InvalidGraphFormat):
+        TripleStreamWriter(str(tmp_path / "graph"), "xml")
+
+    with pytest.raises(InvalidGraphFormat):
+        load_rdf_stream(str(tmp_path / "graph.owl"))
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_write_ntriples_shards(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    graph = Graph()
+    for i in range(20):
+        cluster = URIRef(f"http://example.org/cluster{i}")
+        restriction = BNode()
+        graph.add((cluster, RDFS.label, Literal(f"cluster {i}")))
+        graph.add((cluster, RDF.type, restriction))
+        graph.add((restriction, RDF.type, OWL.Restriction))
+        graph.add((restriction, OWL.someValuesFrom, URIRef("http://example.org/cell")))
+
+    paths = write_ntriples_shards(graph, str(tmp_path / "graph"), 4, compression)
+
+    assert len(paths) == 4
+    assert paths[0].startswith(str(tmp_path / "graph-0000-of-0004.nt"))
+    shard_graphs = [load_rdf_stream(path) for path in paths]
+    assert sum(len(shard_graph) for shard_graph in shard_graphs) == len(graph)
+    for shard_graph in shard_graphs:
+        # every restriction is written to the same shard as the cluster using it
+        for restriction in shard_graph.subjects(RDF.type, OWL.Restriction):
+            assert (None, RDF.type, restriction) in shard_graph
+
+    with pytest.raises(ValueError):
+        write_ntriples_shards(graph, str(tmp_path / "graph"), 0)
+
+
+def test_write_ntriples_shards_rolls_over(tmp_path):
+    graph = Graph()
+    for i in range(20):
+        cluster = URIRef(f"http://example.org/cluster{i}")
+        graph.add((cluster, RDFS.label, Literal(f"cluster {i}")))
+    restriction = BNode()
+    graph.add((URIRef("http://example.org/cluster0"), RDF.type, restriction))
+    graph.add((restriction, RDF.type, OWL.Restriction))
+    graph.add((restriction, OWL.someValuesFrom, URIRef("http://example.org/cell")))
+
+    paths = write_ntriples_shards(graph, str(tmp_path / "graph"), 2, max_triples_per_shard=2)
+
+    assert paths[0] == str(tmp_path / "graph-0000-of-0002-0000.nt")
+    shard_graphs = [load_rdf_stream(path) for path in paths]
+    assert sum(len(shard_graph) for shard_graph in shard_graphs) == len(graph)
+    # the triples of the restriction are kept in one file, which may exceed the limit
+    assert sorted(len(shard_graph) for shard_graph in shard_graphs)[-1] == 3
+    assert sum(len(shard_graph) > 2 for shard_graph in shard_graphs) == 1
+
+    with pytest.raises(ValueError):
+        write_ntriples_shards(graph, str(tmp_path / "graph"), 2, max_triples_per_shard=0)
+
+
+class CountingGraph(Graph):
+    passes = 0
+
+    def __iter__(self):
+        CountingGraph.passes += 1
+        return super().__iter__()
+
+
+def test_write_ntriples_shards_partitions_the_graph_in_one_pass(tmp_path):
+    graph = CountingGraph()
+    for i in range(2500):
+        graph.add((URIRef(f"http://example.org/cluster{i}"), RDFS.label, Literal(f"cluster {i}")))
+    CountingGraph.passes = 0
+
+    paths = write_ntriples_shards(graph, str(tmp_path / "graph"), 3, "gzip")
+
+    assert CountingGraph.passes == 1
+    assert sum(len(load_rdf_stream(path)) for path in paths) == len(graph)
+
+    # a failing shard writer is raised instead of blocking the partitioning pass
+    with pytest.raises(FileNotFoundError):
+        write_ntriples_shards(graph, str(tmp_path / "missing" / "graph"), 3)
+
+
+def test_open_compressed_invalid_compression(tmp_path):
+    with pytest.raises(ValueError):
+        open_compressed(str(tmp_path / "graph.nt"), "wt", "bzip2")
+
+
+def test_open_compressed_zstd_without_zstandard(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+
+    with pytest.raises(MissingOptionalDependency, match=r"pandasaurus_cxg\[zstd\]"):
+        open_compressed(str(tmp_path / "graph.nt.zst"), "wt", "zstd")
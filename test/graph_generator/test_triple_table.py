@@ -0,0 +1,71 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from rdflib import RDF, RDFS, XSD, BNode, Literal, URIRef
+
+from pandasaurus_cxg.graph_generator.triple_table import TripleTable
+
+SUBJECT = URIRef("http://example.org/subject")
+TRIPLES = [
+    (SUBJECT, RDF.type, URIRef("http://example.org/Class")),
+    (SUBJECT, RDFS.label, Literal("label", lang="en")),
+    (SUBJECT, URIRef("http://example.org/cell_count"), Literal(5)),
+]
+
+
+@pytest.fixture()
+def triple_table():
+    table = TripleTable()
+    table.add_all(TRIPLES + TRIPLES[:1])
+    return table
+
+
+def test_triple_table_dictionary_encoding(triple_table):
+    assert len(triple_table) == 4
+    # the subject is stored once in the term dictionary
+    assert len(triple_table.terms) == 7
+    assert list(triple_table.subjects) == [0, 0, 0, 0]
+
+
+def test_triple_table_to_dataframe(triple_table):
+    df = triple_table.to_dataframe()
+
+    assert list(df.columns) == ["subject", "predicate", "object", "datatype", "language"]
+    assert len(df) == 3
+    assert all(isinstance(dtype, pd.CategoricalDtype) for dtype in df.dtypes)
+    assert df["subject"].iloc[0] == SUBJECT.n3()
+    assert df["datatype"].iloc[2] == str(XSD.integer)
+    assert df["language"].iloc[1] == "en"
+
+
+def test_triple_table_to_graph(triple_table):
+    assert set(triple_table.to_graph()) == set(TRIPLES)
+
+
+def test_triple_table_to_parquet(triple_table, tmp_path):
+    triple_table.to_parquet(str(tmp_path / "graph.parquet"))
+
+    df = pd.read_parquet(str(tmp_path / "graph.parquet"))
+    assert df.astype(str).values.tolist() == triple_table.to_dataframe().astype(str).values.tolist()
+    schema = pq.read_schema(str(tmp_path / "graph.parquet"))
+    # the term columns are stored dictionary-encoded
+    assert all(
+        pa.types.is_dictionary(schema.field(column).type)
+        for column in ("subject", "predicate", "object")
+    )
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_triple_table_save_and_load(triple_table, tmp_path, mmap):
+    triple_table.add((BNode("axiom"), RDFS.comment, Literal("2.50", datatype=XSD.decimal)))
+    triple_table.save(str(tmp_path / "graph.snapshot"))
+
+    loaded_table = TripleTable.load(str(tmp_path / "graph.snapshot"), mmap=mmap)
+
+    assert len(loaded_table) == len(triple_table)
+    assert loaded_table.terms == triple_table.terms
+    assert set(loaded_table.to_graph()) == set(triple_table.to_graph())
+    assert (BNode("axiom"), RDFS.comment, Literal("2.50", datatype=XSD.decimal)) in (
+        loaded_table.to_graph()
+    )
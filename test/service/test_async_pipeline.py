@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pandasaurus_cxg.service.async_pipeline import (
+    AsyncEnrichmentAnalyzer,
+    AsyncGraphGenerator,
+    AsyncPipeline,
+)
+from pandasaurus_cxg.utils.exceptions import OperationCancelled
+from pandasaurus_cxg.utils.progress import check_cancelled, track
+
+
+class ConcurrencyCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def work(self, seconds=0.05, result=None):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(seconds)
+        with self._lock:
+            self.running -= 1
+        return result
+
+
+class FakeAnalyzer:
+    def __init__(self, file_path, author_cell_type_list=None):
+        self.file_path = file_path
+        self.author_cell_type_list = author_cell_type_list
+        self.counter = ConcurrencyCounter()
+
+    def co_annotation_report(self, disease=None, enrich=False, max_hops=None):
+        return self.counter.work(result=("report", disease, enrich, max_hops))
+
+    def simple_enrichment(self, max_hops=None):
+        return self.counter.work(result=("simple", max_hops))
+
+
+class FakeGraphGenerator:
+    def __init__(self, analyzer, batch_size=10000):
+        self.analyzer = analyzer
+        self.batch_size = batch_size
+
+    def generate_rdf_graph(self, merge=False):
+        return self.analyzer.counter.work(result=("graph", merge))
+
+
+@pytest.fixture()
+def fake_classes(monkeypatch):
+    monkeypatch.setattr(
+        "pandasaurus_cxg.service.async_pipeline.AnndataEnrichmentAnalyzer", FakeAnalyzer
+    )
+    monkeypatch.setattr("pandasaurus_cxg.service.async_pipeline.GraphGenerator", FakeGraphGenerator)
+
+
+def test_run_does_not_block_the_event_loop():
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async with AsyncPipeline() as pipeline:
+            ticker = asyncio.create_task(tick())
+            result = await pipeline.run(time.sleep, 0.2)
+            ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+
+    assert result is None
+    assert ticks > 5
+
+
+@pytest.mark.parametrize("io_bound, limit", [(False, 2), (True, 3)])
+def test_run_limits_the_calls_in_flight(io_bound, limit):
+    counter = ConcurrencyCounter()
+
+    async def main():
+        async with AsyncPipeline(max_cpu_calls=2, max_lookups=3) as pipeline:
+            return await asyncio.gather(
+                *[pipeline.run(counter.work, result=i, io_bound=io_bound) for i in range(8)]
+            )
+
+    assert asyncio.run(main()) == list(range(8))
+    assert counter.max_running == limit
+
+
+def test_cancelled_task_cancels_the_running_stage():
+    stopped = threading.Event()
+    started = threading.Event()
+
+    def long_stage():
+        try:
+            with track("long", total=1000) as progress:
+                started.set()
+                for _ in range(1000):
+                    time.sleep(0.01)
+                    progress.advance()
+        finally:
+            stopped.set()
+
+    async def main():
+        async with AsyncPipeline(max_cpu_calls=1) as pipeline:
+            task = asyncio.create_task(pipeline.run(long_stage))
+            while not started.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            # the stage stopped before the slot was released
+            assert stopped.is_set()
+            return await pipeline.run(lambda: "next")
+
+    assert asyncio.run(main()) == "next"
+
+
+def test_run_reports_progress_and_keeps_the_context():
+    reports = []
+
+    def stage():
+        check_cancelled()
+        with track("stage", total=2) as progress:
+            progress.advance(2)
+        return threading.current_thread().name
+
+    async def main():
+        async with AsyncPipeline(progress=lambda *report: reports.append(report)) as pipeline:
+            return await pipeline.run(stage)
+
+    assert asyncio.run(main()).startswith("pandasaurus_cxg")
+    assert reports[0] == ("stage", 0, 2)
+    assert reports[-1] == ("stage", 2, 2)
+
+
+def test_calls_of_one_dataset_run_one_at_a_time(fake_classes):
+    async def main():
+        async with AsyncPipeline(max_cpu_calls=4, max_lookups=4) as pipeline:
+            kidney, lung = await asyncio.gather(
+                pipeline.load("kidney.h5ad"), pipeline.load("lung.h5ad", ["subclass.l1"])
+            )
+            results = await asyncio.gather(
+                kidney.co_annotation_report(disease="MONDO:1"),
+                kidney.simple_enrichment(max_hops=2),
+                lung.co_annotation_report(),
+                lung.simple_enrichment(),
+            )
+            graph_generator = await kidney.graph_generator(batch_size=10)
+            graph = await graph_generator.generate_rdf_graph(merge=True)
+            return kidney, lung, graph_generator, results, graph
+
+    kidney, lung, graph_generator, results, graph = asyncio.run(main())
+
+    assert isinstance(kidney, AsyncEnrichmentAnalyzer)
+    assert lung.wrapped.author_cell_type_list == ["subclass.l1"]
+    assert results[:2] == [("report", "MONDO:1", False, None), ("simple", 2)]
+    assert kidney.wrapped.counter.max_running == 1
+    assert lung.wrapped.counter.max_running == 1
+    assert isinstance(graph_generator, AsyncGraphGenerator)
+    assert graph_generator.lock is kidney.lock
+    assert graph_generator.wrapped.batch_size == 10
+    assert graph == ("graph", True)
+
+
+def test_failed_call_raises_in_the_caller():
+    def fail():
+        raise OperationCancelled("stage")
+
+    async def main():
+        async with AsyncPipeline() as pipeline:
+            await pipeline.run(fail)
+
+    with pytest.raises(OperationCancelled, match="stage"):
+        asyncio.run(main())
@@ -0,0 +1,251 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import anndata
+import numpy as np
+import pandas as pd
+import pytest
+from rdflib import Graph
+
+from pandasaurus_cxg.service.dataset_cache import (
+    Coalescer,
+    DatasetCache,
+    DatasetSession,
+)
+from pandasaurus_cxg.utils.anndata_loader import AnndataLoader
+from pandasaurus_cxg.utils.exceptions import CellTypeFieldNotFoundError
+
+
+class FakeAnalyzer:
+    def __init__(self, file_path, author_cell_type_list=None):
+        self.calls = []
+        obs = pd.DataFrame(
+            {"cell_type_ontology_term_id": ["CL:1", "CL:2", "CL:3"]}, index=["a", "b", "c"]
+        )
+        self.enricher_manager = SimpleNamespace(
+            anndata=SimpleNamespace(obs=obs), enricher=SimpleNamespace(graph=Graph())
+        )
+        self.analyzer_manager = SimpleNamespace(report_df=pd.DataFrame())
+        self.enriched = None
+
+    def co_annotation_report(self, disease=None, enrich=False, max_hops=None):
+        self.calls.append(("co_annotation_report", disease))
+        self.analyzer_manager.report_df = pd.DataFrame({"field_name1": ["cell_type"]})
+        return self.analyzer_manager.report_df
+
+    def simple_enrichment(self, max_hops=None):
+        self.calls.append(("simple", max_hops))
+        self.enriched = "simple"
+        return pd.DataFrame({"s": ["CL:1"], "o": ["CL:2"]})
+
+    def minimal_slim_enrichment(self, slim_list, max_hops=None):
+        self.calls.append(("minimal_slim", tuple(slim_list)))
+        self.enriched = "minimal_slim"
+        return pd.DataFrame({"s": ["CL:1"], "o": ["CL:3"]})
+
+    def filter_anndata_with_enriched_cell_type(self, cell_type):
+        self.calls.append(("filter", self.enriched))
+        return self.enricher_manager.anndata.obs.loc[["a"]]
+
+
+class FakeSession:
+    loads = 0
+
+    def __init__(self, file_path, author_cell_type_list=None):
+        FakeSession.loads += 1
+        time.sleep(0.1)
+        self.file_path = file_path
+        self.reports = 0
+        self.closed = False
+
+    def memory_usage(self):
+        return 100
+
+    def close(self):
+        self.closed = True
+
+    def co_annotation_report(self, disease=None):
+        self.reports += 1
+        time.sleep(0.1)
+        return self.file_path, disease
+
+
+@pytest.fixture()
+def session():
+    return DatasetSession("dataset.h5ad", analyzer_factory=FakeAnalyzer)
+
+
+@pytest.fixture(autouse=True)
+def reset_loads():
+    FakeSession.loads = 0
+
+
+def run_concurrently(func, count=5):
+    results = [None] * count
+
+    def run(i):
+        results[i] = func()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalescer_computes_concurrent_calls_once():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+
+    coalescer = Coalescer()
+
+    assert run_concurrently(lambda: coalescer.run("key", compute)) == [1] * 5
+    assert len(calls) == 1
+    assert coalescer.run("key", compute) == 2
+
+
+def test_coalescer_passes_the_exception_to_every_caller():
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("failed")
+
+    coalescer = Coalescer()
+
+    def call():
+        with pytest.raises(ValueError, match="failed"):
+            coalescer.run("key", fail)
+        return True
+
+    assert all(run_concurrently(call))
+
+
+def test_session_memoizes_results_and_restores_enrichment_state(session):
+    report = session.co_annotation_report()
+    assert session.co_annotation_report() is report
+    simple = session.enrichment()
+    session.enrichment("minimal_slim", ["immune"])
+    assert session.enrichment() is simple
+
+    filtered = session.filter("CL:2")
+    assert session.filter("CL:2") is filtered
+    assert filtered.index.tolist() == ["a"]
+    assert session.ea.calls == [
+        ("co_annotation_report", None),
+        ("simple", None),
+        ("minimal_slim", ("immune",)),
+        # the enricher state belonged to the slim enrichment, so the simple enrichment is rerun
+        ("simple", None),
+        ("filter", "simple"),
+    ]
+
+
+def test_session_rejects_unknown_author_cell_type_fields():
+    with pytest.raises(CellTypeFieldNotFoundError, match="subclass.l9"):
+        DatasetSession("dataset.h5ad", ["subclass.l9"], analyzer_factory=FakeAnalyzer)
+
+
+def test_session_rejects_invalid_enrichment_method(session):
+    with pytest.raises(ValueError, match="Invalid enrichment method"):
+        session.enrichment("unknown")
+
+
+def test_session_memory_usage_counts_results(session):
+    before = session.memory_usage()
+    session.enrichment()
+
+    assert session.memory_usage() > before
+
+
+def test_cache_loads_a_dataset_once_for_concurrent_requests():
+    cache = DatasetCache(session_factory=FakeSession)
+
+    results = run_concurrently(lambda: cache.call("a.h5ad", "co_annotation_report"))
+
+    assert FakeSession.loads == 1
+    assert results == [("a.h5ad", None)] * 5
+    assert cache.get("a.h5ad").reports == 1
+
+
+def test_cache_does_not_reload_a_dataset_loaded_after_the_lookup():
+    cache = DatasetCache(session_factory=FakeSession)
+    run = cache._loads.run
+    interleaved = []
+
+    def run_after_another_load(key, func):
+        # another request loads the dataset between the cache lookup and the load of the first
+        if not interleaved:
+            interleaved.append(key)
+            other = threading.Thread(target=cache.get, args=("a.h5ad",))
+            other.start()
+            other.join()
+        return run(key, func)
+
+    cache._loads.run = run_after_another_load
+
+    session = cache.get("a.h5ad")
+
+    assert interleaved
+    assert FakeSession.loads == 1
+    assert cache.get("a.h5ad") is session
+
+
+def test_cache_evicts_least_recently_used_datasets():
+    cache = DatasetCache(max_bytes=250, session_factory=FakeSession)
+
+    cache.get("a.h5ad")
+    evicted = cache.get("b.h5ad")
+    cache.get("a.h5ad")
+    cache.call("c.h5ad", "co_annotation_report", disease="MONDO:1")
+
+    assert [dataset["file_path"] for dataset in cache.datasets()] == ["a.h5ad", "c.h5ad"]
+    assert cache.datasets()[0]["memory_usage"] == 100
+    assert evicted.closed
+    assert not cache.get("a.h5ad").closed
+
+    sessions = [cache.get("a.h5ad"), cache.get("c.h5ad")]
+    cache.close()
+    assert cache.datasets() == []
+    assert all(session.closed for session in sessions)
+
+
+def test_session_close_closes_the_backed_file(tmp_path):
+    path = str(tmp_path / "dataset.h5ad")
+    anndata.AnnData(
+        X=np.zeros((3, 2)), obs=pd.DataFrame({"cell_type": ["a", "b", "c"]}, index=["1", "2", "3"])
+    ).write_h5ad(path)
+
+    class BackedAnalyzer(FakeAnalyzer):
+        def __init__(self, file_path, author_cell_type_list=None):
+            super().__init__(file_path, author_cell_type_list)
+            self.enricher_manager.anndata = AnndataLoader.load_from_file(file_path)
+
+    session = DatasetSession(path, analyzer_factory=BackedAnalyzer)
+    backed = session.ea.enricher_manager.anndata
+    assert backed.file.is_open
+
+    session.close()
+
+    assert not backed.file.is_open
+
+
+def test_cache_keeps_the_latest_dataset_over_the_memory_bound():
+    cache = DatasetCache(max_bytes=50, session_factory=FakeSession)
+
+    cache.get("a.h5ad")
+    cache.get("b.h5ad")
+
+    assert [dataset["file_path"] for dataset in cache.datasets()] == ["b.h5ad"]
+
+
+def test_cache_rejects_invalid_operation():
+    cache = DatasetCache(session_factory=FakeSession)
+
+    with pytest.raises(ValueError, match="Invalid operation"):
+        cache.call("a.h5ad", "memory_usage")
+    assert FakeSession.loads == 0
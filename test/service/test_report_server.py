@@ -0,0 +1,138 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http import HTTPStatus
+
+import pandas as pd
+import pytest
+from rdflib import RDFS, Graph, Literal, URIRef
+
+from pandasaurus_cxg.service.report_server import ReportService, create_server
+from pandasaurus_cxg.utils.exceptions import CellTypeNotFoundError
+
+
+class FakeCache:
+    def __init__(self):
+        self.calls = []
+
+    def call(self, file_path, operation, author_cell_type_list=None, **kwargs):
+        self.calls.append((file_path, operation, author_cell_type_list, kwargs))
+        if operation == "filter":
+            if kwargs["cell_type"] == "CL:missing":
+                raise CellTypeNotFoundError(["CL:missing"], ["CL:1"])
+            if kwargs["cell_type"] == "CL:bug":
+                raise KeyError("cell_type_ontology_term_id")
+            return pd.DataFrame({"cell_type": ["T cell"]}, index=pd.Index(["cell_1"], name="id"))
+        if operation == "subgraph":
+            graph = Graph()
+            graph.add((URIRef(kwargs["start_nodes"][0]), RDFS.label, Literal("cluster")))
+            return graph
+        return pd.DataFrame({"field_name1": ["cell_type"], "value1": ["T cell"]})
+
+    def datasets(self):
+        return [{"file_path": "a.h5ad", "author_cell_type_list": [], "memory_usage": 1}]
+
+
+@pytest.fixture()
+def data_dir(tmp_path):
+    (tmp_path / "kidney.h5ad").write_bytes(b"")
+    return tmp_path
+
+
+@pytest.fixture()
+def service(data_dir):
+    return ReportService(str(data_dir), FakeCache())
+
+
+def test_co_annotation_report_endpoint(service, data_dir):
+    status, media_type, body = service.handle(
+        "/co_annotation_report",
+        {"dataset": ["kidney.h5ad"], "enrich": ["true"], "author_cell_type": ["subclass.l1"]},
+    )
+
+    assert status == HTTPStatus.OK
+    assert media_type == "application/json"
+    assert json.loads(body) == [{"field_name1": "cell_type", "value1": "T cell"}]
+    assert service.cache.calls == [
+        (
+            str(data_dir / "kidney.h5ad"),
+            "co_annotation_report",
+            ["subclass.l1"],
+            {"disease": None, "enrich": True, "max_hops": None},
+        )
+    ]
+
+
+def test_filter_endpoint_keeps_the_cell_ids(service):
+    status, _, body = service.handle(
+        "/filter", {"dataset": ["kidney.h5ad"], "cell_type": ["CL:1"], "slim": ["a", "b"]}
+    )
+
+    assert status == HTTPStatus.OK
+    assert json.loads(body) == [{"id": "cell_1", "cell_type": "T cell"}]
+    assert service.cache.calls[0][3] == {
+        "cell_type": "CL:1",
+        "method": "simple",
+        "slim_list": ["a", "b"],
+        "max_hops": None,
+    }
+
+
+def test_subgraph_endpoint_serializes_the_graph(service):
+    status, media_type, body = service.handle(
+        "/subgraph",
+        {"dataset": ["kidney.h5ad"], "node": ["http://example.org/c"], "format": ["nt"]},
+    )
+
+    assert status == HTTPStatus.OK
+    assert media_type == "application/n-triples"
+    assert b'<http://example.org/c> <http://www.w3.org/2000/01/rdf-schema#label> "cluster"' in body
+
+
+@pytest.mark.parametrize(
+    "path, params, status",
+    [
+        ("/unknown", {}, HTTPStatus.NOT_FOUND),
+        ("/enrichment", {}, HTTPStatus.BAD_REQUEST),
+        ("/enrichment", {"dataset": ["missing.h5ad"]}, HTTPStatus.NOT_FOUND),
+        ("/enrichment", {"dataset": ["../kidney.h5ad"]}, HTTPStatus.FORBIDDEN),
+        ("/enrichment", {"dataset": ["kidney.h5ad"], "max_hops": ["x"]}, HTTPStatus.BAD_REQUEST),
+        ("/enrichment", {"dataset": ["kidney.h5ad"], "max_hops": ["-1"]}, HTTPStatus.BAD_REQUEST),
+        ("/enrichment", {"dataset": ["kidney.h5ad"], "method": ["full"]}, HTTPStatus.BAD_REQUEST),
+        ("/filter", {"dataset": ["kidney.h5ad"], "cell_type": ["CL:missing"]}, 400),
+        ("/subgraph", {"dataset": ["kidney.h5ad"]}, HTTPStatus.BAD_REQUEST),
+        ("/subgraph", {"dataset": ["kidney.h5ad"], "node": ["x"], "format": ["png"]}, 400),
+    ],
+)
+def test_invalid_requests(service, path, params, status):
+    response_status, _, body = service.handle(path, params)
+
+    assert response_status == status
+    assert "error" in json.loads(body)
+
+
+def test_internal_errors_are_not_client_errors(service):
+    # an internal KeyError is not answered as a bad request, ReportRequestHandler logs it as a 500
+    with pytest.raises(KeyError):
+        service.handle("/filter", {"dataset": ["kidney.h5ad"], "cell_type": ["CL:bug"]})
+
+
+def test_server_serves_requests(data_dir):
+    server = create_server(str(data_dir), port=0, cache=FakeCache())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = "http://{}:{}".format(*server.server_address[:2])
+    try:
+        with urllib.request.urlopen(f"{url}/datasets") as response:
+            assert json.loads(response.read())[0]["file_path"] == "a.h5ad"
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/enrichment?dataset=missing.h5ad")
+        assert error.value.code == HTTPStatus.NOT_FOUND
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{url}/filter?dataset=kidney.h5ad&cell_type=CL:bug")
+        assert error.value.code == HTTPStatus.INTERNAL_SERVER_ERROR
+        assert json.loads(error.value.read()) == {"error": "Internal server error"}
+    finally:
+        server.shutdown()
+        server.server_close()
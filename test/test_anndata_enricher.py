@@ -4,6 +4,7 @@ import anndata
 import pandas as pd
 import pytest
 from pandasaurus.slim_manager import SlimManager
+from rdflib import OWL, RDF, RDFS, Graph, Namespace
 
 from pandasaurus_cxg.anndata_enricher import AnndataEnricher
 from pandasaurus_cxg.utils.exceptions import (
@@ -454,3 +455,186 @@ def test_check_subclass_relationships(sample_immune_data):
     expected_subclass_relation = [("CL:0000798", "CL:0000084"), ("CL:0000815", "CL:0000084")]
 
     assert subclass_relation == expected_subclass_relation
+
+
+def test_simple_enrichment_with_hops(mocker, sample_immune_data):
+    enricher = AnndataEnricher(sample_immune_data)
+    cl = Namespace("http://purl.obolibrary.org/obo/CL_")
+    enrichment_graph = Graph()
+    enrichment_graph.add((cl["0000798"], RDFS.subClassOf, cl["0000084"]))
+    enrichment_graph.add((cl["0000084"], RDFS.subClassOf, cl["0000542"]))
+    enrichment_graph.add((cl["0000542"], RDFS.subClassOf, cl["0000738"]))
+    for term in ["0000798", "0000084", "0000542", "0000738"]:
+        enrichment_graph.add((cl[term], RDF.type, OWL.Class))
+    enriched_df = pd.DataFrame(
+        {
+            "s": ["CL:0000798", "CL:0000798", "CL:0000798"],
+            "s_label": ["gamma-delta T cell"] * 3,
+            "p": ["rdfs:subClassOf"] * 3,
+            "o": ["CL:0000084", "CL:0000542", "CL:0000738"],
+            "o_label": ["T cell", "lymphocyte", "leukocyte"],
+        }
+    )
+
+    def enrichment():
+        enricher.enricher.graph = enrichment_graph
+        enricher.enricher.enriched_df = enriched_df
+        return enriched_df
+
+    mocker.patch.object(enricher.enricher, "simple_enrichment", side_effect=enrichment)
+    fetch = mocker.patch.object(
+        AnndataEnricher,
+        "_fetch_subclass_edges",
+        return_value=[
+            ("CL:0000798", "CL:0000084"),
+            ("CL:0000084", "CL:0000542"),
+            ("CL:0000542", "CL:0000738"),
+        ],
+    )
+
+    result = enricher.simple_enrichment()
+    assert "hops" not in result.columns
+    fetch.assert_not_called()
+
+    result = enricher.annotate_hops()
+    assert result["hops"].tolist() == [1, 2, 3]
+
+    result = enricher.simple_enrichment(max_hops=2)
+    assert result["o"].tolist() == ["CL:0000084", "CL:0000542"]
+    assert result["hops"].tolist() == [1, 2]
+    assert enricher.enricher.enriched_df is result
+    assert (cl["0000738"], None, None) not in enricher.enricher.graph
+    assert (cl["0000542"], RDFS.subClassOf, cl["0000738"]) not in enricher.enricher.graph
+    assert (cl["0000084"], RDFS.subClassOf, cl["0000542"]) in enricher.enricher.graph
+
+    with pytest.raises(ValueError):
+        enricher.simple_enrichment(max_hops=-1)
+
+
+def test_compute_hops():
+    adjacency = {"a": {"b", "c"}, "b": {"d"}, "c": {"d"}, "d": {"e"}, "x": {"d"}}
+
+    hops = AnndataEnricher._compute_hops(adjacency, ["a", "x"])
+
+    assert hops == {
+        ("a", "b"): 1,
+        ("a", "c"): 1,
+        ("a", "d"): 2,
+        ("a", "e"): 3,
+        ("x", "d"): 1,
+        ("x", "e"): 2,
+    }
+    assert AnndataEnricher._compute_hops(adjacency, ["a", "x"], max_hops=1) == {
+        ("a", "b"): 1,
+        ("a", "c"): 1,
+        ("x", "d"): 1,
+    }
+
+
+@pytest.fixture
+def hop_enricher(mocker):
+    mocker.patch("pandasaurus.query.Query")
+    mocker.patch.object(SlimManager, "get_slim_list", return_value=[])
+    obs = pd.DataFrame(
+        {
+            "cell_type_ontology_term_id": ["CL:0000798"],
+            "cell_type": ["gamma-delta T cell"],
+            "tissue_ontology_term_id": ["UBERON:0002113"],
+            "tissue": ["kidney"],
+        }
+    )
+    enricher = AnndataEnricher(anndata.AnnData(obs=obs))
+    enricher.enricher.graph = Graph()
+    enricher.enricher.enriched_df = pd.DataFrame()
+    return enricher
+
+
+def test_hops_count_ontology_terms_and_keep_other_predicates(mocker, hop_enricher):
+    obo = Namespace("http://purl.obolibrary.org/obo/")
+    enriched_df = pd.DataFrame(
+        {
+            "s": ["CL:0000798", "CL:0000798", "CL:0000798"],
+            "s_label": ["gamma-delta T cell"] * 3,
+            "p": ["rdfs:subClassOf", "rdfs:subClassOf", "BFO:0000050"],
+            "o": ["CL:0000542", "CL:0000738", "UBERON:0002113"],
+            "o_label": ["lymphocyte", "leukocyte", "kidney"],
+        }
+    )
+    enrichment_graph = Graph()
+    enrichment_graph.add((obo["CL_0000798"], RDFS.subClassOf, obo["CL_0000542"]))
+    enrichment_graph.add((obo["CL_0000542"], RDFS.subClassOf, obo["CL_0000738"]))
+    enrichment_graph.add((obo["CL_0000798"], obo["BFO_0000050"], obo["UBERON_0002113"]))
+
+    def enrichment():
+        hop_enricher.enricher.graph = enrichment_graph
+        hop_enricher.enricher.enriched_df = enriched_df
+        return enriched_df
+
+    hop_enricher.enricher.simple_enrichment.side_effect = enrichment
+    # CL:0000084 is an ontology term between the seed and lymphocyte that is not enriched
+    fetch = mocker.patch.object(
+        AnndataEnricher,
+        "_fetch_subclass_edges",
+        return_value=[
+            ("CL:0000798", "CL:0000084"),
+            ("CL:0000084", "CL:0000542"),
+            ("CL:0000542", "CL:0000738"),
+        ],
+    )
+
+    hop_enricher.simple_enrichment()
+    result = hop_enricher.annotate_hops()
+    assert result["hops"].tolist() == [2, 3, pd.NA]
+
+    result = hop_enricher.simple_enrichment(max_hops=2)
+    assert result["o"].tolist() == ["CL:0000542", "UBERON:0002113"]
+    assert result["hops"].tolist() == [2, pd.NA]
+    graph = hop_enricher.enricher.graph
+    assert (obo["CL_0000798"], obo["BFO_0000050"], obo["UBERON_0002113"]) in graph
+    assert (obo["CL_0000542"], RDFS.subClassOf, obo["CL_0000738"]) not in graph
+    fetch.assert_called_once_with(
+        [str(obo["CL_0000798"])],
+        [str(obo["CL_0000542"]), str(obo["CL_0000738"])],
+    )
+
+
+def test_hops_fall_back_to_na_if_the_query_fails(mocker, hop_enricher):
+    enriched_df = pd.DataFrame(
+        {
+            "s": ["CL:0000798", "CL:0000798"],
+            "s_label": ["gamma-delta T cell"] * 2,
+            "p": ["rdfs:subClassOf", "BFO:0000050"],
+            "o": ["CL:0000542", "UBERON:0002113"],
+            "o_label": ["lymphocyte", "kidney"],
+        }
+    )
+
+    def enrichment():
+        hop_enricher.enricher.enriched_df = enriched_df
+        return enriched_df
+
+    hop_enricher.enricher.simple_enrichment.side_effect = enrichment
+    mocker.patch.object(
+        AnndataEnricher, "_fetch_subclass_edges", side_effect=ConnectionError("unreachable")
+    )
+
+    with pytest.warns(UserWarning, match="unreachable"):
+        result = hop_enricher.simple_enrichment(max_hops=1)
+
+    assert result["o"].tolist() == ["CL:0000542", "UBERON:0002113"]
+    assert result["hops"].tolist() == [pd.NA, pd.NA]
+    assert hop_enricher.enricher.enriched_df is result
+
+
+@pytest.mark.parametrize(
+    "curie, iri",
+    [
+        ("CL:0000084", "http://purl.obolibrary.org/obo/CL_0000084"),
+        ("UBERON:0002113", "http://purl.obolibrary.org/obo/UBERON_0002113"),
+        ("EFO:0000001", "http://www.ebi.ac.uk/efo/EFO_0000001"),
+        ("PCL:0010001", "http://purl.obolibrary.org/obo/PCL_0010001"),
+        ("http://example.org/term", "http://example.org/term"),
+    ],
+)
+def test_term_iri_resolves_the_prefix_of_the_curie(curie, iri):
+    assert AnndataEnricher._term_iri(curie) == iri
@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Cumulative import time budget in seconds, generous enough for slow CI machines
+IMPORT_TIME_BUDGET = float(os.getenv("PANDASAURUS_CXG_IMPORT_BUDGET", "2.0"))
+HEAVY_MODULES = [
+    "anndata",
+    "cellxgene_census",
+    "matplotlib.pyplot",
+    "networkx",
+    "oaklib",
+    "pandasaurus",
+]
+
+
+def import_times(module):
+    """Import a module in a fresh interpreter and return the cumulative import time of every
+    imported module, in microseconds."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_graph_generator_import_does_not_load_heavy_dependencies():
+    times = import_times("pandasaurus_cxg.graph_generator.graph_generator")
+
+    assert [name for name in HEAVY_MODULES if name in times] == []
+
+
+def test_enrichment_analysis_import_does_not_load_visualization_or_ontology_stack():
+    times = import_times("pandasaurus_cxg.enrichment_analysis")
+
+    visualization_and_ontology_modules = ["matplotlib.pyplot", "networkx", "oaklib", "pandasaurus"]
+    assert [name for name in visualization_and_ontology_modules if name in times] == []
+
+
+def test_graph_generator_import_time_budget():
+    times = import_times("pandasaurus_cxg.graph_generator.graph_generator")
+
+    assert times["pandasaurus_cxg.graph_generator.graph_generator"] / 1e6 < IMPORT_TIME_BUDGET
@@ -0,0 +1,100 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import anndata
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from pandasaurus_cxg.anndata_analyzer import AnndataAnalyzer
+from pandasaurus_cxg.enrichment_analysis import AnndataEnrichmentAnalyzer
+from pandasaurus_cxg.utils.anndata_reader import AnndataReader
+
+MATRIX = np.arange(40 * 6, dtype=np.float32).reshape(40, 6)
+
+
+@pytest.fixture(params=["dense", "sparse"])
+def h5ad_path(request, tmp_path):
+    obs = pd.DataFrame(
+        {
+            "subclass": [f"subclass {i % 4}" for i in range(40)],
+            "cell_type": [f"type {i % 2}" for i in range(40)],
+            "cell_type_ontology_term_id": [f"CL:000000{i % 2}" for i in range(40)],
+            "tissue_ontology_term_id": ["UBERON:0002113"] * 40,
+            "tissue": ["kidney"] * 40,
+        },
+        index=[f"cell_{i}" for i in range(40)],
+    )
+    matrix = MATRIX if request.param == "dense" else sparse.csr_matrix(MATRIX)
+    path = tmp_path / f"{request.param}.h5ad"
+    anndata.AnnData(X=matrix, obs=obs, uns={"title": "test"}).write_h5ad(path)
+    return str(path)
+
+
+def dense(block):
+    return block.toarray() if sparse.issparse(block) else block
+
+
+def test_concurrent_reads_use_one_handle_per_thread(h5ad_path):
+    row_sets = [np.random.default_rng(seed).permutation(40)[:15] for seed in range(16)]
+
+    with AnndataReader(h5ad_path) as reader:
+        with ThreadPoolExecutor(4) as executor:
+            blocks = list(executor.map(reader.read_rows, row_sets))
+        assert 1 <= len(reader._handles) <= 4
+        assert np.array_equal(dense(reader.read_rows(slice(2, 5))), MATRIX[2:5])
+        assert np.array_equal(
+            dense(reader.read_obs_rows(["cell_7", "cell_3", "cell_7"])), MATRIX[[7, 3, 7]]
+        )
+
+    for rows, block in zip(row_sets, blocks):
+        assert np.array_equal(dense(block), MATRIX[rows])
+    assert reader._handles == []
+    with pytest.raises(ValueError, match="closed"):
+        reader.read_rows([0])
+
+
+def test_read_obs_rows_rejects_missing_observations(h5ad_path):
+    with AnndataReader(h5ad_path) as reader, pytest.raises(KeyError, match="cell_x"):
+        reader.read_obs_rows(["cell_1", "cell_x"])
+
+
+def test_metadata_has_no_file_handle(h5ad_path):
+    with AnndataReader(h5ad_path) as reader:
+        metadata = reader.metadata()
+        copied = reader.metadata(copy_obs=True)
+
+    assert not metadata.isbacked
+    assert metadata.shape == (40, 6)
+    assert metadata.uns["title"] == "test"
+    assert metadata.uns is not reader.uns
+    copied.obs["subclass"] = "changed"
+    assert reader.obs["subclass"].iloc[0] == "subclass 0"
+
+
+def test_analyzers_run_concurrently_on_reader_metadata(h5ad_path):
+    with AnndataReader(h5ad_path) as reader:
+        analyzers = [AnndataAnalyzer(reader.metadata(), ["subclass"]) for _ in range(4)]
+        with ThreadPoolExecutor(4) as executor:
+            reports = list(
+                executor.map(lambda analyzer: analyzer.co_annotation_report(), analyzers)
+            )
+
+    assert all(report.equals(reports[0]) for report in reports)
+    assert set(reports[0]["field_name1"]) == {"subclass", "cell_type"}
+
+
+def test_reader_rejects_missing_file(tmp_path):
+    with pytest.raises(ValueError, match="Could not load"):
+        AnndataReader(str(tmp_path / "missing.h5ad"))
+
+
+def test_enrichment_analyzer_from_reader(h5ad_path, mocker):
+    mocker.patch("pandasaurus.query.Query")
+    mocker.patch("pandasaurus.slim_manager.SlimManager")
+    with AnndataReader(h5ad_path) as reader:
+        analyzer = AnndataEnrichmentAnalyzer.from_reader(reader, ["subclass"])
+
+    assert analyzer.enricher_manager.anndata is analyzer.analyzer_manager._anndata
+    assert analyzer.analyzer_manager._anndata.obs is not reader.obs
+    assert not analyzer.analyzer_manager._anndata.isbacked
@@ -0,0 +1,80 @@
+import json
+
+import pandas as pd
+import pytest
+
+from pandasaurus_cxg.utils.instrumentation import (
+    PipelineProfiler,
+    lap,
+    profiled_stage,
+    stage,
+)
+
+
+def test_stage_without_profiler_is_not_recorded():
+    with stage("outside") as record:
+        record.count("rows", 3)
+
+    assert record.seconds is None
+    assert record.counts == {}
+
+
+def test_profiler_records_nested_stages_and_laps(mocker):
+    log_stage = mocker.patch("pandasaurus_cxg.utils.instrumentation.log_stage")
+    triples = []
+
+    with PipelineProfiler(trace_memory=True) as profiler:
+        with stage("generate", graph=triples) as record:
+            triples.extend(range(3))
+            lap("first", triples)
+            data = [bytearray(1024 * 1024)]
+            triples.extend(range(2))
+            lap("second", triples, clusters=4)
+            with stage("inner"):
+                pass
+            record.count("datasets", 1)
+        del data
+
+    assert [record.name for record in profiler.records] == [
+        "generate/first",
+        "generate/second",
+        "generate/inner",
+        "generate",
+    ]
+    first, second, inner, outer = profiler.records
+    assert first.counts == {"triples": 3}
+    assert second.counts == {"triples": 2, "clusters": 4}
+    assert outer.counts == {"triples": 5, "datasets": 1}
+    assert second.memory_peak >= 1024 * 1024
+    assert outer.memory_peak >= second.memory_peak
+    assert all(record.seconds >= 0 for record in profiler.records)
+    assert log_stage.call_count == 4
+
+
+def test_profiler_hooks_and_json_export(tmp_path):
+    finished = []
+
+    with PipelineProfiler(log_stages=False, hooks=[finished.append]) as profiler:
+        with stage("load") as record:
+            record.count("rows", 10)
+
+    assert finished == profiler.records
+    exported = json.loads(profiler.to_json(str(tmp_path / "profile.json")))
+    assert exported == json.loads((tmp_path / "profile.json").read_text())
+    assert exported[0]["name"] == "load"
+    assert exported[0]["counts"] == {"rows": 10}
+    # memory is not traced by default, only the peak resident set size is recorded
+    assert exported[0]["memory_peak"] is None
+    assert profiler.to_dataframe().loc[0, "counts.rows"] == 10
+
+
+def test_profiled_stage_counts_dataframe_rows():
+    @profiled_stage("report")
+    def report():
+        return pd.DataFrame({"a": [1, 2]})
+
+    with PipelineProfiler(trace_memory=False, log_stages=False) as profiler:
+        report()
+
+    assert profiler.records[0].name == "report"
+    assert profiler.records[0].counts == {"rows": 2}
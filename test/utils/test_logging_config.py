@@ -1,8 +1,15 @@
+import json
 import logging
 
 import pytest
 
-from pandasaurus_cxg.utils.logging_config import NoErrorFilter, configure_logger
+from pandasaurus_cxg.utils.logging_config import (
+    AggregatedWarnings,
+    JsonFormatter,
+    NoErrorFilter,
+    configure_logger,
+    log_stage,
+)
 
 
 @pytest.fixture
@@ -17,16 +24,68 @@ def test_configure_logger(logger):
     # Check if the logger level is set to INFO
     assert logger.level == logging.INFO
 
-    # Check if there are exactly two handlers (one for INFO and one for ERROR)
-    assert len(logger.handlers) == 4
+    # Check if there are exactly two handlers (one for INFO and one for ERROR), ignoring the
+    # capture handlers pytest adds to non-propagating loggers
+    handlers = [handler for handler in logger.handlers if type(handler) is logging.StreamHandler]
+    assert len(handlers) == 2
 
     # Check if the logger's INFO handler has the expected level and filter
-    info_handler = logger.handlers[0]
+    info_handler = handlers[0]
     assert info_handler.level == logging.INFO
     assert len(info_handler.filters) == 0  # No filters for INFO
 
     # Check if the logger's ERROR handler has the expected level and filter
-    error_handler = logger.handlers[1]
+    error_handler = handlers[1]
     assert error_handler.level == logging.ERROR
     assert len(error_handler.filters) == 1  # One filter for excluding ERROR logs
     assert isinstance(error_handler.filters[0], NoErrorFilter)
+
+
+def test_log_stage(mocker):
+    info = mocker.patch.object(logging.getLogger("pandasaurus_cxg.utils.logging_config"), "info")
+
+    log_stage({"name": "load", "seconds": 0.5, "counts": {"rows": 2}})
+
+    record = {"name": "load", "seconds": 0.5, "counts": {"rows": 2}}
+    info.assert_called_once_with(
+        "Pipeline stage %s", json.dumps(record), extra={"fields": {"stage": record}}
+    )
+
+
+def test_configure_logger_is_idempotent(logger):
+    handlers = [handler for handler in logger.handlers if type(handler) is logging.StreamHandler]
+
+    assert [
+        handler for handler in configure_logger().handlers if type(handler) is logging.StreamHandler
+    ] == handlers
+
+    configure_logger(json_output=True)
+    assert all(isinstance(handler.formatter, JsonFormatter) for handler in handlers)
+    configure_logger(json_output=False)
+    assert not any(isinstance(handler.formatter, JsonFormatter) for handler in handlers)
+
+
+def test_json_formatter():
+    record = logging.LogRecord("test", logging.WARNING, __file__, 1, "%d clusters", (3,), None)
+    record.fields = {"stage": "generate_rdf_graph"}
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "3 clusters"
+    assert entry["stage"] == "generate_rdf_graph"
+
+
+def test_aggregated_warnings(mocker):
+    test_logger = logging.getLogger("test_aggregated_warnings")
+    warning = mocker.patch.object(test_logger, "warning")
+
+    with AggregatedWarnings(test_logger, "stage", sample_size=2) as warnings:
+        for i in range(5):
+            warnings.add("Clusters without author fields", {"cluster": i})
+        warnings.add("Other", "x")
+
+    assert warning.call_count == 2
+    args, kwargs = warning.call_args_list[0]
+    assert args[1:4] == ("stage", "Clusters without author fields", 5)
+    assert kwargs["extra"]["fields"]["sample"] == [{"cluster": 0}, {"cluster": 1}]
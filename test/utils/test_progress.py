@@ -0,0 +1,106 @@
+import sys
+import threading
+
+import pytest
+
+from pandasaurus_cxg.utils.exceptions import (
+    MissingOptionalDependency,
+    OperationCancelled,
+)
+from pandasaurus_cxg.utils.progress import (
+    CancellationToken,
+    ProgressMonitor,
+    TqdmProgress,
+    check_cancelled,
+    track,
+)
+
+
+def test_track_without_monitor_reports_nothing():
+    token = CancellationToken()
+    token.cancel()
+
+    with track("outside", total=2) as progress:
+        progress.advance()
+        progress.advance()
+    check_cancelled("outside")
+
+    assert progress.done == 0
+
+
+def test_monitor_reports_start_throttled_progress_and_end():
+    reports = []
+
+    with ProgressMonitor(lambda *report: reports.append(report), min_interval=3600):
+        with track("stage", total=3) as progress:
+            for _ in range(3):
+                progress.advance()
+
+    assert reports == [("stage", 0, 3), ("stage", 3, 3)]
+
+
+def test_monitor_reports_every_item_without_throttling():
+    reports = []
+
+    with ProgressMonitor(lambda *report: reports.append(report), min_interval=0):
+        with track("stage") as progress:
+            progress.advance(2)
+            progress.advance()
+
+    assert reports == [
+        ("stage", 0, None),
+        ("stage", 2, None),
+        ("stage", 3, None),
+        ("stage", 3, None),
+    ]
+
+
+def test_cancellation_is_raised_from_the_hot_loop():
+    token = CancellationToken()
+    done = []
+
+    with ProgressMonitor(token=token):
+        with pytest.raises(OperationCancelled, match="during stage"):
+            with track("stage", total=10) as progress:
+                for item in range(10):
+                    done.append(item)
+                    if item == 3:
+                        # e.g. requested by the job service from another thread
+                        threading.Thread(target=token.cancel).start()
+                        threading.Event().wait(0.05)
+                    progress.advance()
+        with pytest.raises(OperationCancelled):
+            check_cancelled()
+
+    assert token.cancelled
+    assert done == [0, 1, 2, 3]
+
+
+def test_cancelled_stage_does_not_start():
+    monitor = ProgressMonitor()
+    monitor.cancel()
+
+    with monitor, pytest.raises(OperationCancelled):
+        with track("stage"):
+            pytest.fail("the stage should not start")
+
+
+def test_tqdm_progress_closes_finished_bars():
+    callback = TqdmProgress(disable=True)
+
+    with ProgressMonitor(callback, min_interval=0):
+        with track("finished", total=2) as progress:
+            progress.advance(2)
+        with track("unknown total") as progress:
+            progress.advance()
+
+    assert list(callback._bars) == ["unknown total"]
+    callback.close()
+    assert callback._bars == {}
+
+
+def test_tqdm_progress_without_tqdm(monkeypatch):
+    monkeypatch.setitem(sys.modules, "tqdm.auto", None)
+
+    with pytest.raises(MissingOptionalDependency, match=r"pandasaurus_cxg\[progress\]"):
+        TqdmProgress()